@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import Optional
+from pydantic import BaseModel
+from core.database import get_db
+from core.security import get_current_user
+from models.user import User
+from models.job import Job, JobStatus
+from services.job_queue import JOB_HANDLERS, get_job_queue
+from api.v1.offers import enforce_generation_quota
+
+router = APIRouter()
+
+class JobCreate(BaseModel):
+    kind: str = "offer_creation"
+    input: dict
+    webhookUrl: Optional[str] = None
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    job_data: JobCreate,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if job_data.kind not in JOB_HANDLERS:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind: {job_data.kind}")
+
+    enforce_generation_quota(user)
+    job = get_job_queue().enqueue(
+        db,
+        user.id,
+        job_data.kind,
+        job_data.input,
+        webhook_url=job_data.webhookUrl or None
+    )
+    return job.to_dict(include_result=False)
+
+@router.get("")
+async def list_jobs(
+    status_filter: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 50,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    query = db.query(Job).filter(Job.user_id == user.id)
+    if status_filter:
+        query = query.filter(Job.status == status_filter)
+
+    jobs = query.order_by(Job.created_at.desc()).offset(offset).limit(min(limit, 200)).all()
+    return {
+        "jobs": [job.to_dict(include_result=False) for job in jobs],
+        "counts": get_job_queue().counts(db, user.id),
+        "footprint": get_job_queue().footprint(db, user.id)
+    }
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: str,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = db.query(Job).filter(Job.id == job_id, Job.user_id == user.id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@router.post("/{job_id}/retry")
+async def retry_job(
+    job_id: str,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = db.query(Job).filter(Job.id == job_id, Job.user_id == user.id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != JobStatus.DEAD.value:
+        raise HTTPException(status_code=409, detail="Only dead jobs can be retried")
+
+    enforce_generation_quota(user)
+    return get_job_queue().retry(db, job).to_dict(include_result=False)
@@ -1,21 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status, UploadFile, File, Form
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+import asyncio
+import functools
+import json
+import os
+import logging
+from typing import List, Optional
 from pydantic import BaseModel
-from core.database import get_db
+from core.config import settings
+from core.database import SessionLocal, get_db
 from core.security import get_current_user
 from models.user import User, PlanType
 from models.offer import Offer
-from services.pdf_service import generate_pdf
+from models.generation_trace import GenerationTrace
+from models.document_artifact import DocumentArtifact
+from models.offer_batch import OfferBatch, OfferBatchItem
+from services.pdf_service import artifact_response, ensure_offer_pdf, get_offer_pdf, has_artifact, render_key
+from services.document_model import EXPORTERS, get_document
+from services.catalog import build_catalog_html, catalog_key, parse_page_range, render_catalog
+from services.usage import GenerationQuota, QuotaExceededError, get_token_ledger, usage_scope
+from services.document_service import DocumentError, save_upload, extract_document
+from services.batch_service import BatchCheckpointWriter
+from services import personalization
+from services.export_service import prepare_export, stream_zip
+from services.pdf_prerender import get_prerenderer
+from services.worker_pool import PoolBusy, WorkerPoolError
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 PLAN_LIMITS = {
-    PlanType.FREE: {"offers": 1, "edits": 5},
-    PlanType.PROFESSIONAL: {"offers": 4, "edits": 15},
-    PlanType.AGENCY: {"offers": float('inf'), "edits": float('inf')}
+    PlanType.FREE: {"offers": 1, "edits": 5, "generations": 5},
+    PlanType.PROFESSIONAL: {"offers": 4, "edits": 15, "generations": 50},
+    PlanType.AGENCY: {"offers": float('inf'), "edits": float('inf'), "generations": float('inf')}
 }
 
+# Daily AI generation quota, counted in memory (see services/usage.py)
+generation_quota = GenerationQuota(PLAN_LIMITS, get_token_ledger())
+
+def enforce_generation_quota(user: User):
+    """Reserve one AI generation for the user or raise 403"""
+    try:
+        generation_quota.acquire(user.id, user.plan)
+    except QuotaExceededError:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You have reached your daily generation limit. Please upgrade your plan."
+        )
+
 class PriceData(BaseModel):
     amount: float
     currency: str = "USD"
@@ -32,6 +67,28 @@ class OfferCreate(BaseModel):
     brandColors: dict = {}
     logoUrl: str = ""
     images: List[str] = []
+    traceId: str = ""
+
+class BatchCreate(BaseModel):
+    offers: List[dict]
+
+class BulkExport(BaseModel):
+    offerIds: List[str]
+
+class CatalogExport(BaseModel):
+    offerIds: List[str]
+    title: str = "Offer Catalog"
+    pages: Optional[str] = None  # e.g. "3-7"; the whole catalog if omitted
+
+class ClientLead(BaseModel):
+    name: str
+    company: str = ""
+    industry: str = ""
+    fields: dict = {}  # Extra {{placeholder}} values and notes for the LLM
+
+class PersonalizeRequest(BaseModel):
+    clients: List[ClientLead]
+    llmFields: List[str] = []  # Fields to rewrite per client with the LLM (opt-in)
 
 class OfferUpdate(BaseModel):
     title: str = None
@@ -53,6 +110,360 @@ async def get_offers(
     offers = db.query(Offer).filter(Offer.user_id == user.id).all()
     return [offer.to_dict() for offer in offers]
 
+def _run_redesign(
+    user_id: str,
+    plan,
+    text: str,
+    metadata: dict,
+    gathered_data: dict = None,
+    copy_data: dict = None
+):
+    """Run the redesign crew in a worker thread, billing usage to the user"""
+    from crew.crews import OfferRedesignCrew
+    from crew.tracing import save_trace
+    
+    with usage_scope(user_id, plan):
+        crew = OfferRedesignCrew()
+        result = crew.redesign(text, metadata, gathered_data=gathered_data, copy_data=copy_data)
+    
+    try:
+        save_trace(crew.trace, user_id=user_id)
+    except Exception:
+        logger.warning(f"Redesign trace {crew.trace.trace_id} was not persisted")
+    return result, crew.stage_outputs
+
+@router.post("/redesign")
+async def redesign_offer_from_upload(
+    file: UploadFile = File(...),
+    force_regenerate: bool = Form(False),
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    try:
+        upload = await save_upload(file)
+    except DocumentError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    try:
+        # Identical bytes this user uploaded before: reuse everything derived from them
+        artifact = db.query(DocumentArtifact).filter(
+            DocumentArtifact.user_id == user.id,
+            DocumentArtifact.sha256 == upload.sha256
+        ).first()
+        if artifact and artifact.result and not force_regenerate:
+            artifact.hit_count = (artifact.hit_count or 0) + 1
+            db.commit()
+            return {**artifact.result, "cached": True, "sourceSha256": upload.sha256}
+        
+        enforce_generation_quota(user)
+        
+        if artifact and artifact.extracted_text:
+            text, pages = artifact.extracted_text, artifact.pages
+        else:
+            try:
+                document = await extract_document(upload)
+            except DocumentError as e:
+                generation_quota.release(user.id)
+                raise HTTPException(status_code=e.status_code, detail=str(e))
+            text, pages = document.text, document.pages
+    finally:
+        os.unlink(upload.path)
+    
+    # Partial outputs from an earlier run are reused unless a full regeneration was asked for
+    reuse = artifact is not None and not force_regenerate
+    gathered_data = artifact.gathered_data if reuse else None
+    copy_data = artifact.copy_data if reuse else None
+    user_id, plan = user.id, user.plan
+    # Don't hold a pooled connection for the length of the crew run
+    db.close()
+    
+    metadata = {
+        "filename": upload.filename,
+        "type": upload.kind,
+        "size_bytes": upload.size_bytes,
+        "pages": pages,
+        "sha256": upload.sha256
+    }
+    
+    # The crew makes blocking LLM calls; keep them off the event loop
+    result, stage_outputs = await run_in_threadpool(
+        _run_redesign, user_id, plan, text, metadata, gathered_data, copy_data
+    )
+    
+    await run_in_threadpool(_save_document_artifact, user_id, upload, pages, text, result, stage_outputs)
+    return {**result, "cached": False, "sourceSha256": upload.sha256}
+
+def _save_document_artifact(user_id: str, upload, pages: int, text: str, result: dict, stage_outputs: dict):
+    """Upsert the upload's derived outputs; losing a race to an identical upload counts as a hit"""
+    db = SessionLocal()
+    try:
+        artifact = db.query(DocumentArtifact).filter(
+            DocumentArtifact.user_id == user_id,
+            DocumentArtifact.sha256 == upload.sha256
+        ).first()
+        if artifact is None:
+            artifact = DocumentArtifact(
+                user_id=user_id,
+                sha256=upload.sha256,
+                filename=upload.filename,
+                kind=upload.kind,
+                size_bytes=upload.size_bytes
+            )
+            db.add(artifact)
+        artifact.pages = pages
+        artifact.extracted_text = text
+        artifact.gathered_data = stage_outputs.get("gathered_data") or artifact.gathered_data
+        artifact.copy_data = stage_outputs.get("copy_data") or artifact.copy_data
+        # Fallback output is not worth replaying on the next upload
+        if not result.get("fallback"):
+            artifact.result = result
+        db.commit()
+    except IntegrityError:
+        # A concurrent identical upload stored its artifact first; keep that one
+        db.rollback()
+        logger.info(f"Document artifact {upload.sha256[:12]} was stored concurrently")
+    finally:
+        db.close()
+
+def _run_batch_item(user_id: str, plan, offer_input: dict, index: int):
+    """Generate one batch offer in a worker thread; each one counts against the daily quota"""
+    from crew.crews import OfferCreationCrew
+    from crew.tracing import save_trace
+    
+    generation_quota.acquire(user_id, plan)
+    with usage_scope(user_id, plan):
+        crew = OfferCreationCrew()
+        result = crew.create(offer_input)
+    
+    try:
+        save_trace(crew.trace, user_id=user_id)
+    except Exception:
+        logger.warning(f"Batch trace {crew.trace.trace_id} was not persisted")
+    
+    if offer_input.get("clientName"):
+        result["clientName"] = offer_input["clientName"]
+    return result
+
+def _ndjson(event: dict) -> str:
+    return json.dumps(event, default=str) + "\n"
+
+@router.post("/batch")
+async def create_offer_batch(
+    batch_data: BatchCreate,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Generate offers for many inputs, streaming one NDJSON line per finished
+    offer. Offers are persisted in checkpointed chunks as they complete; a
+    client that reads slowly (or disconnects) throttles (or stops) the batch.
+    """
+    from crew.crews import BatchOfferProcessor
+    
+    total = len(batch_data.offers)
+    if not total:
+        raise HTTPException(status_code=400, detail="Batch contains no offers")
+    if total > settings.BATCH_MAX_OFFERS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batches are limited to {settings.BATCH_MAX_OFFERS} offers"
+        )
+    
+    limits = PLAN_LIMITS[user.plan]
+    current_count = db.query(Offer).filter(Offer.user_id == user.id).count()
+    if current_count + total > limits["offers"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="This batch would exceed your offer limit. Please upgrade your plan."
+        )
+    
+    batch = OfferBatch(user_id=user.id, total=total)
+    db.add(batch)
+    db.commit()
+    batch_id = batch.id
+    
+    processor = BatchOfferProcessor(
+        max_concurrent=settings.BATCH_MAX_CONCURRENT,
+        window=settings.BATCH_WINDOW,
+        process_fn=functools.partial(_run_batch_item, user.id, user.plan)
+    )
+    writer = BatchCheckpointWriter(
+        batch_id,
+        user.id,
+        edit_limit=limits["edits"],
+        chunk_size=settings.BATCH_CHECKPOINT_SIZE
+    )
+    
+    async def stream():
+        completed = failed = 0
+        final_status = "cancelled"
+        yield _ndjson({"event": "started", "batchId": batch_id, "total": total})
+        try:
+            async for outcome in processor.aiter_batch(batch_data.offers):
+                offer_id = writer.add(outcome)
+                if outcome["success"]:
+                    completed += 1
+                else:
+                    failed += 1
+                yield _ndjson({
+                    "event": "result",
+                    "index": outcome["index"],
+                    "success": outcome["success"],
+                    "offerId": offer_id,
+                    "error": outcome.get("error"),
+                    "completed": completed,
+                    "failed": failed,
+                    "total": total
+                })
+                if writer.due:
+                    await run_in_threadpool(writer.flush)
+                    yield _ndjson({"event": "checkpoint", "persisted": writer.persisted})
+            final_status = "completed"
+        finally:
+            # Shielded so a client disconnect still closes the batch and writes the last chunk
+            await asyncio.shield(run_in_threadpool(writer.finish, final_status))
+        yield _ndjson({
+            "event": "completed",
+            "batchId": batch_id,
+            "completed": completed,
+            "failed": failed,
+            "persisted": writer.persisted
+        })
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@router.get("/batch/{batch_id}")
+async def get_offer_batch(
+    batch_id: str,
+    include_items: bool = False,
+    offset: int = 0,
+    limit: int = 100,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    batch = db.query(OfferBatch).filter(
+        OfferBatch.id == batch_id,
+        OfferBatch.user_id == user.id
+    ).first()
+    
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    response = batch.to_dict()
+    if include_items:
+        items = db.query(OfferBatchItem).filter(
+            OfferBatchItem.batch_id == batch_id
+        ).order_by(OfferBatchItem.index).offset(offset).limit(min(limit, 500)).all()
+        response["items"] = [item.to_dict() for item in items]
+    return response
+
+@router.post("/export")
+async def export_offers_zip(
+    export_data: BulkExport,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Render many offers in the PDF pool and stream them back as one ZIP"""
+    offer_ids = list(dict.fromkeys(export_data.offerIds))
+    if not offer_ids:
+        raise HTTPException(status_code=400, detail="No offers selected")
+    if len(offer_ids) > settings.EXPORT_MAX_OFFERS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Exports are limited to {settings.EXPORT_MAX_OFFERS} offers"
+        )
+    
+    offers = db.query(Offer).filter(
+        Offer.id.in_(offer_ids),
+        Offer.user_id == user.id
+    ).all()
+    
+    if len(offers) != len(offer_ids):
+        raise HTTPException(status_code=404, detail="Offer not found")
+    
+    # Keep the requested order for naming; rendering order follows completion
+    by_id = {offer.id: offer for offer in offers}
+    documents = prepare_export([by_id[offer_id] for offer_id in offer_ids])
+    
+    return StreamingResponse(
+        stream_zip(documents),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": 'attachment; filename="offers.zip"'
+        }
+    )
+
+@router.post("/catalog")
+async def export_offer_catalog(
+    catalog_data: CatalogExport,
+    request: Request,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Render several offers into one PDF with a table of contents, in a single layout pass"""
+    offer_ids = list(dict.fromkeys(catalog_data.offerIds))
+    if not offer_ids:
+        raise HTTPException(status_code=400, detail="No offers selected")
+    if len(offer_ids) > settings.CATALOG_MAX_OFFERS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Catalogs are limited to {settings.CATALOG_MAX_OFFERS} offers"
+        )
+    try:
+        first_page, last_page = parse_page_range(catalog_data.pages)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    offers = db.query(Offer).filter(
+        Offer.id.in_(offer_ids),
+        Offer.user_id == user.id
+    ).all()
+    
+    if len(offers) != len(offer_ids):
+        raise HTTPException(status_code=404, detail="Offer not found")
+    
+    by_id = {offer.id: offer for offer in offers}
+    html_content, templates = build_catalog_html([by_id[offer_id] for offer_id in offer_ids], catalog_data.title)
+    key = catalog_key(html_content, templates, first_page, last_page)
+    
+    etag = f'"{key}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": 'attachment; filename="catalog.pdf"'
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    # Served from the artifact store so viewers can fetch byte ranges (Range requests)
+    if await run_in_threadpool(has_artifact, key):
+        response = artifact_response(key, headers)
+        if response is not None:
+            return response
+    
+    try:
+        pdf_content = await render_catalog(html_content, templates, key, first_page, last_page)
+    except PoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="PDF rendering is busy, please retry shortly",
+            headers={"Retry-After": "5"}
+        )
+    except WorkerPoolError as e:
+        logger.error(f"Catalog render failed: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="PDF rendering failed")
+    if not pdf_content:
+        raise HTTPException(
+            status_code=416,
+            detail="Page range is outside the catalog"
+        )
+    
+    if await run_in_threadpool(has_artifact, key):
+        response = artifact_response(key, headers)
+        if response is not None:
+            return response
+    return Response(content=pdf_content, media_type="application/pdf", headers=headers)
+
 @router.get("/{offer_id}")
 async def get_offer(
     offer_id: str,
@@ -104,9 +515,22 @@ async def create_offer(
     )
     
     db.add(offer)
+    db.flush()
+    
+    # Attach the generation trace that produced this offer, if any
+    if offer_data.traceId:
+        db.query(GenerationTrace).filter(
+            GenerationTrace.id == offer_data.traceId,
+            GenerationTrace.user_id == user.id,
+            GenerationTrace.offer_id.is_(None)
+        ).update({"offer_id": offer.id}, synchronize_session=False)
+    
     db.commit()
     db.refresh(offer)
     
+    if settings.PDF_PRERENDER_ENABLED:
+        get_prerenderer().schedule(offer.id)
+    
     return offer.to_dict()
 
 @router.put("/{offer_id}")
@@ -131,6 +555,9 @@ async def update_offer(
             detail="You have reached your edit limit for this offer"
         )
     
+    # Stored PDFs are shared by identical renders, so the old one is left to LRU eviction
+    previous_render = render_key(offer)
+    
     # Update fields
     update_data = offer_data.dict(exclude_unset=True)
     for field, value in update_data.items():
@@ -153,6 +580,9 @@ async def update_offer(
     db.commit()
     db.refresh(offer)
     
+    if render_key(offer) != previous_render and settings.PDF_PRERENDER_ENABLED:
+        get_prerenderer().schedule(offer.id)
+    
     return offer.to_dict()
 
 @router.delete("/{offer_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -171,15 +601,31 @@ async def delete_offer(
     
     db.delete(offer)
     db.commit()
+    get_prerenderer().cancel(offer_id)
     
     return None
 
-@router.post("/{offer_id}/export")
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+@router.api_route("/{offer_id}/export", methods=["GET", "POST"])
 async def export_offer_pdf(
     offer_id: str,
+    request: Request,
+    format: str = "pdf",
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    """Export an offer as pdf (default), docx, html or md"""
+    if format != "pdf" and format not in EXPORTERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown format, expected one of: {', '.join(['pdf', *EXPORTERS])}"
+        )
+    
     offer = db.query(Offer).filter(
         Offer.id == offer_id,
         Offer.user_id == user.id
@@ -188,14 +634,176 @@ async def export_offer_pdf(
     if not offer:
         raise HTTPException(status_code=404, detail="Offer not found")
     
-    # Generate PDF
-    pdf_content = generate_pdf(offer)
+    # Strong ETag: the render key changes with any rendered field, the template or the renderer
+    etag = f'"{render_key(offer)}"' if format == "pdf" else f'"{render_key(offer)}-{format}"'
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+    
+    if format != "pdf":
+        # The document tree is cached per offer version; only serialization runs here
+        exporter = EXPORTERS[format]
+        content = await run_in_threadpool(exporter.serialize, get_document(offer))
+        return Response(
+            content=content,
+            media_type=exporter.media_type,
+            headers={
+                **cache_headers,
+                "Content-Disposition": f'attachment; filename="{offer.title}.{exporter.extension}"'
+            }
+        )
+    
+    headers = {
+        **cache_headers,
+        "Content-Disposition": f'attachment; filename="{offer.title}.pdf"'
+    }
+    try:
+        pdf_content = await ensure_offer_pdf(offer)
+        if pdf_content is None:
+            # Already stored: served by the artifact store without loading it into memory
+            response = artifact_response(render_key(offer), headers)
+            if response is not None:
+                return response
+            # Evicted since ensure_offer_pdf checked: render it again
+            pdf_content = await get_offer_pdf(offer)
+    except PoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="PDF rendering is busy, please retry shortly",
+            headers={"Retry-After": "5"}
+        )
+    except WorkerPoolError as e:
+        logger.error(f"PDF render failed for offer {offer_id}: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="PDF rendering failed")
     
-    from fastapi.responses import Response
     return Response(
         content=pdf_content,
         media_type="application/pdf",
-        headers={
-            "Content-Disposition": f'attachment; filename="{offer.title}.pdf"'
-        }
+        headers=headers
     )
+
+def _run_personalization(user_id: str, plan, offer_fields: dict, clients: List[dict], fields: List[str]):
+    """Run per-client LLM personalization in a worker thread, billed to the user"""
+    from crew.crews import OfferPersonalizationCrew
+    from crew.tracing import save_trace
+    
+    with usage_scope(user_id, plan):
+        crew = OfferPersonalizationCrew()
+        results = crew.personalize(offer_fields, clients, fields)
+    
+    try:
+        save_trace(crew.trace, user_id=user_id)
+    except Exception:
+        logger.warning(f"Personalization trace {crew.trace.trace_id} was not persisted")
+    return results
+
+@router.post("/{offer_id}/personalize", status_code=status.HTTP_201_CREATED)
+async def personalize_offer(
+    offer_id: str,
+    request: PersonalizeRequest,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Create one variant of an offer per client. Copy and design come from the
+    base offer; {{placeholders}} are filled per client, and only llmFields
+    (if any) go through the LLM. All variants are inserted in one statement.
+    """
+    base = db.query(Offer).filter(
+        Offer.id == offer_id,
+        Offer.user_id == user.id
+    ).first()
+    
+    if not base:
+        raise HTTPException(status_code=404, detail="Offer not found")
+    
+    total = len(request.clients)
+    if not total:
+        raise HTTPException(status_code=400, detail="No clients given")
+    if total > settings.PERSONALIZE_MAX_CLIENTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Personalization is limited to {settings.PERSONALIZE_MAX_CLIENTS} clients per request"
+        )
+    
+    unknown = set(request.llmFields) - set(personalization.LLM_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Fields can't be personalized: {', '.join(sorted(unknown))}"
+        )
+    
+    limits = PLAN_LIMITS[user.plan]
+    current_count = db.query(Offer).filter(Offer.user_id == user.id).count()
+    if current_count + total > limits["offers"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="These variants would exceed your offer limit. Please upgrade your plan."
+        )
+    
+    clients = [client.dict() for client in request.clients]
+    llm_results = [None] * total
+    if request.llmFields:
+        # The whole fan-out counts as one generation
+        enforce_generation_quota(user)
+        llm_results = await run_in_threadpool(
+            _run_personalization,
+            user.id,
+            user.plan,
+            personalization.base_fields(base),
+            clients,
+            request.llmFields
+        )
+    
+    overrides = [personalization.clean_llm_fields(generated, request.llmFields) for generated in llm_results]
+    rows = [
+        personalization.variant_row(base, client, user.id, limits["edits"], overrides=override)
+        for client, override in zip(clients, overrides)
+    ]
+    db.bulk_insert_mappings(Offer, rows)
+    db.commit()
+    
+    return {
+        "baseOfferId": base.id,
+        "created": len(rows),
+        "templated": personalization.has_placeholders(base),
+        "llmPersonalized": sum(1 for override in overrides if override),
+        "offers": [{"id": row["id"], "clientName": row["client_name"]} for row in rows]
+    }
+
+@router.get("/{offer_id}/traces")
+async def get_offer_traces(
+    offer_id: str,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    offer = db.query(Offer).filter(
+        Offer.id == offer_id,
+        Offer.user_id == user.id
+    ).first()
+    
+    if not offer:
+        raise HTTPException(status_code=404, detail="Offer not found")
+    
+    traces = db.query(GenerationTrace).filter(
+        GenerationTrace.offer_id == offer_id
+    ).order_by(GenerationTrace.created_at.desc()).all()
+    
+    return [trace.to_dict() for trace in traces]
+
+@router.get("/traces/{trace_id}")
+async def get_trace(
+    trace_id: str,
+    include_inputs: bool = False,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    trace = db.query(GenerationTrace).filter(
+        GenerationTrace.id == trace_id,
+        GenerationTrace.user_id == user.id
+    ).first()
+    
+    if not trace:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    
+    return trace.to_dict(include_inputs=include_inputs)
@@ -0,0 +1,155 @@
+"""
+Live offer preview over WebSocket.
+
+Connect to /api/v1/preview/ws?token=<access token>[&offerId=<id>]. The
+server answers with a full snapshot, then accepts messages of the form
+
+    {"type": "patch", "seq": 7, "fields": {"title": "...", "price": {...}}}
+    {"type": "patch", "field": "title", "value": "..."}
+    {"type": "snapshot"}
+
+Patches arriving within PREVIEW_DEBOUNCE_MS of each other are rendered
+together, and each render sends {"type": "diff", "version", "ack",
+"sections": {name: html}, "brand"} carrying only the sections whose markup
+changed; the client replaces the [data-section=name] element. Nothing is
+saved: persist edits with PUT /api/v1/offers/{id}.
+"""
+from typing import Optional
+import asyncio
+import json
+import logging
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+
+from core.config import settings
+from core.database import SessionLocal
+from core.security import decode_token
+from models.offer import Offer
+from services.live_preview import PreviewSession, preview_sessions
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Application close codes (4000-4999)
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_NOT_FOUND = 4404
+
+
+def _load_session(user_id: str, offer_id: Optional[str]) -> Optional[PreviewSession]:
+    """Preview state seeded from the saved offer (read-only), or a blank offer"""
+    if not offer_id:
+        return PreviewSession()
+    db = SessionLocal()
+    try:
+        offer = db.query(Offer).filter(Offer.id == offer_id, Offer.user_id == user_id).first()
+        return PreviewSession.from_offer(offer) if offer else None
+    finally:
+        db.close()
+
+
+def _user_id(token: Optional[str]) -> Optional[str]:
+    # Browsers can't set headers on a WebSocket handshake, so the token comes in the query
+    if not token:
+        return None
+    try:
+        return decode_token(token).get("sub")
+    except Exception:
+        return None
+
+
+def _apply(session: PreviewSession, raw: str):
+    """Queue one client message on the session; raises ValueError if malformed"""
+    if len(raw) > settings.PREVIEW_MAX_MESSAGE_BYTES:
+        raise ValueError("Message too large")
+    try:
+        message = json.loads(raw)
+    except json.JSONDecodeError:
+        raise ValueError("Invalid JSON")
+    if not isinstance(message, dict):
+        raise ValueError("Message must be an object")
+
+    kind = message.get("type", "patch")
+    if kind == "snapshot":
+        session.request_snapshot()
+    elif kind == "patch":
+        if "fields" in message:
+            fields = message["fields"]
+            if not isinstance(fields, dict):
+                raise ValueError("fields must be an object")
+        elif "field" in message:
+            fields = {message["field"]: message.get("value")}
+        else:
+            raise ValueError("Patch needs fields or field/value")
+        seq = message.get("seq")
+        session.patch(fields, seq=seq if isinstance(seq, int) else None)
+    else:
+        raise ValueError(f"Unknown message type: {kind}")
+
+
+async def _read(websocket: WebSocket, inbox: asyncio.Queue):
+    try:
+        while True:
+            inbox.put_nowait(await websocket.receive_text())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        inbox.put_nowait(None)
+
+
+@router.websocket("/ws")
+async def preview_socket(websocket: WebSocket, token: Optional[str] = None, offerId: Optional[str] = None):
+    user_id = _user_id(token)
+    if user_id is None:
+        await websocket.close(code=CLOSE_UNAUTHORIZED)
+        return
+    session = await run_in_threadpool(_load_session, user_id, offerId)
+    if session is None:
+        await websocket.close(code=CLOSE_NOT_FOUND)
+        return
+
+    await websocket.accept()
+    preview_sessions.labels().inc()
+    inbox: asyncio.Queue = asyncio.Queue()
+    reader = asyncio.ensure_future(_read(websocket, inbox))
+    loop = asyncio.get_running_loop()
+    debounce = settings.PREVIEW_DEBOUNCE_MS / 1000
+    max_delay = settings.PREVIEW_MAX_DELAY_MS / 1000
+
+    try:
+        await websocket.send_json(session.flush())
+        closed = False
+        while not closed:
+            raw = await inbox.get()
+            if raw is None:
+                break
+            deadline = loop.time() + max_delay
+            while True:
+                if raw is None:
+                    closed = True
+                    break
+                try:
+                    _apply(session, raw)
+                except ValueError as e:
+                    await websocket.send_json({"type": "error", "detail": str(e)})
+
+                # Keep absorbing patches while the user is still typing
+                timeout = min(debounce, deadline - loop.time())
+                if timeout <= 0:
+                    break
+                try:
+                    raw = await asyncio.wait_for(inbox.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+            update = session.flush()
+            if update is not None and not closed:
+                await websocket.send_json(update)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Live preview connection failed: {str(e)}")
+    finally:
+        reader.cancel()
+        preview_sessions.labels().dec()
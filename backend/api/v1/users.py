@@ -1,6 +1,11 @@
 from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from core.database import get_db
 from core.security import get_current_user
 from models.user import User
+from models.token_ledger import TokenLedgerEntry
+from api.v1.offers import generation_quota
 
 router = APIRouter()
 
@@ -8,6 +13,27 @@ router = APIRouter()
 async def get_profile(user: User = Depends(get_current_user)):
     return user.to_dict()
 
+@router.get("/usage")
+async def get_usage(
+    days: int = 30,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # Ledger days are UTC
+    since = datetime.utcnow().date() - timedelta(days=days)
+    entries = db.query(TokenLedgerEntry).filter(
+        TokenLedgerEntry.user_id == user.id,
+        TokenLedgerEntry.day >= since
+    ).order_by(TokenLedgerEntry.day.desc(), TokenLedgerEntry.stage).all()
+    
+    limit = generation_quota.limit_for(user.plan)
+    return {
+        "generationsToday": generation_quota.used(user.id),
+        "generationLimit": None if limit == float('inf') else int(limit),
+        "ledger": [entry.to_dict() for entry in entries],
+        "asOf": datetime.utcnow().isoformat()
+    }
+
 @router.put("/profile")
 async def update_profile(user: User = Depends(get_current_user)):
     # Implement profile update logic
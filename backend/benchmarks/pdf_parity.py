@@ -0,0 +1,138 @@
+"""
+Visual parity between the direct PDF writer and WeasyPrint.
+
+    python -m benchmarks.pdf_parity [--dpi 50] [--tolerance 2.0] [--diffs DIR]
+
+Renders synthetic standard-layout offers both ways, rasterizes every page
+and compares the images pixel by pixel. A case passes when both PDFs have
+the same page count and, on every page, at most --tolerance percent of the
+pixels differ by more than --threshold (0-255, any channel). Anti-aliasing
+and sub-pixel glyph positioning stay under the threshold; a line broken in
+a different place, a shifted box or a missing background does not.
+
+Exits with status 1 if any case fails. PDF_DIRECT_RENDERER should only be
+turned on for a deployment once this passes with that machine's fonts
+(WeasyPrint needs Pango, so run it where the API runs). --diffs writes a
+side-by-side PNG for each failing page.
+
+Rasterizing needs PyMuPDF (pip install pymupdf); it is not an app dependency.
+"""
+from typing import Dict, List, Optional
+import argparse
+import itertools
+import os
+import sys
+
+from benchmarks.pdf_render import synthetic_offer
+from services import pdf_direct
+from services.pdf_service import generate_html, render_html_to_pdf
+
+FEATURE_COUNTS = (0, 5, 20, 50)
+DESCRIPTION_LENGTHS = (200, 5000)  # characters
+CLIENTS = (None, "Acme & Co")
+
+
+def rasterize(pdf_content: bytes, dpi: int) -> List["Image.Image"]:
+    try:
+        import fitz
+    except ImportError:
+        sys.exit("benchmarks.pdf_parity needs PyMuPDF: pip install pymupdf")
+    from PIL import Image
+
+    pages = []
+    with fitz.open(stream=pdf_content, filetype="pdf") as document:
+        for page in document:
+            pixmap = page.get_pixmap(dpi=dpi, alpha=False)
+            pages.append(Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples))
+    return pages
+
+
+def page_difference(expected: "Image.Image", actual: "Image.Image", threshold: int) -> float:
+    """Percent of pixels whose largest channel difference exceeds threshold"""
+    from PIL import ImageChops
+
+    if expected.size != actual.size:
+        return 100.0
+    diff = ImageChops.difference(expected, actual)
+    # Per-pixel maximum over the channels
+    channels = diff.split()
+    peak = channels[0]
+    for channel in channels[1:]:
+        peak = ImageChops.lighter(peak, channel)
+    differing = sum(peak.point(lambda value: 255 if value > threshold else 0).histogram()[255:])
+    return differing / (expected.width * expected.height) * 100
+
+
+def _save_diff(path: str, expected: "Image.Image", actual: "Image.Image"):
+    from PIL import Image
+
+    canvas = Image.new("RGB", (expected.width + actual.width, max(expected.height, actual.height)), "white")
+    canvas.paste(expected, (0, 0))
+    canvas.paste(actual, (expected.width, 0))
+    canvas.save(path)
+
+
+def compare_case(offer, dpi: int, threshold: int) -> Dict:
+    """Rasterized pages of both renders and their worst per-page difference"""
+    expected = rasterize(render_html_to_pdf(generate_html(offer), offer.template), dpi)
+    actual = rasterize(pdf_direct.render(offer), dpi)
+    differences = [
+        page_difference(weasy_page, direct_page, threshold)
+        for weasy_page, direct_page in zip(expected, actual)
+    ]
+    return {
+        "pages": list(zip(expected, actual)),
+        "page_counts": (len(expected), len(actual)),
+        "worst_page_pct": max(differences, default=0.0)
+    }
+
+
+def run(dpi: int, threshold: int, tolerance: float, diffs: Optional[str] = None) -> List[str]:
+    """Print one line per case; returns the failing cases"""
+    if not pdf_direct.load_fonts():
+        sys.exit("No fonts for the direct writer on this machine (see PDF_DIRECT_FONT*)")
+    if diffs:
+        os.makedirs(diffs, exist_ok=True)
+
+    failures = []
+    print(f"{'case':<50}{'pages':>12}{'worst page':>12}")
+    for features, description, client in itertools.product(FEATURE_COUNTS, DESCRIPTION_LENGTHS, CLIENTS):
+        offer = synthetic_offer("modern", features, description, 0, "")
+        offer.client_name = client
+        case = f"features={features}/description={description}/client={'yes' if client else 'no'}"
+        if not pdf_direct.supports(offer):
+            print(f"{case:<50}{'unsupported':>12}")
+            continue
+        result = compare_case(offer, dpi, threshold)
+        weasy_pages, direct_pages = result["page_counts"]
+        failed = weasy_pages != direct_pages or result["worst_page_pct"] > tolerance
+        if failed:
+            failures.append(case)
+            if diffs:
+                for number, (weasy_page, direct_page) in enumerate(result["pages"], start=1):
+                    path = os.path.join(diffs, f"{case.replace('/', '_')}-p{number}.png")
+                    _save_diff(path, weasy_page, direct_page)
+        print(
+            f"{case:<50}{f'{weasy_pages} / {direct_pages}':>12}{result['worst_page_pct']:>11.2f}%"
+            f"{'  <- fails' if failed else ''}"
+        )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare direct-writer PDFs with WeasyPrint's")
+    parser.add_argument("--dpi", type=int, default=50)
+    parser.add_argument("--threshold", type=int, default=64, help="per-pixel channel difference ignored (0-255)")
+    parser.add_argument("--tolerance", type=float, default=2.0, help="max percent of differing pixels per page")
+    parser.add_argument("--diffs", help="write side-by-side PNGs of failing pages here")
+    args = parser.parse_args()
+
+    failures = run(args.dpi, args.threshold, args.tolerance, args.diffs)
+    if failures:
+        print(f"\n{len(failures)} case(s) differ beyond {args.tolerance}%; keep PDF_DIRECT_RENDERER off")
+        sys.exit(1)
+    print("\nDirect writer matches WeasyPrint within tolerance")
+
+
+if __name__ == "__main__":
+    main()
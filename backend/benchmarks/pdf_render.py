@@ -0,0 +1,281 @@
+"""
+Offer PDF rendering benchmark across templates, content sizes and images.
+
+    python -m benchmarks.pdf_render [--iterations N] [--quick]
+    python -m benchmarks.pdf_render --save benchmarks/results/baseline.json
+    python -m benchmarks.pdf_render --compare benchmarks/results/baseline.json
+    python -m benchmarks.pdf_render --renderer both --quick
+
+Every case renders a synthetic offer through services.pdf_service.generate_pdf
+and records wall time, peak RSS and PDF size. Each case runs in its own
+forked process, so peak RSS belongs to that case alone, while fonts and
+stylesheets warmed in the parent are shared. Images are generated locally and
+served from a stand-in HTTP server, then prefetched into a scratch asset
+cache, so renders read them the way production repeat renders do.
+
+--renderer picks the path: "auto" (generate_pdf, which uses the direct
+writer where it applies), "weasyprint", "direct", or "both" to measure the
+two side by side; direct cases the writer can't draw (offers with images)
+are skipped.
+
+--compare prints the change against a saved run and exits with status 1 when
+any case is slower or larger than --threshold percent; paste the table into
+the review of template or renderer changes.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import weasyprint
+
+from core.config import settings
+from models import user  # noqa: F401 - resolves the Offer.user relationship
+from models.offer import Offer
+from services import assets, pdf_direct
+from services.pdf_service import TEMPLATE_VERSION, generate_html, generate_pdf, render_html_to_pdf
+from services.pdf_templates import TEMPLATES
+
+FEATURE_COUNTS = (0, 5, 20, 50)
+DESCRIPTION_LENGTHS = (200, 5000)  # characters
+IMAGE_COUNTS = (0, 2, 6)
+QUICK = {"features": (0, 50), "descriptions": (200,), "images": (0, 6)}
+
+_SENTENCE = "Our team rebuilds your outbound engine, rewrites positioning and coaches closers. "
+
+
+def _image_bytes(index: int) -> bytes:
+    """A 1600x1000 photo-sized PNG, different per index so each is its own asset"""
+    from PIL import Image
+    image = Image.new("RGB", (1600, 1000), ((index * 40) % 256, 120, 200))
+    for x in range(0, 1600, 50):
+        image.paste((255 - (x % 256), index * 20 % 256, x % 256), (x, 0, x + 25, 1000))
+    out = BytesIO()
+    image.save(out, "PNG")
+    return out.getvalue()
+
+
+def _serve_images(count: int) -> str:
+    """Start a local image server on a daemon thread; returns its base URL"""
+    images = {f"/img/{index}.png": _image_bytes(index) for index in range(count)}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            body = images.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def synthetic_offer(template: str, features: int, description: int, images: int, image_base: str) -> Offer:
+    return Offer(
+        title="Revenue Acceleration Program",
+        subtitle="Double qualified pipeline in 90 days",
+        description=(_SENTENCE * (description // len(_SENTENCE) + 1))[:description],
+        client_name="Acme & Co",
+        price_amount=4997,
+        price_currency="USD",
+        price_interval="one-time",
+        features=[f"Weekly strategy session {idx} with a senior closer" for idx in range(1, features + 1)],
+        template=template,
+        brand_colors={"primary": "#0f766e", "secondary": "#14b8a6", "accent": "#f59e0b"},
+        logo_url=f"{image_base}/img/0.png" if images else None,
+        images=[f"{image_base}/img/{idx}.png" for idx in range(images)]
+    )
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+RENDERERS = {
+    "auto": generate_pdf,
+    "weasyprint": lambda offer: render_html_to_pdf(generate_html(offer), offer.template),
+    "direct": pdf_direct.render
+}
+
+
+def _run_case(offer: Offer, iterations: int, renderer: str = "auto") -> dict:
+    """Measure one case (runs in a fresh child process)"""
+    render = RENDERERS[renderer]
+    render(offer)  # First render of this shape outside the measurement
+    samples, size = [], 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        size = len(render(offer))
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "mean_ms": statistics.mean(samples),
+        "p50_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "min_ms": samples[0],
+        "peak_rss_mb": _peak_rss_mb(),
+        "pdf_bytes": size
+    }
+
+
+def run(
+    iterations: int,
+    quick: bool = False,
+    templates: Optional[List[str]] = None,
+    renderers: Tuple[str, ...] = ("auto",)
+) -> Dict[str, dict]:
+    feature_counts = QUICK["features"] if quick else FEATURE_COUNTS
+    descriptions = QUICK["descriptions"] if quick else DESCRIPTION_LENGTHS
+    image_counts = QUICK["images"] if quick else IMAGE_COUNTS
+    templates = templates or sorted(TEMPLATES)
+
+    image_base = _serve_images(max(image_counts))
+    settings.ASSET_ALLOWED_PRIVATE_HOSTS = "127.0.0.1"
+    assets._asset_cache = assets.AssetCache(tempfile.mkdtemp(prefix="bench-assets-"), 512 * 1024 * 1024)
+    assets.get_asset_cache().prefetch(f"{image_base}/img/{idx}.png" for idx in range(max(image_counts)))
+
+    # Warm WeasyPrint, fonts and stylesheets once; forked cases inherit them
+    for renderer in renderers:
+        RENDERERS[renderer](synthetic_offer(templates[0], 5, 200, 0, image_base))
+    method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    context = multiprocessing.get_context(method)
+    # Under "python -m" this file is __main__; hand the pool the importable copy of _run_case
+    from benchmarks.pdf_render import _run_case as run_case
+
+    results = {}
+    cases = list(itertools.product(renderers, templates, feature_counts, descriptions, image_counts))
+    for number, (renderer, template, features, description, images) in enumerate(cases, start=1):
+        case = f"{template}/features={features}/description={description}/images={images}"
+        if renderer != "auto":
+            case = f"{renderer}:{case}"
+        offer = synthetic_offer(template, features, description, images, image_base)
+        if renderer == "direct" and not pdf_direct.supports(offer):
+            continue
+        with context.Pool(1, maxtasksperchild=1) as pool:
+            results[case] = pool.apply(run_case, (offer, iterations, renderer))
+        print(f"[{number}/{len(cases)}] {case}: {results[case]['mean_ms']:.1f} ms", file=sys.stderr)
+    return results
+
+
+def environment() -> dict:
+    return {
+        "weasyprint": weasyprint.__version__,
+        "template_version": TEMPLATE_VERSION,
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "cpus": os.cpu_count()
+    }
+
+
+def print_results(results: Dict[str, dict]):
+    print(f"{'case':<70}{'mean ms':>10}{'p95 ms':>10}{'peak MB':>10}{'PDF KB':>10}")
+    for case, result in results.items():
+        print(
+            f"{case:<70}{result['mean_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+            f"{result['peak_rss_mb']:>10.1f}{result['pdf_bytes'] / 1024:>10.1f}"
+        )
+
+
+def print_speedups(results: Dict[str, dict]):
+    """Direct writer against WeasyPrint for every case both rendered"""
+    print(f"\n{'case':<70}{'speedup':>10}{'RSS saved':>11}{'size':>10}")
+    for case, direct in results.items():
+        if not case.startswith("direct:"):
+            continue
+        weasy = results.get("weasyprint:" + case[len("direct:"):])
+        if weasy is None:
+            continue
+        print(
+            f"{case[len('direct:'):]:<70}{weasy['mean_ms'] / direct['mean_ms']:>9.1f}x"
+            f"{weasy['peak_rss_mb'] - direct['peak_rss_mb']:>8.1f} MB"
+            f"{direct['pdf_bytes'] / weasy['pdf_bytes'] * 100:>9.0f}%"
+        )
+
+
+def compare(results: Dict[str, dict], baseline: dict, threshold: float) -> List[str]:
+    """Print per-case changes against a saved run; returns the regressed cases"""
+    if baseline.get("environment") != environment():
+        print(f"Note: baseline environment differs: {baseline.get('environment')}\n")
+
+    regressions = []
+    print(f"{'case':<70}{'time':>10}{'peak RSS':>10}{'size':>10}")
+    for case, result in results.items():
+        before = baseline["results"].get(case)
+        if before is None:
+            print(f"{case:<70}{'new':>10}")
+            continue
+        changes = {
+            metric: (result[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+            for metric in ("mean_ms", "peak_rss_mb", "pdf_bytes")
+        }
+        regressed = any(change > threshold for change in changes.values())
+        if regressed:
+            regressions.append(case)
+        print(
+            f"{case:<70}{changes['mean_ms']:>+9.1f}%{changes['peak_rss_mb']:>+9.1f}%"
+            f"{changes['pdf_bytes']:>+9.1f}%{'  <- regression' if regressed else ''}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offer PDF rendering")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="a smaller matrix for quick checks")
+    parser.add_argument("--template", action="append", help="limit to a template (repeatable)")
+    parser.add_argument(
+        "--renderer", choices=["auto", "weasyprint", "direct", "both"], default="auto",
+        help="rendering path to measure"
+    )
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare against results saved with --save")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    renderers = ("weasyprint", "direct") if args.renderer == "both" else (args.renderer,)
+    results = run(args.iterations, quick=args.quick, templates=args.template, renderers=renderers)
+    print_results(results)
+    if args.renderer == "both":
+        print_speedups(results)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({"environment": environment(), "iterations": args.iterations, "results": results}, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print()
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0f}%")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
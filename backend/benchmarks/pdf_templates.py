@@ -0,0 +1,82 @@
+"""
+Per-render cost of offer PDFs before and after the template registry.
+
+    python -m benchmarks.pdf_templates [--iterations N]
+
+"before" renders HTML with the stylesheet inlined, so WeasyPrint parses the
+CSS on every render (what generate_html used to produce). "after" renders the
+compiled template's HTML with the stylesheet parsed once and reused.
+"""
+from io import BytesIO
+import argparse
+import statistics
+import time
+
+from weasyprint import HTML
+
+from models import user  # noqa: F401 - resolves the Offer.user relationship
+from models.offer import Offer
+from services.pdf_templates import get_template
+
+
+def sample_offer() -> Offer:
+    return Offer(
+        title="Revenue Acceleration Program",
+        subtitle="Double qualified pipeline in 90 days",
+        description="A done-with-you program covering positioning, outbound and <b>closing</b>. " * 8,
+        client_name="Acme & Co",
+        price_amount=4997,
+        price_currency="USD",
+        price_interval="one-time",
+        features=[f"Weekly strategy session {idx}" for idx in range(1, 11)],
+        template="modern",
+        brand_colors={"primary": "#0f766e", "secondary": "#14b8a6", "accent": "#f59e0b"}
+    )
+
+
+def _time(func, iterations: int) -> dict:
+    func()  # Warm fonts and imports outside the measurement
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "mean_ms": statistics.mean(samples),
+        "p50_ms": statistics.median(samples),
+        "min_ms": min(samples)
+    }
+
+
+def run(iterations: int) -> dict:
+    offer = sample_offer()
+    template = get_template(offer.template)
+
+    def before():
+        HTML(string=template.render(offer, inline_css=True)).write_pdf(BytesIO())
+
+    def after():
+        HTML(string=template.render(offer)).write_pdf(BytesIO(), stylesheets=[template.stylesheet()])
+
+    return {
+        "html_only": _time(lambda: template.render(offer), iterations * 10),
+        "before": _time(before, iterations),
+        "after": _time(after, iterations)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offer PDF rendering")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    print(f"{'case':<12}{'mean ms':>10}{'p50 ms':>10}{'min ms':>10}")
+    for case, timing in results.items():
+        print(f"{case:<12}{timing['mean_ms']:>10.2f}{timing['p50_ms']:>10.2f}{timing['min_ms']:>10.2f}")
+    saved = results["before"]["mean_ms"] - results["after"]["mean_ms"]
+    print(f"\nStylesheet reuse saves {saved:.2f} ms per render ({saved / results['before']['mean_ms'] * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,12 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: str = ""
     AWS_REGION: str = "us-east-1"
     S3_BUCKET: str = "closealead-offers"
+    S3_ENDPOINT_URL: str = ""  # S3-compatible service (e.g. MinIO) instead of AWS
+    S3_PREFIX: str = "artifacts"
+    S3_PRESIGN_EXPIRES: int = 300
+    
+    # Where rendered artifacts live: "local" (PDF_ARTIFACT_DIR) or "s3" (S3_BUCKET)
+    ARTIFACT_STORE: str = "local"
     
     # Stripe
     STRIPE_SECRET_KEY: str = ""
@@ -34,6 +40,100 @@ class Settings(BaseSettings):
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000"
     
+    # Document uploads (redesign flow)
+    UPLOAD_MAX_BYTES: int = 20 * 1024 * 1024
+    EXTRACTION_WORKERS: int = 2
+    EXTRACTION_TIMEOUT: int = 30  # seconds per file
+    EXTRACTION_MEMORY_LIMIT_MB: int = 512  # address-space cap per worker
+    EXTRACTION_MAX_PAGES: int = 200
+    EXTRACTION_MAX_CHARS: int = 400_000
+    
+    # Long-document redesign (map-reduce extraction)
+    REDESIGN_CHUNK_TOKEN_BUDGET: int = 3000
+    REDESIGN_MAX_CHUNKS: int = 16
+    REDESIGN_MAX_PARALLEL_CHUNKS: int = 4
+    # Skip the LLM gatherer when local extraction is at least this confident (0-1)
+    REDESIGN_LOCAL_CONFIDENCE: float = 0.75
+    
+    # Cross-request micro-batching of LLM stage calls (window 0 disables)
+    LLM_MICROBATCH_WINDOW_MS: float = 25.0
+    LLM_MICROBATCH_MAX_BATCH: int = 8  # further capped so answers fit the agent's max_tokens
+    LLM_MICROBATCH_STAGES: str = "copywriting,copy_enhancement,quality_assurance,personalization"
+    
+    # Batch generation
+    BATCH_MAX_OFFERS: int = 5000
+    BATCH_MAX_CONCURRENT: int = 3
+    BATCH_WINDOW: int = 8  # offers in flight at once (bounds memory)
+    BATCH_CHECKPOINT_SIZE: int = 25  # finished offers per DB transaction
+    
+    # PDF rendering
+    PDF_RENDER_WORKERS: int = 2
+    PDF_RENDER_TIMEOUT: int = 60  # seconds per document
+    PDF_RENDER_QUEUE_TIMEOUT: float = 30.0  # max wait for a free render worker
+    PDF_RENDER_MAX_TASKS_PER_CHILD: int = 100
+    PDF_RENDER_PREWARM: bool = True  # start render workers with the API
+    PDF_ARTIFACT_DIR: str = ""  # defaults to <tmp>/closealead-pdf
+    PDF_CACHE_MAX_MB: int = 512  # least recently used PDFs are evicted beyond this
+    # Draw the standard layout straight to PDF (services/pdf_direct.py); WeasyPrint handles the rest.
+    # Enable only once `python -m benchmarks.pdf_parity` passes with the deployment's fonts
+    PDF_DIRECT_RENDERER: bool = False
+    PDF_DIRECT_FONT: str = ""  # TrueType paths; found with fc-match when empty
+    PDF_DIRECT_FONT_BOLD: str = ""
+    PDF_DIRECT_FONT_SYMBOL: str = ""  # fallback for the feature check mark
+    # Background pre-render after create/update; edits within the debounce collapse into one render
+    PDF_PRERENDER_ENABLED: bool = True
+    PDF_PRERENDER_DEBOUNCE: float = 3.0
+    PDF_PRERENDER_CONCURRENCY: int = 1
+    EXPORT_MAX_OFFERS: int = 200
+    CATALOG_MAX_OFFERS: int = 50  # offers in one single-pass catalog PDF
+    CATALOG_RENDER_TIMEOUT: int = 300  # seconds for the whole catalog layout
+    DOCUMENT_MODEL_CACHE_SIZE: int = 256  # offer versions whose export tree stays in memory
+    # Logos/images for PDFs are fetched once into a local cache; renders never wait on the network twice
+    ASSET_CACHE_DIR: str = ""  # defaults to <tmp>/closealead-assets
+    ASSET_CACHE_MAX_MB: int = 256
+    ASSET_FETCH_TIMEOUT: float = 5.0  # seconds per asset, whole download
+    ASSET_FETCH_CONCURRENCY: int = 4
+    ASSET_MAX_BYTES: int = 10 * 1024 * 1024
+    ASSET_MAX_DIMENSION: int = 1600  # px; larger images are downscaled once when cached
+    # Asset URLs must resolve to public addresses; listed hosts are exempt (local stand-ins in tests)
+    ASSET_ALLOWED_PRIVATE_HOSTS: str = ""
+    ASSET_TTL: int = 86400  # re-check cached assets before renders after this many seconds
+    ASSET_FAILURE_TTL: int = 300  # don't retry a failed URL sooner than this
+    
+    # Live preview over WebSocket: patches within the debounce window render together,
+    # but a continuous stream of edits still flushes at least every PREVIEW_MAX_DELAY_MS
+    PREVIEW_DEBOUNCE_MS: float = 40.0
+    PREVIEW_MAX_DELAY_MS: float = 250.0
+    PREVIEW_MAX_MESSAGE_BYTES: int = 65536
+    
+    # Personalization fan-out
+    PERSONALIZE_MAX_CLIENTS: int = 1000
+    PERSONALIZE_MAX_PARALLEL: int = 8
+    
+    # Durable job queue (see worker.py)
+    JOB_VISIBILITY_TIMEOUT: int = 300  # seconds a lease lasts without a heartbeat
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF: int = 30  # seconds before the first retry, doubled per attempt
+    JOB_RETRY_BACKOFF_MAX: int = 3600
+    JOB_POLL_INTERVAL: float = 1.0
+    JOB_WORKER_CONCURRENCY: int = 2
+    # Completed results are compressed after this many seconds and dropped after the TTL
+    JOB_RESULT_COMPRESS_AFTER: int = 3600
+    JOB_RESULT_TTL: int = 7 * 24 * 3600
+    JOB_RETENTION_INTERVAL: int = 300
+    
+    # Webhook outbox delivery (see services/webhooks.py)
+    WEBHOOK_TIMEOUT: float = 10.0
+    WEBHOOK_MAX_ATTEMPTS: int = 8
+    WEBHOOK_RETRY_BACKOFF: int = 10  # seconds before the first retry, doubled per attempt
+    WEBHOOK_RETRY_BACKOFF_MAX: int = 3600
+    WEBHOOK_MAX_CONNECTIONS: int = 50
+    WEBHOOK_PER_ENDPOINT_CONCURRENCY: int = 4  # requests at once; a dispatcher leases at most this × WEBHOOK_BATCH_MAX per endpoint
+    WEBHOOK_MAX_IN_FLIGHT: int = 200
+    WEBHOOK_BATCH_MAX: int = 1  # >1 sends events due for the same URL as {"events": [...]}
+    WEBHOOK_LEASE_SECONDS: int = 120
+    WEBHOOK_POLL_INTERVAL: float = 1.0
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,372 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Histograms use a fixed set of log-spaced buckets (HDR-style), so memory per
+series is constant no matter how many observations are recorded, and
+percentiles can be read back without keeping raw samples.
+"""
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import math
+import threading
+
+
+def _log_bounds(start: float, factor: float, count: int) -> Tuple[float, ...]:
+    return tuple(start * factor ** i for i in range(count))
+
+
+# 0.5ms .. ~10min with ~19% relative bucket width (4 sub-buckets per doubling)
+LATENCY_SUB_BUCKETS = 4
+LATENCY_BOUNDS = _log_bounds(0.0005, 2 ** (1 / LATENCY_SUB_BUCKETS), 82)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """A metric family; children are keyed by label values"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def children(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return list(self._children.items())
+
+    def _render_samples(self, lines: List[str]):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}"
+        ]
+        self._render_samples(lines)
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0, **labels):
+        self.labels(**labels).inc(amount)
+
+    def total(self, **match) -> float:
+        """Sum of all children whose labels match the given subset"""
+        return sum(
+            child.value for key, child in self.children()
+            if all(key[self.labelnames.index(k)] == str(v) for k, v in match.items())
+        )
+
+    def _render_samples(self, lines: List[str]):
+        for key, child in self.children():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}")
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._value = 0.0
+        self._callback: Optional[Callable[[], float]] = None
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self._value -= amount
+
+    def set_function(self, callback: Callable[[], float]):
+        """Read the value from a callback at scrape time"""
+        self._callback = callback
+
+    @property
+    def value(self) -> float:
+        if self._callback is not None:
+            try:
+                return float(self._callback())
+            except Exception:
+                return math.nan
+        return self._value
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def _render_samples(self, lines: List[str]):
+        for key, child in self.children():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}")
+
+
+class _HistogramChild:
+    """Fixed-memory histogram over log-spaced buckets"""
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is overflow
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        idx = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[idx] += 1
+            self.count += 1
+            self.sum += value
+            if value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by interpolating inside the containing bucket"""
+        with self._lock:
+            if not self.count:
+                return None
+            counts = list(self.counts)
+            total, lo_seen, hi_seen = self.count, self.min, self.max
+
+        rank = q * total
+        cumulative = 0
+        for idx, bucket_count in enumerate(counts):
+            if not bucket_count:
+                continue
+            if cumulative + bucket_count >= rank:
+                lower = self.bounds[idx - 1] if idx > 0 else 0.0
+                upper = self.bounds[idx] if idx < len(self.bounds) else hi_seen
+                lower, upper = max(lower, lo_seen), min(upper, hi_seen)
+                fraction = (rank - cumulative) / bucket_count
+                return lower + (upper - lower) * fraction
+            cumulative += bucket_count
+        return hi_seen
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.mean,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "max": self.max if self.count else None
+        }
+
+
+INF_LABEL = 'le="+Inf"'
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        bounds: Tuple[float, ...] = LATENCY_BOUNDS,
+        exposition_step: int = LATENCY_SUB_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = bounds
+        # Only every Nth bound is exported to keep scrapes small; bounds nest, so counts stay exact
+        self.exposition_step = exposition_step
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float, **labels):
+        self.labels(**labels).observe(value)
+
+    def merged(self, **match) -> _HistogramChild:
+        """Combine all children whose labels match the given subset"""
+        combined = _HistogramChild(self.bounds)
+        for key, child in self.children():
+            if not all(key[self.labelnames.index(k)] == str(v) for k, v in match.items()):
+                continue
+            with child._lock:
+                for idx, bucket_count in enumerate(child.counts):
+                    combined.counts[idx] += bucket_count
+                combined.count += child.count
+                combined.sum += child.sum
+                combined.min = min(combined.min, child.min)
+                combined.max = max(combined.max, child.max)
+        return combined
+
+    def _render_samples(self, lines: List[str]):
+        for key, child in self.children():
+            with child._lock:
+                counts = list(child.counts)
+                count, total = child.count, child.sum
+
+            cumulative = 0
+            for idx, bound in enumerate(child.bounds):
+                cumulative += counts[idx]
+                if idx % self.exposition_step == 0:
+                    le = f'le="{_format_value(round(bound, 6))}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, INF_LABEL)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+
+
+class MetricsRegistry:
+    """Holds metric families and renders them in Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Iterable[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), **kwargs) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, **kwargs)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# Shared metric families
+http_request_seconds = registry.histogram(
+    "closealead_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"]
+)
+http_requests_total = registry.counter(
+    "closealead_http_requests_total",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"]
+)
+crew_phase_seconds = registry.histogram(
+    "closealead_crew_phase_duration_seconds",
+    "Wall time of each crew phase",
+    ["crew_type", "phase"]
+)
+crew_llm_seconds = registry.histogram(
+    "closealead_crew_llm_duration_seconds",
+    "LLM round-trip time inside each crew phase",
+    ["crew_type", "phase"]
+)
+crew_execution_seconds = registry.histogram(
+    "closealead_crew_execution_duration_seconds",
+    "End-to-end crew execution time",
+    ["crew_type"]
+)
+crew_executions_total = registry.counter(
+    "closealead_crew_executions_total",
+    "Crew executions by outcome",
+    ["crew_type", "success"]
+)
+crew_tokens_total = registry.counter(
+    "closealead_crew_tokens_total",
+    "LLM tokens used by crews",
+    ["crew_type", "kind"]
+)
+cache_requests_total = registry.counter(
+    "closealead_cache_requests_total",
+    "Cache lookups by cache name and result",
+    ["cache", "result"]
+)
+queue_depth = registry.gauge(
+    "closealead_queue_depth",
+    "Items waiting in a work queue",
+    ["queue"]
+)
+
+
+def cache_hit_rate(cache: str) -> Optional[float]:
+    hits = cache_requests_total.total(cache=cache, result="hit")
+    misses = cache_requests_total.total(cache=cache, result="miss")
+    total = hits + misses
+    return hits / total if total else None
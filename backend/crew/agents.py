@@ -3,19 +3,22 @@ from crewai import Agent
 from langchain_openai import ChatOpenAI
 from core.config import settings
 from .offer_templates import OFFER_TEMPLATES, select_template_for_offer
+from .callbacks import token_usage_callback
 
 # Initialize LLMs with different configurations
 standard_llm = ChatOpenAI(
     model=settings.OPENAI_MODEL,  # gpt-4-turbo
     api_key=settings.OPENAI_API_KEY,
     temperature=0.7,
-    max_tokens=2000
+    max_tokens=2000,
+    callbacks=[token_usage_callback]
 )
 
 reasoning_llm = ChatOpenAI(
     model=settings.OPENAI_REASONING_MODEL,  # o1-preview
     api_key=settings.OPENAI_API_KEY,
-    temperature=1.0  # O1 requires temperature=1
+    temperature=1.0,  # O1 requires temperature=1
+    callbacks=[token_usage_callback]
 )
 
 
@@ -0,0 +1,246 @@
+# crew/batching.py
+"""
+Cross-request micro-batching of LLM stage calls.
+Concurrent calls for the same stage (same agent and task template) that
+arrive within a short window are sent as one multi-item prompt, so the long
+stage instructions are paid for once. The keyed response is fanned back out
+to the callers; any item the batch can't answer is retried on its own.
+Batches are capped so every item's answer fits the agent's completion limit
+(max_tokens): a truncated batch would fail to parse and be paid for twice.
+"""
+
+from crewai import Crew, Process
+from crew.tracing import PhaseSpan, RunTrace
+from core.config import settings
+from services.usage import get_token_ledger
+from core.metrics import registry
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+microbatch_size = registry.histogram(
+    "closealead_llm_microbatch_size",
+    "Calls merged into one micro-batched LLM request",
+    ["stage"]
+)
+microbatch_items_total = registry.counter(
+    "closealead_llm_microbatch_items_total",
+    "Micro-batched stage calls by outcome (batched, solo, retried)",
+    ["stage", "outcome"]
+)
+
+# Typical completion tokens of one item's answer, per stage
+EXPECTED_ITEM_TOKENS = {
+    "copywriting": 900,  # 250-400 word description plus bullets
+    "copy_enhancement": 900,
+    "personalization": 600,
+    "quality_assurance": 500
+}
+DEFAULT_ITEM_TOKENS = 800
+BATCH_OVERHEAD_TOKENS = 50  # the wrapping object and item keys
+
+BATCH_INSTRUCTIONS = """
+
+<batch_mode>
+The data above contains {count} INDEPENDENT items, each wrapped in an <item id="..."> tag.
+Apply every instruction in this task to each item separately, as if it were the only one.
+Do not mix content between items.
+
+Respond with ONE JSON object and nothing else. Its keys are the item ids; each value is exactly
+the JSON you would have returned for that item alone:
+{{{example}}}
+</batch_mode>"""
+
+
+def _items_block(payloads: List[str]) -> str:
+    return "\n".join(
+        f'<item id="item_{idx + 1}">\n{payload}\n</item>'
+        for idx, payload in enumerate(payloads)
+    )
+
+
+def _solo(span: PhaseSpan, agent, task_factory: Callable, payload: str, parser: Callable) -> Any:
+    crew = Crew(
+        agents=[agent],
+        tasks=[task_factory(agent, payload)],
+        process=Process.sequential,
+        verbose=True
+    )
+    result = span.kickoff(crew)
+    return span.parse(parser, result)
+
+
+def batch_capacity(stage: str, agent, max_batch: int) -> int:
+    """How many items one batched answer can hold within the agent's completion limit"""
+    limit = getattr(getattr(agent, "llm", None), "max_tokens", None)
+    if not isinstance(limit, int) or limit <= 0:
+        return max_batch
+    per_item = EXPECTED_ITEM_TOKENS.get(stage, DEFAULT_ITEM_TOKENS)
+    return max(1, min(max_batch, (limit - BATCH_OVERHEAD_TOKENS) // per_item))
+
+
+class _PendingCall:
+    def __init__(self, payload: str):
+        self.payload = payload
+        self.result: Optional[Dict[str, Any]] = None
+        self.done = threading.Event()
+
+
+class _OpenBatch:
+    def __init__(self):
+        self.calls: List[_PendingCall] = []
+        self.full = threading.Event()
+        self.shared: Optional[PhaseSpan] = None
+
+
+class StageMicroBatcher:
+    """
+    Collects concurrent calls for one stage. The first caller in a window
+    leads: it waits up to window_ms (or until max_batch calls have joined),
+    makes the single LLM request, and wakes the others with their results.
+    """
+
+    def __init__(
+        self,
+        stage: str,
+        agent,
+        task_factory: Callable,
+        window_ms: float,
+        max_batch: int
+    ):
+        self.stage = stage
+        self.agent = agent
+        self.task_factory = task_factory
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._open: Optional[_OpenBatch] = None
+
+    def submit(self, span: PhaseSpan, payload: str, parser: Callable) -> Any:
+        call = _PendingCall(payload)
+        with self._lock:
+            batch = self._open
+            leader = batch is None
+            if leader:
+                batch = self._open = _OpenBatch()
+            batch.calls.append(call)
+            if len(batch.calls) >= self.max_batch:
+                # Full: later callers start a new batch
+                self._open = None
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._open is batch:
+                    self._open = None
+            if len(batch.calls) > 1:
+                self._execute(batch, parser)
+            else:
+                call.done.set()
+
+        call.done.wait()
+        position = batch.calls.index(call)
+
+        if len(batch.calls) == 1:
+            microbatch_items_total.inc(stage=self.stage, outcome="solo")
+            return _solo(span, self.agent, self.task_factory, payload, parser)
+
+        if batch.shared is not None:
+            # Book this caller's share under its own trace span and usage owner
+            first = position == 0
+            prompt_before, completion_before = span.prompt_tokens, span.completion_tokens
+            span.add_shared_call(batch.shared, len(batch.calls), first)
+            get_token_ledger().record(
+                stage=span.phase,
+                prompt_tokens=span.prompt_tokens - prompt_before,
+                completion_tokens=span.completion_tokens - completion_before,
+                model=batch.shared.model,
+                llm_calls=1 if first else 0
+            )
+
+        if call.result is not None:
+            microbatch_items_total.inc(stage=self.stage, outcome="batched")
+            return call.result
+
+        logger.warning(f"Micro-batch for {self.stage} had no answer for an item, retrying it alone")
+        microbatch_items_total.inc(stage=self.stage, outcome="retried")
+        return _solo(span, self.agent, self.task_factory, payload, parser)
+
+    def _execute(self, batch: _OpenBatch, parser: Callable):
+        calls = batch.calls
+        microbatch_size.observe(len(calls), stage=self.stage)
+        try:
+            task = self.task_factory(self.agent, _items_block([call.payload for call in calls]))
+            example = ", ".join(f'"item_{idx + 1}": {{...}}' for idx in range(min(len(calls), 3)))
+            task.description += BATCH_INSTRUCTIONS.format(count=len(calls), example=example)
+            task.expected_output = f"A JSON object keyed by item id with {len(calls)} entries"
+            crew = Crew(
+                agents=[self.agent],
+                tasks=[task],
+                process=Process.sequential,
+                verbose=True
+            )
+
+            # A trace of its own so the callers' spans aren't charged the whole call
+            trace = RunTrace("microbatch")
+            with trace.span(self.stage) as shared:
+                shared.bill_ledger = False
+                batch.shared = shared
+                parsed = shared.parse(parser, shared.kickoff(crew)) or {}
+            trace.finish()
+
+            results = parsed.get("results", parsed) if isinstance(parsed, dict) else {}
+            for idx, call in enumerate(calls):
+                item = results.get(f"item_{idx + 1}")
+                if isinstance(item, dict) and item:
+                    call.result = item
+        except Exception as e:
+            logger.error(f"Micro-batched {self.stage} call failed for {len(calls)} items: {str(e)}")
+        finally:
+            for call in calls:
+                call.done.set()
+
+
+_batchers: Dict[Tuple[str, int, Callable], StageMicroBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def _enabled_stages() -> List[str]:
+    return [stage.strip() for stage in settings.LLM_MICROBATCH_STAGES.split(",") if stage.strip()]
+
+
+def run_stage(span: PhaseSpan, agent, task_factory: Callable, payload: str, parser: Callable) -> Any:
+    """
+    Run one stage task and return its parsed result. When micro-batching is
+    enabled for span.phase, the call may be merged with concurrent ones.
+    """
+    if settings.LLM_MICROBATCH_WINDOW_MS <= 0 or span.phase not in _enabled_stages():
+        return _solo(span, agent, task_factory, payload, parser)
+
+    max_batch = batch_capacity(span.phase, agent, settings.LLM_MICROBATCH_MAX_BATCH)
+    if max_batch < 2:
+        # Two answers wouldn't fit the completion limit; waiting for a window buys nothing
+        return _solo(span, agent, task_factory, payload, parser)
+
+    key = (span.phase, id(agent), task_factory)
+    with _batchers_lock:
+        batcher = _batchers.get(key)
+        if batcher is None:
+            batcher = _batchers[key] = StageMicroBatcher(
+                span.phase,
+                agent,
+                task_factory,
+                settings.LLM_MICROBATCH_WINDOW_MS,
+                max_batch
+            )
+    return batcher.submit(span, payload, parser)
+
+
+__all__ = [
+    "StageMicroBatcher",
+    "batch_capacity",
+    "run_stage"
+]
@@ -0,0 +1,57 @@
+# crew/callbacks.py
+"""
+LangChain callbacks attached to the crew LLMs.
+Captures real prompt/completion token counts from every LLM call.
+"""
+
+from langchain_core.callbacks import BaseCallbackHandler
+from crew.tracing import current_span
+from services.usage import get_token_ledger
+from typing import Any, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _response_usage(response: Any) -> Tuple[int, int, str]:
+    """Read token usage from an LLMResult (llm_output first, then message metadata)"""
+    llm_output = getattr(response, "llm_output", None) or {}
+    model = llm_output.get("model_name", "")
+    usage = llm_output.get("token_usage") or {}
+    if usage:
+        return int(usage.get("prompt_tokens", 0) or 0), int(usage.get("completion_tokens", 0) or 0), model
+
+    prompt_tokens = completion_tokens = 0
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt_tokens += int(metadata.get("input_tokens", 0) or 0)
+            completion_tokens += int(metadata.get("output_tokens", 0) or 0)
+    return prompt_tokens, completion_tokens, model
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Feeds per-call token usage into the active trace span and the token ledger"""
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        try:
+            prompt_tokens, completion_tokens, model = _response_usage(response)
+            span = current_span()
+            if span is not None:
+                span.add_tokens(prompt_tokens, completion_tokens)
+                span.model = model or span.model
+                if not span.bill_ledger:
+                    return
+
+            get_token_ledger().record(
+                stage=span.phase if span is not None else "unscoped",
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                model=model
+            )
+        except Exception as e:
+            # Accounting must never break generation
+            logger.error(f"Failed to record token usage: {str(e)}")
+
+
+token_usage_callback = TokenUsageCallback()
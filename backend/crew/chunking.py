@@ -0,0 +1,178 @@
+# crew/chunking.py
+"""
+Chunking and deterministic merging for long redesign documents.
+Splits extracted text by page (form feed) or section, packs it into
+token-budgeted chunks, and merges per-chunk gather results into one schema.
+"""
+
+from typing import Dict, Any, List
+import re
+
+PAGE_SEPARATOR = "\f"
+CHARS_PER_TOKEN = 4  # Rough average for English prose with the OpenAI tokenizers
+
+_BLANK_LINES = re.compile(r"\n\s*\n")
+_HEADING_LINE = re.compile(r"\n(?=(?:#{1,6}\s|[A-Z][A-Z0-9 &/\-]{3,60}\n))")
+
+# Gather-schema fields and how they merge
+SCALAR_FIELDS = [
+    "service_name",
+    "service_type",
+    "target_audience",
+    "problem_solved",
+    "transformation",
+    "unique_value_proposition",
+    "brand_personality",
+    "industry"
+]
+LIST_FIELDS = {
+    "features": 12,
+    "guarantees": 5,
+    "bonuses": 8,
+    "urgency_elements": 5,
+    "social_proof_hints": 8
+}
+MAX_DESCRIPTION_CHARS = 2000
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _split_units(text: str) -> List[str]:
+    """Natural units: pages if the extractor kept them, otherwise sections"""
+    if PAGE_SEPARATOR in text:
+        units = text.split(PAGE_SEPARATOR)
+    else:
+        units = _HEADING_LINE.split(text)
+        if len(units) == 1:
+            units = _BLANK_LINES.split(text)
+    return [unit.strip() for unit in units if unit.strip()]
+
+
+def _split_oversized(unit: str, max_chars: int) -> List[str]:
+    """Break a unit that alone exceeds the budget on paragraph, then line, then hard boundaries"""
+    if len(unit) <= max_chars:
+        return [unit]
+
+    for pattern in (_BLANK_LINES, re.compile(r"\n")):
+        parts = [part for part in pattern.split(unit) if part.strip()]
+        if len(parts) > 1:
+            return _pack(parts, max_chars)
+
+    return [unit[i:i + max_chars] for i in range(0, len(unit), max_chars)]
+
+
+def _pack(units: List[str], max_chars: int) -> List[str]:
+    """Greedily pack consecutive units into chunks no larger than max_chars"""
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+
+    for unit in units:
+        for piece in _split_oversized(unit, max_chars):
+            if current and size + len(piece) + 2 > max_chars:
+                chunks.append("\n\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 2
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _merge_smallest(chunks: List[str], max_chunks: int) -> List[str]:
+    """Join the smallest adjacent pair until at most max_chunks remain"""
+    chunks = list(chunks)
+    while len(chunks) > max(max_chunks, 1):
+        i = min(range(len(chunks) - 1), key=lambda j: len(chunks[j]) + len(chunks[j + 1]))
+        chunks[i:i + 2] = [chunks[i] + "\n\n" + chunks[i + 1]]
+    return chunks
+
+
+def split_document(text: str, token_budget: int, max_chunks: int) -> List[str]:
+    """
+    Split text into chunks of at most token_budget tokens.
+    The budget is raised if needed so a document never yields more than
+    max_chunks; packing on natural boundaries can leave chunks part-empty,
+    so any excess is merged back into the smallest adjacent pairs.
+    """
+    total_tokens = estimate_tokens(text)
+    budget = max(token_budget, -(-total_tokens // max_chunks))
+    return _merge_smallest(_pack(_split_units(text), budget * CHARS_PER_TOKEN), max_chunks)
+
+
+def _normalize(item: Any) -> str:
+    return re.sub(r"\W+", " ", str(item)).strip().lower()
+
+
+def _has_amount(pricing: Any) -> bool:
+    if not isinstance(pricing, dict):
+        return False
+    try:
+        return float(pricing.get("amount") or 0) > 0
+    except (TypeError, ValueError):
+        return False
+
+
+def merge_partials(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge per-chunk gather results in document order.
+    Scalars: first non-empty value wins. Lists: ordered, de-duplicated union.
+    Pricing: first chunk that states an amount. The result is independent of
+    which chunk finished first.
+    """
+    merged: Dict[str, Any] = {}
+
+    for field in SCALAR_FIELDS:
+        merged[field] = next(
+            (p[field] for p in partials if isinstance(p.get(field), str) and p[field].strip()),
+            ""
+        )
+
+    descriptions, seen = [], set()
+    for partial in partials:
+        description = (partial.get("description") or "").strip()
+        if description and _normalize(description) not in seen:
+            seen.add(_normalize(description))
+            descriptions.append(description)
+    merged["description"] = " ".join(descriptions)[:MAX_DESCRIPTION_CHARS]
+
+    merged["pricing"] = next(
+        (p["pricing"] for p in partials if _has_amount(p.get("pricing"))),
+        next((p["pricing"] for p in partials if isinstance(p.get("pricing"), dict)), {})
+    )
+
+    for field, limit in LIST_FIELDS.items():
+        items, seen = [], set()
+        for partial in partials:
+            values = partial.get(field) or []
+            if not isinstance(values, list):
+                values = [values]
+            for value in values:
+                key = _normalize(value)
+                if key and key not in seen:
+                    seen.add(key)
+                    items.append(value)
+        merged[field] = items[:limit]
+
+    critical = {
+        "service_name": bool(merged["service_name"]),
+        "pricing": _has_amount(merged["pricing"]),
+        "features": bool(merged["features"]),
+        "target_audience": bool(merged["target_audience"]),
+        "description": bool(merged["description"])
+    }
+    merged["completeness_score"] = round(sum(critical.values()) / len(critical), 2)
+    merged["missing_critical_info"] = [field for field, present in critical.items() if not present]
+    merged["inference_notes"] = f"Merged from {len(partials)} document chunks"
+
+    return merged
+
+
+__all__ = [
+    "estimate_tokens",
+    "split_document",
+    "merge_partials"
+]
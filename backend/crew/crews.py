@@ -14,15 +14,36 @@ from crew.agents import (
 from crew.tasks import (
     create_gather_info_task,
     create_copywriting_task,
+    create_copy_enhancement_task,
+    create_personalization_task,
     create_design_strategy_task,
     create_qa_task
 )
+from crew.tracing import RunTrace
+from crew.batching import run_stage
+from crew.chunking import split_document, merge_partials
+from crew.extraction import extract_offer_fields, fill_missing, is_confident
+from core.config import settings
+from services.usage import get_token_ledger
+from core.metrics import (
+    registry,
+    crew_execution_seconds,
+    crew_executions_total,
+    crew_tokens_total,
+    crew_phase_seconds,
+    cache_requests_total,
+    cache_hit_rate,
+    queue_depth
+)
 import json
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Iterable, Iterator, AsyncIterator
 import logging
 import hashlib
+import asyncio
+import contextvars
+import itertools
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, as_completed, wait
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +62,7 @@ class OfferCreationCrew:
     def __init__(self):
         self.crew = None
         self.execution_log = []
+        self.trace = RunTrace("offer_creation")
     
     def create(self, user_input: dict) -> Dict[str, Any]:
         """
@@ -66,45 +88,44 @@ class OfferCreationCrew:
                 verbose=True
             )
             
-            gathered_result = gather_crew.kickoff()
-            self.execution_log.append({
-                "phase": "information_gathering",
-                "status": "completed",
-                "timestamp": time.time()
-            })
-            
-            # Parse the gathered information
-            gathered_data = self._parse_json_result(gathered_result)
+            with self.trace.span("information_gathering", stage_input=user_input) as span:
+                gathered_result = span.kickoff(gather_crew)
+                self.execution_log.append({
+                    "phase": "information_gathering",
+                    "status": "completed",
+                    "timestamp": time.time()
+                })
+                
+                # Parse the gathered information
+                gathered_data = span.parse(self._parse_json_result, gathered_result)
+                
+                if not gathered_data:
+                    logger.error("Failed to parse gathered information, using fallback")
+                    span.use_fallback("fallback_offer")
             
             if not gathered_data:
-                logger.error("Failed to parse gathered information, using fallback")
-                return self._create_fallback_offer(user_input)
+                return finish_trace(self.trace, self._create_fallback_offer(user_input), "fallback")
             
             logger.info(f"Successfully gathered data with {len(gathered_data)} fields")
             
             # PHASE 2: COPYWRITING
             logger.info("Phase 2: Creating compelling copy...")
-            copy_task = create_copywriting_task(copywriter, json.dumps(gathered_data, indent=2))
-            
-            copy_crew = Crew(
-                agents=[copywriter],
-                tasks=[copy_task],
-                process=Process.sequential,
-                verbose=True
-            )
-            
-            copy_result = copy_crew.kickoff()
-            self.execution_log.append({
-                "phase": "copywriting",
-                "status": "completed",
-                "timestamp": time.time()
-            })
-            
-            copy_data = self._parse_json_result(copy_result)
-            
-            if not copy_data:
-                logger.warning("Failed to parse copy data, using fallback copy")
-                copy_data = self._create_fallback_copy(gathered_data)
+            copy_input = json.dumps(gathered_data, indent=2)
+            
+            with self.trace.span("copywriting", stage_input=copy_input) as span:
+                copy_data = run_stage(
+                    span, copywriter, create_copywriting_task, copy_input, self._parse_json_result
+                )
+                self.execution_log.append({
+                    "phase": "copywriting",
+                    "status": "completed",
+                    "timestamp": time.time()
+                })
+                
+                if not copy_data:
+                    logger.warning("Failed to parse copy data, using fallback copy")
+                    span.use_fallback("fallback_copy")
+                    copy_data = self._create_fallback_copy(gathered_data)
             
             logger.info("Successfully created copy")
             
@@ -117,9 +138,10 @@ class OfferCreationCrew:
                 **copy_data
             }
             
+            design_input = json.dumps(combined_data, indent=2)
             design_task = create_design_strategy_task(
                 design_strategist, 
-                json.dumps(combined_data, indent=2)
+                design_input
             )
             
             design_crew = Crew(
@@ -129,18 +151,20 @@ class OfferCreationCrew:
                 verbose=True
             )
             
-            design_result = design_crew.kickoff()
-            self.execution_log.append({
-                "phase": "design_strategy",
-                "status": "completed",
-                "timestamp": time.time()
-            })
-            
-            design_data = self._parse_json_result(design_result)
-            
-            if not design_data:
-                logger.warning("Failed to parse design data, using fallback design")
-                design_data = self._create_fallback_design(gathered_data)
+            with self.trace.span("design_strategy", stage_input=design_input) as span:
+                design_result = span.kickoff(design_crew)
+                self.execution_log.append({
+                    "phase": "design_strategy",
+                    "status": "completed",
+                    "timestamp": time.time()
+                })
+                
+                design_data = span.parse(self._parse_json_result, design_result)
+                
+                if not design_data:
+                    logger.warning("Failed to parse design data, using fallback design")
+                    span.use_fallback("fallback_design")
+                    design_data = self._create_fallback_design(gathered_data)
             
             logger.info("Successfully created design strategy")
             
@@ -149,44 +173,38 @@ class OfferCreationCrew:
             
             # PHASE 5: QUALITY ASSURANCE
             logger.info("Phase 4: Running quality assurance...")
-            qa_task = create_qa_task(quality_assurance, json.dumps(complete_offer, indent=2))
-            
-            qa_crew = Crew(
-                agents=[quality_assurance],
-                tasks=[qa_task],
-                process=Process.sequential,
-                verbose=True
-            )
-            
-            qa_result = qa_crew.kickoff()
-            self.execution_log.append({
-                "phase": "quality_assurance",
-                "status": "completed",
-                "timestamp": time.time()
-            })
-            
-            qa_data = self._parse_json_result(qa_result)
-            
-            if not qa_data:
-                logger.warning("Failed to parse QA data, proceeding without detailed QA report")
-                qa_data = {
-                    "audit_summary": {
-                        "total_score": 75,
-                        "percentage": 75,
-                        "overall_assessment": "Good"
-                    },
-                    "final_recommendation": {
-                        "status": "APPROVE"
+            qa_input = json.dumps(complete_offer, indent=2)
+            
+            with self.trace.span("quality_assurance", stage_input=qa_input) as span:
+                qa_data = run_stage(
+                    span, quality_assurance, create_qa_task, qa_input, self._parse_json_result
+                )
+                self.execution_log.append({
+                    "phase": "quality_assurance",
+                    "status": "completed",
+                    "timestamp": time.time()
+                })
+                
+                if not qa_data:
+                    logger.warning("Failed to parse QA data, proceeding without detailed QA report")
+                    span.use_fallback("default_qa_report")
+                    qa_data = {
+                        "audit_summary": {
+                            "total_score": 75,
+                            "percentage": 75,
+                            "overall_assessment": "Good"
+                        },
+                        "final_recommendation": {
+                            "status": "APPROVE"
+                        }
                     }
-                }
             
             # Add QA report and execution log to offer
             complete_offer["qa_report"] = qa_data
             complete_offer["execution_log"] = self.execution_log
-            complete_offer["processing_time"] = sum(1 for _ in self.execution_log)
             
             logger.info("Offer creation completed successfully")
-            return complete_offer
+            return finish_trace(self.trace, complete_offer)
             
         except Exception as e:
             logger.error(f"Error in crew execution: {str(e)}", exc_info=True)
@@ -195,7 +213,7 @@ class OfferCreationCrew:
                 "error": str(e),
                 "timestamp": time.time()
             })
-            return self._create_fallback_offer(user_input)
+            return finish_trace(self.trace, self._create_fallback_offer(user_input), "error")
     
     def _parse_json_result(self, result: Any) -> Optional[Dict[str, Any]]:
         """
@@ -424,14 +442,25 @@ class OfferRedesignCrew:
     def __init__(self):
         self.crew = None
         self.execution_log = []
+        self.trace = RunTrace("offer_redesign")
+        # Gather/copy outputs of the last run, so callers can cache them
+        self.stage_outputs = {}
     
-    def redesign(self, extracted_content: str, file_metadata: dict = None) -> Dict[str, Any]:
+    def redesign(
+        self,
+        extracted_content: str,
+        file_metadata: dict = None,
+        gathered_data: Optional[Dict[str, Any]] = None,
+        copy_data: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Redesign an offer from extracted document content.
         
         Args:
             extracted_content: Raw text extracted from uploaded document
             file_metadata: Optional metadata about the source file
+            gathered_data: Previously extracted gather output; skips phase 1
+            copy_data: Previously enhanced copy; skips phase 2
             
         Returns:
             Complete redesigned offer object
@@ -440,85 +469,68 @@ class OfferRedesignCrew:
             logger.info(f"Starting offer redesign with {len(extracted_content)} characters of content")
             
             # PHASE 1: INTELLIGENT CONTENT ANALYSIS & EXTRACTION
-            logger.info("Phase 1: Analyzing existing offer content...")
-            
-            extraction_input = {
-                "mode": "redesign",
-                "raw_content": extracted_content,
-                "instructions": """This is an EXISTING offer document. Extract all components 
-                (service name, price, features, description). Identify what's working well and what's weak."""
-            }
-            
-            gather_task = create_gather_info_task(information_gatherer, extraction_input)
-            
-            gather_crew = Crew(
-                agents=[information_gatherer],
-                tasks=[gather_task],
-                process=Process.sequential,
-                verbose=True
-            )
-            
-            extracted_data = gather_crew.kickoff()
-            self.execution_log.append({
-                "phase": "content_extraction",
-                "status": "completed",
-                "timestamp": time.time()
-            })
-            
-            gathered_data = self._parse_json_result(extracted_data)
+            if gathered_data:
+                logger.info("Phase 1: Reusing previously extracted content")
+            else:
+                logger.info("Phase 1: Analyzing existing offer content...")
+                
+                # Deterministic pass first; well-structured documents need no LLM here
+                with self.trace.span("local_extraction") as span:
+                    local_data = extract_offer_fields(extracted_content)
+                
+                if is_confident(local_data, settings.REDESIGN_LOCAL_CONFIDENCE):
+                    logger.info(
+                        f"Local extraction confident ({local_data['extraction_confidence']}), "
+                        "skipping information gatherer"
+                    )
+                    gathered_data = local_data
+                    self.execution_log.append({
+                        "phase": "content_extraction",
+                        "status": "completed",
+                        "source": "local",
+                        "confidence": local_data["extraction_confidence"],
+                        "timestamp": time.time()
+                    })
+                else:
+                    chunks = split_document(
+                        extracted_content,
+                        settings.REDESIGN_CHUNK_TOKEN_BUDGET,
+                        settings.REDESIGN_MAX_CHUNKS
+                    )
+                    
+                    if len(chunks) <= 1:
+                        gathered_data = self._extract_chunk(extracted_content)
+                    else:
+                        gathered_data = self._extract_chunked(chunks)
+                    
+                    if gathered_data:
+                        gathered_data = fill_missing(gathered_data, local_data)
+                    
+                    self.execution_log.append({
+                        "phase": "content_extraction",
+                        "status": "completed",
+                        "source": "llm",
+                        "chunks": max(len(chunks), 1),
+                        "timestamp": time.time()
+                    })
             
             if not gathered_data:
                 logger.error("Failed to extract data from document")
-                return self._create_basic_redesign(extracted_content, file_metadata)
+                return finish_trace(
+                    self.trace,
+                    self._create_basic_redesign(extracted_content, file_metadata),
+                    "fallback"
+                )
             
             logger.info("Successfully extracted data from document")
+            self.stage_outputs["gathered_data"] = gathered_data
             
             # PHASE 2: ENHANCED COPYWRITING
-            logger.info("Phase 2: Enhancing copy with persuasion techniques...")
-            
-            enhancement_prompt = f"""
-            ORIGINAL OFFER DATA:
-            {json.dumps(gathered_data, indent=2)}
-            
-            ENHANCEMENT TASK:
-            This is a redesign. Keep the core service intact but dramatically improve:
-            1. Headlines - more compelling
-            2. Features - transform into benefit-driven statements
-            3. Overall persuasiveness - add emotional triggers and power words
-            
-            Preserve original pricing and core offering.
-            """
-            
-            copy_task = Task(
-                description=enhancement_prompt,
-                agent=copywriter,
-                expected_output="JSON with enhanced copy"
-            )
-            
-            copy_crew = Crew(
-                agents=[copywriter],
-                tasks=[copy_task],
-                process=Process.sequential,
-                verbose=True
-            )
-            
-            copy_result = copy_crew.kickoff()
-            self.execution_log.append({
-                "phase": "copy_enhancement",
-                "status": "completed",
-                "timestamp": time.time()
-            })
-            
-            copy_data = self._parse_json_result(copy_result)
-            
-            if not copy_data:
-                logger.warning("Failed to enhance copy, using extracted data")
-                copy_data = {
-                    "headline": gathered_data.get("service_name", "Professional Service"),
-                    "subtitle": "Enhanced and optimized for maximum impact",
-                    "description": gathered_data.get("description", ""),
-                    "feature_bullets": gathered_data.get("features", [])
-                }
+            if copy_data:
+                logger.info("Phase 2: Reusing previously enhanced copy")
+                self.stage_outputs["copy_data"] = copy_data
+            else:
+                copy_data = self._enhance_copy(gathered_data)
             
             # PHASE 3: DESIGN STRATEGY
             logger.info("Phase 3: Developing fresh design strategy...")
@@ -529,9 +541,10 @@ class OfferRedesignCrew:
                 "redesign_mode": True
             }
             
+            design_input = json.dumps(combined_data, indent=2)
             design_task = create_design_strategy_task(
                 design_strategist,
-                json.dumps(combined_data, indent=2)
+                design_input
             )
             
             design_crew = Crew(
@@ -541,25 +554,27 @@ class OfferRedesignCrew:
                 verbose=True
             )
             
-            design_result = design_crew.kickoff()
-            self.execution_log.append({
-                "phase": "design_strategy",
-                "status": "completed",
-                "timestamp": time.time()
-            })
-            
-            design_data = self._parse_json_result(design_result)
-            
-            if not design_data:
-                logger.warning("Failed to generate design, using defaults")
-                design_data = {
-                    "recommended_template": "modern",
-                    "color_palette": {
-                        "primary": {"hex": "#3b82f6"},
-                        "secondary": {"hex": "#8b5cf6"},
-                        "accent": {"hex": "#10b981"}
+            with self.trace.span("design_strategy", stage_input=design_input) as span:
+                design_result = span.kickoff(design_crew)
+                self.execution_log.append({
+                    "phase": "design_strategy",
+                    "status": "completed",
+                    "timestamp": time.time()
+                })
+                
+                design_data = span.parse(self._parse_json_result, design_result)
+                
+                if not design_data:
+                    logger.warning("Failed to generate design, using defaults")
+                    span.use_fallback("default_design")
+                    design_data = {
+                        "recommended_template": "modern",
+                        "color_palette": {
+                            "primary": {"hex": "#3b82f6"},
+                            "secondary": {"hex": "#8b5cf6"},
+                            "accent": {"hex": "#10b981"}
+                        }
                     }
-                }
             
             # PHASE 4: ASSEMBLE REDESIGNED OFFER
             color_palette = design_data.get("color_palette", {})
@@ -612,33 +627,131 @@ class OfferRedesignCrew:
             # PHASE 5: QUALITY ASSURANCE
             logger.info("Phase 5: Running quality assurance...")
             
-            qa_task = create_qa_task(quality_assurance, json.dumps(redesigned_offer, indent=2))
+            qa_input = json.dumps(redesigned_offer, indent=2)
             
-            qa_crew = Crew(
-                agents=[quality_assurance],
-                tasks=[qa_task],
-                process=Process.sequential,
-                verbose=True
-            )
+            with self.trace.span("quality_assurance", stage_input=qa_input) as span:
+                qa_data = run_stage(
+                    span, quality_assurance, create_qa_task, qa_input, self._parse_json_result
+                )
+                self.execution_log.append({
+                    "phase": "quality_assurance",
+                    "status": "completed",
+                    "timestamp": time.time()
+                })
+                
+                if qa_data:
+                    redesigned_offer["qa_report"] = qa_data
+                else:
+                    span.use_fallback("no_qa_report")
+            
+            logger.info("Offer redesign completed successfully")
+            return finish_trace(self.trace, redesigned_offer)
             
-            qa_result = qa_crew.kickoff()
+        except Exception as e:
+            logger.error(f"Error in redesign crew execution: {str(e)}", exc_info=True)
+            return finish_trace(
+                self.trace,
+                self._create_basic_redesign(extracted_content, file_metadata),
+                "error"
+            )
+    
+    def _enhance_copy(self, gathered_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Phase 2: rewrite the extracted offer copy for persuasion"""
+        logger.info("Phase 2: Enhancing copy with persuasion techniques...")
+        
+        enhancement_input = json.dumps(gathered_data, indent=2)
+        
+        with self.trace.span("copy_enhancement", stage_input=enhancement_input) as span:
+            copy_data = run_stage(
+                span, copywriter, create_copy_enhancement_task, enhancement_input, self._parse_json_result
+            )
             self.execution_log.append({
-                "phase": "quality_assurance",
+                "phase": "copy_enhancement",
                 "status": "completed",
                 "timestamp": time.time()
             })
             
-            qa_data = self._parse_json_result(qa_result)
-            
-            if qa_data:
-                redesigned_offer["qa_report"] = qa_data
-            
-            logger.info("Offer redesign completed successfully")
-            return redesigned_offer
-            
-        except Exception as e:
-            logger.error(f"Error in redesign crew execution: {str(e)}", exc_info=True)
-            return self._create_basic_redesign(extracted_content, file_metadata)
+            if copy_data:
+                self.stage_outputs["copy_data"] = copy_data
+            else:
+                logger.warning("Failed to enhance copy, using extracted data")
+                span.use_fallback("extracted_copy")
+                copy_data = {
+                    "headline": gathered_data.get("service_name", "Professional Service"),
+                    "subtitle": "Enhanced and optimized for maximum impact",
+                    "description": gathered_data.get("description", ""),
+                    "feature_bullets": gathered_data.get("features", [])
+                }
+        
+        return copy_data
+    
+    def _extract_chunk(
+        self,
+        content: str,
+        chunk_label: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Run the information gatherer over one piece of the document"""
+        extraction_input = {
+            "mode": "redesign",
+            "raw_content": content,
+            "instructions": """This is an EXISTING offer document. Extract all components 
+            (service name, price, features, description). Identify what's working well and what's weak."""
+        }
+        if chunk_label:
+            extraction_input["chunk"] = chunk_label
+            extraction_input["instructions"] += """
+            This is only one section of a longer document. Extract what THIS section states;
+            leave fields empty rather than guessing what other sections might contain."""
+        
+        gather_task = create_gather_info_task(information_gatherer, extraction_input)
+        
+        gather_crew = Crew(
+            agents=[information_gatherer],
+            tasks=[gather_task],
+            process=Process.sequential,
+            verbose=True
+        )
+        
+        with self.trace.span("content_extraction", stage_input=extraction_input) as span:
+            extracted_data = span.kickoff(gather_crew)
+            gathered_data = span.parse(self._parse_json_result, extracted_data)
+            if not gathered_data:
+                span.use_fallback("empty_chunk" if chunk_label else "basic_redesign")
+        
+        return gathered_data
+    
+    def _extract_chunked(self, chunks: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Map-reduce extraction for long documents: chunks are extracted in
+        parallel and merged in document order, so the result is deterministic.
+        """
+        logger.info(f"Extracting {len(chunks)} chunks in parallel")
+        partials: List[Optional[Dict[str, Any]]] = [None] * len(chunks)
+        
+        with ThreadPoolExecutor(max_workers=settings.REDESIGN_MAX_PARALLEL_CHUNKS) as executor:
+            # Copy the context per chunk so usage attribution follows each thread
+            futures = {
+                executor.submit(
+                    contextvars.copy_context().run,
+                    self._extract_chunk,
+                    chunk,
+                    f"{idx + 1} of {len(chunks)}"
+                ): idx
+                for idx, chunk in enumerate(chunks)
+            }
+            for future in as_completed(futures):
+                idx = futures[future]
+                try:
+                    partials[idx] = future.result()
+                except Exception as e:
+                    logger.warning(f"Chunk {idx + 1} extraction failed: {str(e)}")
+        
+        with self.trace.span("chunk_merge") as span:
+            usable = [partial for partial in partials if partial]
+            if not usable:
+                span.use_fallback("basic_redesign")
+                return None
+            return merge_partials(usable)
     
     def _parse_json_result(self, result: Any) -> Optional[Dict[str, Any]]:
         """Parse crew result into JSON"""
@@ -680,49 +793,30 @@ class OfferRedesignCrew:
         """Create a basic redesign if AI processing fails"""
         logger.warning("Using basic redesign fallback")
         
-        lines = [line.strip() for line in extracted_content.split("\n") if line.strip()]
+        extracted = extract_offer_fields(extracted_content)
+        pricing = extracted["pricing"]
         
-        # Try to find price
-        price = 997
-        for line in lines:
-            if "$" in line:
-                try:
-                    price_str = line.split("$")[1].split()[0].replace(",", "")
-                    price = float(price_str)
-                    break
-                except:
-                    pass
-        
-        # Use first substantial line as title
-        title = lines[0] if lines else "Professional Service Offer"
+        title = extracted["service_name"] or "Professional Service Offer"
         if len(title) > 60:
             title = title[:57] + "..."
         
-        # Extract features
-        features = []
-        for line in lines:
-            if line.startswith("•") or line.startswith("-") or line.startswith("*"):
-                features.append(line[1:].strip())
-            elif len(line.split()) > 3 and len(features) < 5:
-                features.append(line)
-        
-        if not features:
-            features = [
-                "Professional service delivery",
-                "Expert support and guidance",
-                "Proven results and outcomes"
-            ]
+        features = extracted["features"] or [
+            "Professional service delivery",
+            "Expert support and guidance",
+            "Proven results and outcomes"
+        ]
         
         return {
             "title": title,
             "subtitle": "Redesigned and enhanced for maximum impact",
-            "description": " ".join(lines[:5]) if len(lines) > 5 else extracted_content[:400],
+            "description": extracted["description"] or extracted_content[:400],
             "price": {
-                "amount": price,
-                "currency": "USD",
-                "interval": "one-time"
+                "amount": pricing.get("amount", 997),
+                "currency": pricing.get("currency", "USD"),
+                "interval": pricing.get("interval", "one-time")
             },
             "features": features[:7],
+            "targetAudience": extracted["target_audience"],
             "template": "modern",
             "brandColors": {
                 "primary": "#3b82f6",
@@ -735,10 +829,108 @@ class OfferRedesignCrew:
         }
 
 
+class OfferPersonalizationCrew:
+    """
+    Rewrites opted-in fields of an existing offer for each client in a list.
+    One small copywriter call per client instead of a full pipeline; concurrent
+    calls are micro-batched (see crew/batching.py).
+    """
+    
+    def __init__(self):
+        self.trace = RunTrace("offer_personalization")
+    
+    def personalize(
+        self,
+        offer_fields: Dict[str, Any],
+        clients: List[Dict[str, Any]],
+        fields: List[str]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Args:
+            offer_fields: The base offer's title, subtitle, description and features
+            clients: Client details (name, company, industry, fields)
+            fields: Which of offer_fields to rewrite
+            
+        Returns:
+            Parsed LLM output per client, in input order (None where it failed)
+        """
+        logger.info(f"Personalizing {', '.join(fields)} for {len(clients)} clients")
+        results: List[Optional[Dict[str, Any]]] = [None] * len(clients)
+        
+        with ThreadPoolExecutor(max_workers=settings.PERSONALIZE_MAX_PARALLEL) as executor:
+            futures = {
+                executor.submit(
+                    contextvars.copy_context().run,
+                    self._personalize_one,
+                    offer_fields,
+                    client,
+                    fields
+                ): idx
+                for idx, client in enumerate(clients)
+            }
+            for future in as_completed(futures):
+                idx = futures[future]
+                try:
+                    results[idx] = future.result()
+                except Exception as e:
+                    logger.warning(f"Personalization failed for client {idx + 1}: {str(e)}")
+        
+        failed = sum(result is None for result in results)
+        self.trace.finish("completed" if not failed else "fallback")
+        get_token_ledger().record_run(self.trace.crew_type)
+        return results
+    
+    def _personalize_one(
+        self,
+        offer_fields: Dict[str, Any],
+        client: Dict[str, Any],
+        fields: List[str]
+    ) -> Optional[Dict[str, Any]]:
+        personalization_input = json.dumps({
+            "fields": fields,
+            "offer": {field: offer_fields.get(field) for field in fields},
+            "offer_context": {
+                "title": offer_fields.get("title", ""),
+                "description": offer_fields.get("description", "")[:600]
+            },
+            "client": client
+        }, indent=2)
+        
+        with self.trace.span("personalization", stage_input=personalization_input) as span:
+            personalized = run_stage(
+                span, copywriter, create_personalization_task, personalization_input, self._parse_json_result
+            )
+            if not personalized:
+                span.use_fallback("templated_only")
+        return personalized
+    
+    _parse_json_result = OfferCreationCrew._parse_json_result
+
+
 # ============================================================================
 # UTILITY FUNCTIONS
 # ============================================================================
 
+def finish_trace(trace: RunTrace, offer: Dict[str, Any], status: str = "completed") -> Dict[str, Any]:
+    """Close a crew's run trace, stamp its id and wall time onto the offer and record the run"""
+    trace.finish(status)
+    offer["trace_id"] = trace.trace_id
+    offer["processing_time"] = round(trace.duration_seconds, 3)
+    get_performance_monitor().record_execution(
+        crew_type=trace.crew_type,
+        execution_time=trace.duration_seconds,
+        token_usage={
+            "prompt": trace.prompt_tokens,
+            "completion": trace.completion_tokens,
+            "total": trace.prompt_tokens + trace.completion_tokens
+        },
+        success=status == "completed",
+        offer_data=offer
+    )
+    get_token_ledger().record_run(trace.crew_type)
+    return offer
+
+
 def create_offer_from_scratch(user_input: dict) -> Dict[str, Any]:
     """
     Main entry point for creating offers from scratch.
@@ -805,10 +997,22 @@ def validate_offer_completeness(offer_data: dict) -> Dict[str, Any]:
 # ============================================================================
 
 class CrewPerformanceMonitor:
-    """Monitor crew performance, token usage, and execution time"""
+    """
+    Monitor crew performance, token usage, and execution time.
+    Backed by fixed-memory metrics, so it does not grow with the number of executions.
+    """
     
     def __init__(self):
-        self.executions = []
+        self.execution_seconds = crew_execution_seconds
+        self.executions_total = crew_executions_total
+        self.tokens_total = crew_tokens_total
+        self.complexity = registry.histogram(
+            "closealead_offer_complexity",
+            "Complexity score (0-1) of generated offers",
+            ["crew_type"],
+            bounds=tuple(i / 20 for i in range(1, 21)),
+            exposition_step=2
+        )
     
     def record_execution(
         self,
@@ -827,7 +1031,14 @@ class CrewPerformanceMonitor:
             "success": success,
             "offer_complexity": self._calculate_complexity(offer_data) if offer_data else 0
         }
-        self.executions.append(record)
+        
+        self.execution_seconds.observe(execution_time, crew_type=crew_type)
+        self.executions_total.inc(crew_type=crew_type, success=str(bool(success)).lower())
+        self.complexity.observe(record["offer_complexity"], crew_type=crew_type)
+        for kind in ("prompt", "completion"):
+            if token_usage and token_usage.get(kind):
+                self.tokens_total.inc(token_usage[kind], crew_type=crew_type, kind=kind)
+        
         return record
     
     def _calculate_complexity(self, offer_data: dict) -> float:
@@ -855,23 +1066,31 @@ class CrewPerformanceMonitor:
     
     def get_analytics(self) -> dict:
         """Get performance analytics"""
-        if not self.executions:
+        timings = self.execution_seconds.merged()
+        total = int(self.executions_total.total())
+        if not total:
             return {"message": "No executions recorded yet"}
         
-        total = len(self.executions)
-        successful = sum(1 for e in self.executions if e["success"])
-        
-        avg_time = sum(e["execution_time_seconds"] for e in self.executions) / total
-        total_tokens = sum(e["token_usage"].get("total", 0) for e in self.executions if e.get("token_usage"))
+        successful = int(self.executions_total.total(success="true"))
         
         return {
             "total_executions": total,
             "successful": successful,
             "failed": total - successful,
             "success_rate": f"{(successful/total)*100:.1f}%",
-            "average_execution_time": f"{avg_time:.2f}s",
-            "total_tokens_used": total_tokens
+            "average_execution_time": f"{timings.mean:.2f}s",
+            "p50_execution_time": f"{timings.quantile(0.5):.2f}s",
+            "p90_execution_time": f"{timings.quantile(0.9):.2f}s",
+            "p99_execution_time": f"{timings.quantile(0.99):.2f}s",
+            "total_tokens_used": int(self.tokens_total.total())
         }
+    
+    def get_phase_latencies(self) -> dict:
+        """Per-phase latency percentiles in seconds, keyed by crew type and phase"""
+        phases = {}
+        for (crew_type, phase), histogram in crew_phase_seconds.children():
+            phases.setdefault(crew_type, {})[phase] = histogram.snapshot()
+        return phases
 
 
 # ============================================================================
@@ -904,10 +1123,12 @@ class OfferCache:
         
         if key in self.cache:
             self.hits += 1
+            cache_requests_total.inc(cache="offer", result="hit")
             logger.info(f"Cache HIT for key: {key}")
             return self.cache[key]
         
         self.misses += 1
+        cache_requests_total.inc(cache="offer", result="miss")
         logger.info(f"Cache MISS for key: {key}")
         return None
     
@@ -947,11 +1168,24 @@ class OfferCache:
 # ============================================================================
 
 class BatchOfferProcessor:
-    """Process multiple offers in batch for efficiency"""
+    """
+    Process multiple offers in batch for efficiency.
+    
+    iter_batch/aiter_batch yield outcomes as they complete instead of
+    collecting them. Inputs are pulled lazily and at most `window` offers are
+    in flight; nothing new is submitted while the consumer is still handling
+    the last outcome, so a slow consumer throttles the batch.
+    """
     
-    def __init__(self, max_concurrent: int = 3):
+    def __init__(
+        self,
+        max_concurrent: int = 3,
+        window: Optional[int] = None,
+        process_fn: Optional[Callable[[dict, int], dict]] = None
+    ):
         self.max_concurrent = max_concurrent
-        self.results = []
+        self.window = max(window or max_concurrent * 2, max_concurrent)
+        self.process_fn = process_fn or self._process_single_offer
     
     def process_batch(self, offers_data: List[dict]) -> List[dict]:
         """
@@ -961,44 +1195,93 @@ class BatchOfferProcessor:
             offers_data: List of offer input dictionaries
             
         Returns:
-            List of processed offer results
+            List of processed offer results, in input order
         """
         logger.info(f"Starting batch processing of {len(offers_data)} offers")
         start_time = time.time()
         
-        results = []
-        
-        with ThreadPoolExecutor(max_workers=self.max_concurrent) as executor:
-            future_to_offer = {
-                executor.submit(self._process_single_offer, offer_data, idx): idx
-                for idx, offer_data in enumerate(offers_data)
-            }
-            
-            for future in as_completed(future_to_offer):
-                idx = future_to_offer[future]
-                try:
-                    result = future.result()
-                    results.append({
-                        "index": idx,
-                        "success": True,
-                        "offer": result
-                    })
-                    logger.info(f"Completed offer {idx + 1}/{len(offers_data)}")
-                except Exception as e:
-                    logger.error(f"Failed to process offer {idx}: {str(e)}")
-                    results.append({
-                        "index": idx,
-                        "success": False,
-                        "error": str(e)
-                    })
-        
-        results.sort(key=lambda x: x["index"])
+        results = sorted(self.iter_batch(offers_data), key=lambda x: x["index"])
         
         execution_time = time.time() - start_time
         logger.info(f"Batch processing completed in {execution_time:.2f}s")
         
         return results
     
+    def iter_batch(self, offers_data: Iterable[dict]) -> Iterator[dict]:
+        """Yield {"index", "success", "offer" | "error"} in completion order"""
+        source = enumerate(offers_data)
+        in_flight: Dict[Future, int] = {}
+        pending = queue_depth.labels(queue="batch_offers")
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrent)
+        
+        def refill():
+            for idx, offer_data in itertools.islice(source, self.window - len(in_flight)):
+                future = executor.submit(contextvars.copy_context().run, self.process_fn, offer_data, idx)
+                in_flight[future] = idx
+                pending.inc()
+        
+        try:
+            refill()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.dec()
+                    yield self._outcome(future, in_flight.pop(future))
+                refill()
+        finally:
+            # Consumer stopped early: drop queued work, let running offers finish in the background
+            for future in in_flight:
+                future.cancel()
+            pending.dec(len(in_flight))
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    async def aiter_batch(self, offers_data: Iterable[dict]) -> AsyncIterator[dict]:
+        """Async variant of iter_batch for use inside request handlers"""
+        loop = asyncio.get_running_loop()
+        source = enumerate(offers_data)
+        in_flight: Dict[asyncio.Future, int] = {}
+        pending = queue_depth.labels(queue="batch_offers")
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrent)
+        
+        def refill():
+            for idx, offer_data in itertools.islice(source, self.window - len(in_flight)):
+                future = loop.run_in_executor(
+                    executor, contextvars.copy_context().run, self.process_fn, offer_data, idx
+                )
+                in_flight[future] = idx
+                pending.inc()
+        
+        try:
+            refill()
+            while in_flight:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    pending.dec()
+                    yield self._outcome(future, in_flight.pop(future))
+                refill()
+        finally:
+            for future in in_flight:
+                future.cancel()
+            pending.dec(len(in_flight))
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _outcome(self, future, idx: int) -> dict:
+        try:
+            result = future.result()
+            logger.info(f"Completed offer {idx + 1}")
+            return {
+                "index": idx,
+                "success": True,
+                "offer": result
+            }
+        except Exception as e:
+            logger.error(f"Failed to process offer {idx}: {str(e)}")
+            return {
+                "index": idx,
+                "success": False,
+                "error": str(e)
+            }
+    
     def _process_single_offer(self, offer_data: dict, index: int) -> dict:
         """Process a single offer"""
         logger.info(f"Processing offer {index}...")
@@ -1011,92 +1294,61 @@ class BatchOfferProcessor:
 # ============================================================================
 
 class AsyncOfferProcessor:
-    """Process offers asynchronously with webhook callbacks"""
+    """
+    Process offers asynchronously with webhook callbacks.
+    Jobs live in the durable queue (services.job_queue) and are normally run
+    by worker.py; process_job runs one in-process.
+    """
     
     def __init__(self):
-        self.pending_jobs = {}
+        from services.job_queue import get_job_queue, default_worker_id
+        self.queue = get_job_queue()
+        self.worker_id = default_worker_id()
     
-    def create_job(self, user_input: dict, webhook_url: Optional[str] = None) -> str:
+    def create_job(self, user_id: str, user_input: dict, webhook_url: Optional[str] = None) -> str:
         """
         Create an async job for offer generation.
         Returns job_id for tracking
         """
-        import uuid
-        
-        job_id = str(uuid.uuid4())
-        
-        self.pending_jobs[job_id] = {
-            "status": "pending",
-            "user_input": user_input,
-            "webhook_url": webhook_url,
-            "created_at": time.time(),
-            "result": None
-        }
-        
-        logger.info(f"Created async job: {job_id}")
-        return job_id
-    
-    def process_job(self, job_id: str):
-        """Process a job asynchronously (call from background worker)"""
-        if job_id not in self.pending_jobs:
-            raise ValueError(f"Job {job_id} not found")
-        
-        job = self.pending_jobs[job_id]
-        job["status"] = "processing"
+        from core.database import SessionLocal
         
+        db = SessionLocal()
         try:
-            crew = OfferCreationCrew()
-            result = crew.create(job["user_input"])
-            
-            job["status"] = "completed"
-            job["result"] = result
-            job["completed_at"] = time.time()
-            
-            if job["webhook_url"]:
-                self._send_webhook(job["webhook_url"], {
-                    "job_id": job_id,
-                    "status": "completed",
-                    "result": result
-                })
-            
-            logger.info(f"Job {job_id} completed successfully")
-            
-        except Exception as e:
-            job["status"] = "failed"
-            job["error"] = str(e)
-            
-            if job["webhook_url"]:
-                self._send_webhook(job["webhook_url"], {
-                    "job_id": job_id,
-                    "status": "failed",
-                    "error": str(e)
-                })
-            
-            logger.error(f"Job {job_id} failed: {str(e)}")
+            job = self.queue.enqueue(db, user_id, "offer_creation", user_input, webhook_url=webhook_url)
+            return job.id
+        finally:
+            db.close()
     
-    def _send_webhook(self, url: str, data: dict):
-        """Send webhook notification"""
-        try:
-            import requests
-            response = requests.post(url, json=data, timeout=10)
-            response.raise_for_status()
-            logger.info(f"Webhook sent successfully to {url}")
-        except Exception as e:
-            logger.error(f"Failed to send webhook: {str(e)}")
+    def process_job(self, job_id: str):
+        """Lease and run a queued job in this process"""
+        jobs = self.queue.lease(self.worker_id, limit=1, job_id=job_id)
+        if not jobs:
+            raise ValueError(f"Job {job_id} not found or not ready")
+        self.queue.run(jobs[0], self.worker_id)
     
     def get_job_status(self, job_id: str) -> dict:
         """Get the status of a job"""
-        if job_id not in self.pending_jobs:
-            return {"error": "Job not found"}
+        from core.database import SessionLocal
+        from models.job import Job
         
-        job = self.pending_jobs[job_id]
-        return {
-            "job_id": job_id,
-            "status": job["status"],
-            "created_at": job["created_at"],
-            "result": job.get("result"),
-            "error": job.get("error")
-        }
+        db = SessionLocal()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if not job:
+                return {"error": "Job not found"}
+            return {
+                "job_id": job.id,
+                "status": job.status,
+                "attempts": job.attempts,
+                "created_at": job.created_at.timestamp() if job.created_at else None,
+                "result": job.load_result(),
+                "error": job.error,
+                "result_storage": job.result_storage,
+                "result_bytes": job.result_bytes,
+                "stored_bytes": job.stored_bytes
+            }
+        finally:
+            db.close()
 
 
 # ============================================================================
@@ -1121,10 +1373,19 @@ def clear_all_caches():
     logger.info("All caches cleared")
 
 def get_system_stats() -> dict:
-    """Get overall system statistics"""
+    """Get overall system statistics, read from the shared metrics registry"""
+    offer_hit_rate = cache_hit_rate("offer")
+    
     return {
         "performance": _performance_monitor.get_analytics(),
-        "cache": _offer_cache.get_stats()
+        "phases": _performance_monitor.get_phase_latencies(),
+        "cache": {
+            **_offer_cache.get_stats(),
+            "hit_rate": f"{offer_hit_rate * 100:.1f}%" if offer_hit_rate is not None else "0.0%"
+        },
+        "queues": {
+            labels[0]: gauge.value for labels, gauge in queue_depth.children()
+        }
     }
 
 
@@ -1272,9 +1533,11 @@ def validate_crew_configuration() -> dict:
 __all__ = [
     "OfferCreationCrew",
     "OfferRedesignCrew",
+    "OfferPersonalizationCrew",
     "create_offer_from_scratch",
     "redesign_existing_offer",
     "validate_offer_completeness",
+    "finish_trace",
     "CrewPerformanceMonitor",
     "OfferCache",
     "BatchOfferProcessor",
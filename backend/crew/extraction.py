@@ -0,0 +1,411 @@
+# crew/extraction.py
+"""
+Deterministic structured extraction for uploaded offer documents.
+Pulls prices, headings, bullet lists, guarantees and bonuses out of the raw
+text with precompiled patterns and returns the gather-stage schema with a
+confidence per field, so well-structured documents can skip the LLM gatherer.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+import re
+
+# ----------------------------------------------------------------------------
+# Patterns (compiled once at import)
+# ----------------------------------------------------------------------------
+
+CURRENCY_SYMBOLS = {"$": "USD", "€": "EUR", "£": "GBP", "¥": "JPY", "₹": "INR"}
+CURRENCY_CODES = ("USD", "EUR", "GBP", "CAD", "AUD", "NZD", "INR", "JPY", "CHF")
+
+_PRICE = re.compile(
+    r"(?:(?P<code1>" + "|".join(CURRENCY_CODES) + r")\s*)?"
+    r"(?P<symbol>[$€£¥₹])\s?(?P<amount1>\d{1,3}(?:[,.]\d{3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)\s?(?P<k1>[kK])?\b"
+    r"|\b(?P<amount2>\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)\s?(?P<k2>[kK])?\s?(?P<code2>"
+    + "|".join(CURRENCY_CODES) + r")\b"
+)
+_INTERVALS = [
+    ("monthly", re.compile(r"^\s*(?:/\s*|per\s+|a\s+|each\s+)(?:mo|month)\b|^\s*monthly\b", re.I)),
+    ("annually", re.compile(r"^\s*(?:/\s*|per\s+|a\s+|each\s+)(?:yr|year|annum)\b|^\s*(?:annually|yearly)\b", re.I)),
+    ("weekly", re.compile(r"^\s*(?:/\s*|per\s+|a\s+|each\s+)(?:wk|week)\b|^\s*weekly\b", re.I)),
+    ("one-time", re.compile(r"^\s*(?:one[\s-]time|once|lifetime|flat)\b", re.I))
+]
+_PRICE_CONTEXT = re.compile(
+    r"\b(?:price|pricing|investment|cost|fee|only|just|pay|tuition|enrol+|join|retainer)\b", re.I
+)
+_STRIKETHROUGH_CONTEXT = re.compile(r"\b(?:value|worth|normally|regularly|was|save|savings)\b", re.I)
+
+_CLAUSE_BREAK = re.compile(r"[.;!?|]\s")
+
+_MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(?P<text>.+?)\s*#*$")
+_BULLET = re.compile(r"^(?:[•\-*·▪►✓✔☑➤→]|\d{1,2}[.)]|\[[ xX]\])\s+(?P<text>.+)$")
+_SENTENCE_END = re.compile(r"[.!?:;,]$")
+
+_FEATURE_SECTION = re.compile(
+    r"\b(?:features?|includes?|included|what you(?:'|’)?ll get|what you get|deliverables|"
+    r"inside|modules?|curriculum|benefits?|services?|package)\b", re.I
+)
+_AUDIENCE_SECTION = re.compile(r"\b(?:who (?:is )?(?:this|it) (?:is )?for|ideal client|is this for you)\b", re.I)
+_GUARANTEE_SECTION = re.compile(r"\bguarantee", re.I)
+_BONUS_SECTION = re.compile(r"\bbonus", re.I)
+
+_AUDIENCE = re.compile(
+    r"\b(?:designed|built|made|created|perfect|ideal|tailored)\s+for\s+(?P<who>[^.\n!?]{6,120})"
+    r"|\bhelps?\s+(?P<who2>[^.\n!?]{6,120}?)\s+(?:to\s+|get\s+|achieve\s+|grow\s+|build\s+|turn\s+)",
+    re.I
+)
+_GUARANTEE = re.compile(
+    r"[^.\n!?]*\b(?:guarantee[ds]?|money[\s-]back|full refund|refund|risk[\s-]free)\b[^.\n!?]*[.!]?", re.I
+)
+_BONUS = re.compile(r"[^.\n!?]*\b(?:bonus(?:es)?|free gift|plus you(?:'|’)?ll (?:also )?get)\b[^.\n!?]*[.!]?", re.I)
+_URGENCY = re.compile(
+    r"[^.\n!?]*\b(?:limited (?:time|spots|seats|availability)|only \d+ (?:spots|seats|places)|"
+    r"deadline|expires?|ends (?:on|soon|at)|enrol+ment closes|spots? left)\b[^.\n!?]*[.!]?",
+    re.I
+)
+_SOCIAL_PROOF = re.compile(
+    r"[^.\n!?]*\b(?:testimonials?|trusted by|rated|reviews?|case stud(?:y|ies)|"
+    r"\d[\d,]*\+?\s+(?:clients|customers|students|businesses|members))\b[^.\n!?]*[.!]?",
+    re.I
+)
+
+SERVICE_TYPES = [
+    ("coaching", re.compile(r"\bcoach(?:ing)?\b|\bmentor(?:ing|ship)\b", re.I)),
+    ("course", re.compile(r"\b(?:course|masterclass|program(?:me)?|academy|bootcamp|workshop)\b", re.I)),
+    ("consulting", re.compile(r"\bconsult(?:ing|ancy|ant)?\b|\badvisory\b", re.I)),
+    ("software", re.compile(r"\b(?:software|saas|app|platform|subscription)\b", re.I)),
+    ("agency", re.compile(r"\b(?:agency|done[\s-]for[\s-]you|dfy)\b", re.I))
+]
+
+# Headings that label a section rather than name the offer
+GENERIC_HEADINGS = re.compile(
+    r"^(?:about|overview|introduction|pricing|price|investment|features?|benefits?|faq|faqs|"
+    r"contact|testimonials?|guarantee|bonus(?:es)?|what you(?:'|’)?ll get|who (?:is )?this (?:is )?for|"
+    r"table of contents|contents|summary)\b",
+    re.I
+)
+
+# Critical gather fields, matching chunking.merge_partials
+CRITICAL_FIELDS = ["service_name", "pricing", "features", "target_audience", "description"]
+LIST_LIMITS = {
+    "features": 12,
+    "guarantees": 5,
+    "bonuses": 8,
+    "urgency_elements": 5,
+    "social_proof_hints": 8
+}
+
+
+# ----------------------------------------------------------------------------
+# Document structure
+# ----------------------------------------------------------------------------
+
+def _is_heading(line: str, next_line: Optional[str]) -> bool:
+    if _MARKDOWN_HEADING.match(line):
+        return True
+    words = line.split()
+    if not 1 <= len(words) <= 10 or len(line) > 80 or _BULLET.match(line):
+        return False
+    if _SENTENCE_END.search(line) and not line.endswith(":"):
+        return False
+    # "Price: $1,500" is a labelled value, not a section
+    if ":" in line.rstrip(":") or _PRICE.search(line):
+        return False
+    if line.isupper() and any(c.isalpha() for c in line):
+        return True
+    # Title Case line followed by body text, or a "Label:" line
+    capitalized = sum(1 for w in words if w[:1].isupper() or not w[:1].isalpha())
+    return line.endswith(":") or (capitalized == len(words) and next_line is not None)
+
+
+def _heading_text(line: str) -> str:
+    match = _MARKDOWN_HEADING.match(line)
+    text = match.group("text") if match else line
+    return text.rstrip(":").strip()
+
+
+def _sections(text: str) -> Tuple[List[Tuple[str, int, List[str]]], List[str]]:
+    """Split text into (heading, markdown level, body lines) plus the body lines before any heading"""
+    lines = [line.strip() for line in text.replace("\f", "\n").split("\n")]
+    lines = [line for line in lines if line]
+    sections: List[Tuple[str, int, List[str]]] = []
+    preamble: List[str] = []
+
+    for idx, line in enumerate(lines):
+        next_line = lines[idx + 1] if idx + 1 < len(lines) else None
+        if _is_heading(line, next_line):
+            match = _MARKDOWN_HEADING.match(line)
+            sections.append((_heading_text(line), len(match.group(1)) if match else 0, []))
+        elif sections:
+            sections[-1][2].append(line)
+        else:
+            preamble.append(line)
+
+    return sections, preamble
+
+
+def _bullets(lines: List[str]) -> List[str]:
+    items = []
+    for line in lines:
+        match = _BULLET.match(line)
+        if match:
+            items.append(match.group("text").strip())
+    return items
+
+
+def _dedupe(items: List[str], limit: int) -> List[str]:
+    seen, result = set(), []
+    for item in items:
+        item = re.sub(r"\s+", " ", item).strip(" .-")
+        key = item.lower()
+        if item and key not in seen:
+            seen.add(key)
+            result.append(item)
+    return result[:limit]
+
+
+# ----------------------------------------------------------------------------
+# Field extractors: each returns (value, confidence)
+# ----------------------------------------------------------------------------
+
+def _parse_amount(raw: str, thousands: Optional[str]) -> float:
+    # "1.997" / "1,997" are thousands groupings; "19.99" is cents
+    if re.fullmatch(r"\d{1,3}(?:[,.]\d{3})+", raw):
+        raw = re.sub(r"[,.]", "", raw)
+    else:
+        raw = raw.replace(",", "")
+    amount = float(raw)
+    return amount * 1000 if thousands else amount
+
+
+def _find_prices(text: str) -> List[Dict[str, Any]]:
+    prices = []
+    for match in _PRICE.finditer(text):
+        raw = match.group("amount1") or match.group("amount2")
+        try:
+            amount = _parse_amount(raw, match.group("k1") or match.group("k2"))
+        except ValueError:
+            continue
+        if amount <= 0:
+            continue
+
+        code = match.group("code1") or match.group("code2")
+        currency = code.upper() if code else CURRENCY_SYMBOLS.get(match.group("symbol"), "USD")
+
+        after = text[match.end():match.end() + 24]
+        interval = next((name for name, pattern in _INTERVALS if pattern.search(after)), None)
+
+        line_start = text.rfind("\n", 0, match.start()) + 1
+        line_end = text.find("\n", match.end())
+        line = text[line_start:line_end if line_end != -1 else len(text)]
+        # Only the clause leading up to the price: "Normally $5,000. Now $2,997" anchors the first one
+        before = _CLAUSE_BREAK.split(text[max(line_start, match.start() - 40):match.start()])[-1]
+
+        prices.append({
+            "amount": amount,
+            "currency": currency,
+            "interval": interval,
+            "anchored": bool(_PRICE_CONTEXT.search(line)),
+            "crossed_out": bool(_STRIKETHROUGH_CONTEXT.search(before))
+        })
+    return prices
+
+
+def extract_pricing(text: str, pricing_section: Optional[str] = None) -> Tuple[Dict[str, Any], float]:
+    """Pick the offer price: prefer a price section, then price-worded lines, ignoring 'value'/'was' anchors"""
+    candidates = _find_prices(pricing_section) if pricing_section else []
+    from_section = bool(candidates)
+    if not candidates:
+        candidates = _find_prices(text)
+    if not candidates:
+        return {}, 0.0
+
+    asking = [p for p in candidates if not p["crossed_out"]] or candidates
+    anchored = [p for p in asking if p["anchored"]]
+    chosen = (anchored or asking)[0]
+
+    if from_section or anchored:
+        confidence = 0.9
+    elif len({p["amount"] for p in asking}) == 1:
+        confidence = 0.75
+    else:
+        confidence = 0.5
+
+    pricing = {
+        "amount": int(chosen["amount"]) if chosen["amount"].is_integer() else chosen["amount"],
+        "currency": chosen["currency"],
+        "interval": chosen["interval"] or "one-time"
+    }
+    if chosen["interval"] is None:
+        confidence = round(confidence * 0.9, 2)
+    return pricing, confidence
+
+
+def _first_paragraph(lines: List[str]) -> Tuple[str, float]:
+    paragraph: List[str] = []
+    for line in lines:
+        if _BULLET.match(line) or (_PRICE.search(line) and len(line.split()) < 8):
+            if paragraph:
+                break
+            continue
+        paragraph.append(line)
+        if len(" ".join(paragraph).split()) >= 60:
+            break
+    description = " ".join(paragraph).strip()
+    words = len(description.split())
+    if words >= 20:
+        return description, 0.8
+    if words >= 8:
+        return description, 0.6
+    return description, 0.3 if description else 0.0
+
+
+def _matches(pattern: re.Pattern, text: str, limit: int) -> List[str]:
+    return _dedupe([m.group(0) for m in pattern.finditer(text)], limit)
+
+
+# ----------------------------------------------------------------------------
+# Public API
+# ----------------------------------------------------------------------------
+
+def extract_offer_fields(text: str) -> Dict[str, Any]:
+    """
+    Extract the gather-stage schema from document text without calling an LLM.
+    Adds field_confidence (0-1 per field) and extraction_confidence (mean over
+    the critical fields); fields that were not found are left empty.
+    """
+    sections, preamble = _sections(text)
+    flat = text.replace("\f", "\n")
+    confidence: Dict[str, float] = {}
+
+    # Service name: first non-generic heading, H1 preferred
+    named = [(title, level) for title, level, _ in sections if not GENERIC_HEADINGS.match(title)]
+    h1 = next((title for title, level in named if level == 1), None)
+    if h1:
+        service_name, confidence["service_name"] = h1, 0.9
+    elif named and not preamble:
+        service_name, confidence["service_name"] = named[0][0], 0.8
+    elif named:
+        service_name, confidence["service_name"] = named[0][0], 0.6
+    else:
+        service_name, confidence["service_name"] = "", 0.0
+    service_name = service_name[:120]
+
+    def section_body(pattern: re.Pattern) -> List[str]:
+        lines: List[str] = []
+        for title, _, body in sections:
+            if pattern.search(title):
+                lines.extend(body)
+        return lines
+
+    # Pricing
+    pricing_lines = section_body(re.compile(r"\b(?:pric(?:e|ing)|investment|cost|fees?|plans?)\b", re.I))
+    pricing, confidence["pricing"] = extract_pricing(flat, "\n".join(pricing_lines) or None)
+
+    # Features: bullets under a feature-like heading, else every bullet
+    guarantee_lines = section_body(_GUARANTEE_SECTION)
+    bonus_lines = section_body(_BONUS_SECTION)
+    feature_bullets = _bullets(section_body(_FEATURE_SECTION))
+    if len(feature_bullets) >= 2:
+        features, confidence["features"] = feature_bullets, 0.9
+    else:
+        excluded = {line.lower() for line in _bullets(guarantee_lines + bonus_lines + pricing_lines)}
+        features = [b for b in _bullets(flat.split("\n")) if b.lower() not in excluded]
+        confidence["features"] = 0.75 if len(features) >= 3 else (0.4 if features else 0.0)
+    features = _dedupe(features, LIST_LIMITS["features"])
+
+    # Target audience: explicit section, then "designed for ..." phrasing
+    audience_lines = section_body(_AUDIENCE_SECTION)
+    audience_match = _AUDIENCE.search(flat)
+    if audience_lines:
+        audience_items = _bullets(audience_lines) or audience_lines[:1]
+        target_audience, confidence["target_audience"] = "; ".join(audience_items[:4]), 0.85
+    elif audience_match:
+        who = audience_match.group("who") or audience_match.group("who2")
+        target_audience, confidence["target_audience"] = who.strip(" ,"), 0.75
+    else:
+        target_audience, confidence["target_audience"] = "", 0.0
+
+    # Description: first real paragraph, preferring text before the first section break
+    description, confidence["description"] = _first_paragraph(preamble)
+    if confidence["description"] < 0.6:
+        body = [line for _, _, lines in sections for line in lines]
+        description, confidence["description"] = max(
+            (_first_paragraph(preamble), _first_paragraph(body)), key=lambda pair: pair[1]
+        )
+
+    service_type = next((name for name, pattern in SERVICE_TYPES if pattern.search(flat)), "")
+    confidence["service_type"] = 0.6 if service_type else 0.0
+
+    guarantees = _dedupe(
+        _bullets(guarantee_lines) or guarantee_lines[:2] or _matches(_GUARANTEE, flat, 5),
+        LIST_LIMITS["guarantees"]
+    )
+    bonuses = _dedupe(_bullets(bonus_lines) or _matches(_BONUS, flat, 8), LIST_LIMITS["bonuses"])
+    confidence["guarantees"] = 0.85 if guarantees else 0.0
+    confidence["bonuses"] = 0.85 if bonuses else 0.0
+
+    critical_present = {
+        "service_name": bool(service_name),
+        "pricing": bool(pricing.get("amount")),
+        "features": bool(features),
+        "target_audience": bool(target_audience),
+        "description": bool(description)
+    }
+    overall = sum(confidence[field] for field in CRITICAL_FIELDS) / len(CRITICAL_FIELDS)
+
+    return {
+        "service_name": service_name,
+        "service_type": service_type,
+        "description": description,
+        "target_audience": target_audience,
+        "problem_solved": "",
+        "transformation": "",
+        "pricing": pricing,
+        "features": features,
+        "guarantees": guarantees,
+        "bonuses": bonuses,
+        "urgency_elements": _matches(_URGENCY, flat, LIST_LIMITS["urgency_elements"]),
+        "social_proof_hints": _matches(_SOCIAL_PROOF, flat, LIST_LIMITS["social_proof_hints"]),
+        "unique_value_proposition": "",
+        "brand_personality": "",
+        "industry": "",
+        "completeness_score": round(sum(critical_present.values()) / len(critical_present), 2),
+        "missing_critical_info": [field for field, present in critical_present.items() if not present],
+        "field_confidence": {field: round(value, 2) for field, value in confidence.items()},
+        "extraction_confidence": round(overall, 2),
+        "inference_notes": "Extracted deterministically from document structure"
+    }
+
+
+def is_confident(extracted: Dict[str, Any], threshold: float) -> bool:
+    """True when the local extraction is good enough to skip the LLM gatherer"""
+    field_confidence = extracted.get("field_confidence", {})
+    return (
+        extracted.get("extraction_confidence", 0.0) >= threshold
+        and not extracted.get("missing_critical_info")
+        # Name and price are never guessed by the later phases, so both must be solid
+        and field_confidence.get("service_name", 0.0) >= threshold
+        and field_confidence.get("pricing", 0.0) >= threshold
+    )
+
+
+def fill_missing(primary: Dict[str, Any], fallback: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill fields the LLM left empty with locally extracted values (LLM output wins otherwise)"""
+    filled = dict(primary)
+    for field, value in fallback.items():
+        if field in ("field_confidence", "extraction_confidence", "inference_notes"):
+            continue
+        current = filled.get(field)
+        if field == "pricing":
+            if value.get("amount") and not (isinstance(current, dict) and current.get("amount")):
+                filled[field] = value
+        elif not current and value:
+            filled[field] = value
+    return filled
+
+
+__all__ = [
+    "extract_offer_fields",
+    "extract_pricing",
+    "fill_missing",
+    "is_confident"
+]
@@ -0,0 +1,124 @@
+# crew/replay.py
+"""
+Replay a recorded generation run stage by stage.
+
+Usage:
+    python -m crew.replay <trace_id>
+    python -m crew.replay <trace_id> --phase copywriting
+"""
+
+from crewai import Crew, Process
+from crew.agents import (
+    information_gatherer,
+    copywriter,
+    design_strategist,
+    quality_assurance
+)
+from crew.tasks import (
+    create_gather_info_task,
+    create_copywriting_task,
+    create_copy_enhancement_task,
+    create_personalization_task,
+    create_design_strategy_task,
+    create_qa_task
+)
+from crew.tracing import RunTrace
+from typing import Dict, Any, List, Optional
+import argparse
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Phase name -> (agent, task factory taking the recorded stage input)
+REPLAY_STAGES = {
+    "information_gathering": (information_gatherer, create_gather_info_task),
+    "content_extraction": (information_gatherer, create_gather_info_task),
+    "copywriting": (copywriter, create_copywriting_task),
+    "copy_enhancement": (copywriter, create_copy_enhancement_task),
+    "personalization": (copywriter, create_personalization_task),
+    "design_strategy": (design_strategist, create_design_strategy_task),
+    "quality_assurance": (quality_assurance, create_qa_task)
+}
+
+
+def load_trace(trace_id: str) -> Optional[dict]:
+    """Load a persisted trace, including recorded stage inputs"""
+    from core.database import SessionLocal
+    from models.generation_trace import GenerationTrace
+
+    db = SessionLocal()
+    try:
+        record = db.query(GenerationTrace).filter(GenerationTrace.id == trace_id).first()
+        return record.to_dict(include_inputs=True) if record else None
+    finally:
+        db.close()
+
+
+def replay_trace(trace: dict, phases: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Re-run the recorded stage inputs of a trace against the current agents.
+    Each stage is replayed in isolation with its original input, so results
+    can be compared span by span with the original run.
+    """
+    replay = RunTrace(f"replay:{trace['crewType']}")
+    comparison = []
+
+    for original in trace.get("spans", []):
+        phase = original["phase"]
+        if phases and phase not in phases:
+            continue
+        if phase not in REPLAY_STAGES or original.get("stage_input") is None:
+            logger.warning(f"Skipping phase without replayable input: {phase}")
+            continue
+
+        agent, task_factory = REPLAY_STAGES[phase]
+        task = task_factory(agent, original["stage_input"])
+        crew = Crew(
+            agents=[agent],
+            tasks=[task],
+            process=Process.sequential,
+            verbose=False
+        )
+
+        with replay.span(phase, stage_input=original["stage_input"]) as span:
+            result = span.kickoff(crew)
+
+        replayed = span.to_dict()
+        comparison.append({
+            "phase": phase,
+            "original": {k: original.get(k) for k in ("llm_seconds", "prompt_tokens", "completion_tokens", "fallback")},
+            "replay": {k: replayed[k] for k in ("llm_seconds", "prompt_tokens", "completion_tokens")},
+            "output": str(result)
+        })
+
+    replay.finish()
+    return {
+        "trace_id": trace["id"],
+        "replay_trace_id": replay.trace_id,
+        "duration_seconds": round(replay.duration_seconds, 3),
+        "stages": comparison
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Replay a recorded generation trace")
+    parser.add_argument("trace_id")
+    parser.add_argument("--phase", action="append", help="Only replay this phase (repeatable)")
+    parser.add_argument("--list", action="store_true", help="Print the recorded spans without replaying")
+    args = parser.parse_args(argv)
+
+    trace = load_trace(args.trace_id)
+    if not trace:
+        raise SystemExit(f"Trace {args.trace_id} not found")
+
+    if args.list:
+        print(json.dumps(trace, indent=2, default=str))
+        return
+
+    print(json.dumps(replay_trace(trace, args.phase), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
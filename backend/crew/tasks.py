@@ -292,6 +292,59 @@ Now create the copy. Make it legendary.
     )
 
 
+def create_copy_enhancement_task(agent, offer_data: str):
+    """
+    Redesign copy pass: keep the extracted offer intact, rewrite it to persuade.
+    """
+    
+    return Task(
+        description=f"""
+        ORIGINAL OFFER DATA:
+        {offer_data}
+        
+        ENHANCEMENT TASK:
+        This is a redesign. Keep the core service intact but dramatically improve:
+        1. Headlines - more compelling
+        2. Features - transform into benefit-driven statements
+        3. Overall persuasiveness - add emotional triggers and power words
+        
+        Preserve original pricing and core offering.
+        """,
+        agent=agent,
+        expected_output="JSON with enhanced copy"
+    )
+
+
+def create_personalization_task(agent, personalization_input: str):
+    """
+    Light per-client rewrite of selected fields of an already generated offer.
+    """
+    
+    return Task(
+        description=f"""
+<task_context>
+An offer has already been written and approved. It is now being sent to one specific client.
+Rewrite ONLY the fields listed in "fields" so they speak directly to this client: their name,
+company, industry and any notes provided. Everything else about the offer stays as it is.
+</task_context>
+
+<personalization_input>
+{personalization_input}
+</personalization_input>
+
+<rules>
+1. Keep the offer's promise, price, tone and structure; change framing, not substance
+2. Use the client's details naturally; never invent facts about them
+3. Keep each field about the same length as the original
+4. "features" stays a list with the same number of items
+5. OUTPUT ONLY JSON containing exactly the requested fields - no commentary
+</rules>
+        """,
+        agent=agent,
+        expected_output="JSON object with the personalized fields only"
+    )
+
+
 def create_design_strategy_task(agent, complete_data: str):
     """
     Strategic design task using O1's reasoning capabilities to make optimal visual decisions.
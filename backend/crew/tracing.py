@@ -0,0 +1,258 @@
+# crew/tracing.py
+"""
+Generation tracing for CloseALead crews
+Records monotonic-clock spans per phase so we can see where generation time goes
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from core.metrics import crew_phase_seconds, crew_llm_seconds
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# The span currently executing in this thread/task, so LLM callbacks can attribute usage
+_current_span: ContextVar[Optional["PhaseSpan"]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional["PhaseSpan"]:
+    return _current_span.get()
+
+
+def _usage_counts(usage: Any) -> Tuple[int, int]:
+    """Pull prompt/completion token counts out of a crewai UsageMetrics or a plain dict"""
+    if not usage:
+        return 0, 0
+
+    if not isinstance(usage, dict):
+        if hasattr(usage, "model_dump"):
+            usage = usage.model_dump()
+        else:
+            usage = getattr(usage, "__dict__", {})
+
+    return (
+        int(usage.get("prompt_tokens", 0) or 0),
+        int(usage.get("completion_tokens", 0) or 0)
+    )
+
+
+class PhaseSpan:
+    """Timing and token accounting for a single crew phase"""
+
+    def __init__(self, phase: str, trace_start: float, stage_input: Any = None, crew_type: str = ""):
+        self.phase = phase
+        self.crew_type = crew_type
+        self.stage_input = stage_input
+        self._trace_start = trace_start
+        self._started = time.perf_counter()
+        self._ended = None
+        self.llm_seconds = 0.0
+        self.parse_seconds = 0.0
+        self.llm_calls = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.fallback = None
+        self.status = "running"
+        self.error = None
+        self.model = ""
+        self.batch_size = 1
+        # False for shared micro-batch calls: each caller books its own share
+        self.bill_ledger = True
+
+    def kickoff(self, crew) -> Any:
+        """Run crew.kickoff(), timing the LLM round trip and collecting token usage"""
+        if self.llm_calls:
+            self.retries += 1
+
+        tokens_before = self.prompt_tokens + self.completion_tokens
+        start = time.perf_counter()
+        try:
+            result = crew.kickoff()
+        finally:
+            self.llm_seconds += time.perf_counter() - start
+            self.llm_calls += 1
+
+        # LLM callbacks report per-call usage; fall back to the crew's totals if none arrived
+        if self.prompt_tokens + self.completion_tokens == tokens_before:
+            usage = getattr(result, "token_usage", None) or getattr(crew, "usage_metrics", None)
+            self.add_tokens(*_usage_counts(usage))
+        return result
+
+    def parse(self, parser, result: Any) -> Any:
+        """Run a result parser, timing how long it takes"""
+        start = time.perf_counter()
+        try:
+            return parser(result)
+        finally:
+            self.parse_seconds += time.perf_counter() - start
+
+    def add_tokens(self, prompt_tokens: int, completion_tokens: int):
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+
+    def add_shared_call(self, shared: "PhaseSpan", batch_size: int, first: bool):
+        """Charge this span its share of an LLM call made on behalf of a micro-batch"""
+        if self.llm_calls:
+            self.retries += 1
+        self.llm_calls += 1
+        self.llm_seconds += shared.llm_seconds
+        self.batch_size = batch_size
+        self.model = shared.model
+        # Remainders go to the first caller so the shares add up exactly
+        self.add_tokens(
+            shared.prompt_tokens // batch_size + (shared.prompt_tokens % batch_size if first else 0),
+            shared.completion_tokens // batch_size + (shared.completion_tokens % batch_size if first else 0)
+        )
+
+    def use_fallback(self, name: str):
+        """Mark that this phase fell back to a non-AI default"""
+        self.fallback = name
+
+    def finish(self, status: str = "completed", error: Optional[str] = None):
+        self._ended = time.perf_counter()
+        self.status = status
+        self.error = error
+
+    @property
+    def duration_seconds(self) -> float:
+        end = self._ended if self._ended is not None else time.perf_counter()
+        return end - self._started
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "phase": self.phase,
+            "status": self.status,
+            "offset_seconds": round(self._started - self._trace_start, 6),
+            "duration_seconds": round(self.duration_seconds, 6),
+            "llm_seconds": round(self.llm_seconds, 6),
+            "parse_seconds": round(self.parse_seconds, 6),
+            "llm_calls": self.llm_calls,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "batch_size": self.batch_size,
+            "fallback": self.fallback,
+            "error": self.error,
+            "stage_input": self.stage_input
+        }
+
+
+class RunTrace:
+    """
+    Trace of one crew run.
+    Spans are measured with time.perf_counter(); only started_at is wall-clock.
+    """
+
+    def __init__(self, crew_type: str):
+        self.trace_id = str(uuid.uuid4())
+        self.crew_type = crew_type
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._ended = None
+        self.spans: List[PhaseSpan] = []
+        self.status = "running"
+
+    @contextmanager
+    def span(self, phase: str, stage_input: Any = None):
+        """Record a phase. Exceptions mark the span as failed and propagate."""
+        span = PhaseSpan(phase, self._started, stage_input, self.crew_type)
+        self.spans.append(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.finish("error", str(e))
+            raise
+        else:
+            span.finish("fallback" if span.fallback else "completed")
+        finally:
+            _current_span.reset(token)
+            crew_phase_seconds.observe(span.duration_seconds, crew_type=self.crew_type, phase=phase)
+            if span.llm_calls:
+                crew_llm_seconds.observe(span.llm_seconds, crew_type=self.crew_type, phase=phase)
+
+    def finish(self, status: str = "completed"):
+        if self._ended is None:
+            self._ended = time.perf_counter()
+        self.status = status
+
+    @property
+    def duration_seconds(self) -> float:
+        end = self._ended if self._ended is not None else time.perf_counter()
+        return end - self._started
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(span.prompt_tokens for span in self.spans)
+
+    @property
+    def completion_tokens(self) -> int:
+        return sum(span.completion_tokens for span in self.spans)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "crew_type": self.crew_type,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_seconds": round(self.duration_seconds, 6),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "spans": [span.to_dict() for span in self.spans]
+        }
+
+
+# ============================================================================
+# PERSISTENCE
+# ============================================================================
+
+def save_trace(
+    trace: RunTrace,
+    user_id: Optional[str] = None,
+    offer_id: Optional[str] = None,
+    db=None
+) -> str:
+    """
+    Persist a finished trace to the generation_traces table.
+    Opens its own session when none is passed, so it can be called from worker threads.
+    """
+    from core.database import SessionLocal
+    from models.generation_trace import GenerationTrace
+
+    owns_session = db is None
+    db = db or SessionLocal()
+    try:
+        data = trace.to_dict()
+        record = GenerationTrace(
+            id=trace.trace_id,
+            offer_id=offer_id,
+            user_id=user_id,
+            crew_type=trace.crew_type,
+            status=trace.status,
+            duration_seconds=data["duration_seconds"],
+            prompt_tokens=data["prompt_tokens"],
+            completion_tokens=data["completion_tokens"],
+            spans=data["spans"]
+        )
+        db.merge(record)
+        db.commit()
+        return trace.trace_id
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to persist trace {trace.trace_id}: {str(e)}")
+        raise
+    finally:
+        if owns_session:
+            db.close()
+
+
+__all__ = [
+    "PhaseSpan",
+    "RunTrace",
+    "current_span",
+    "save_trace"
+]
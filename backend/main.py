@@ -1,12 +1,19 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
 import os
+import time
 from dotenv import load_dotenv
 
-from api.v1 import auth, offers, users
+from api.v1 import auth, offers, users, jobs, preview
+from core.config import settings
 from core.database import engine, Base
+from services.usage import get_token_ledger
+from services.document_service import get_extraction_pool
+from services.pdf_service import get_render_pool
+from services.pdf_prerender import get_prerenderer
+from core.metrics import registry, http_request_seconds, http_requests_total, CONTENT_TYPE_LATEST
 
 load_dotenv()
 
@@ -17,8 +24,15 @@ Base.metadata.create_all(bind=engine)
 async def lifespan(app: FastAPI):
     # Startup
     print("🚀 Starting CloseALead API Server...")
+    get_token_ledger().start()
+    if settings.PDF_RENDER_PREWARM:
+        await get_render_pool().start()
     yield
     # Shutdown
+    await get_prerenderer().shutdown()
+    await get_extraction_pool().shutdown()
+    await get_render_pool().shutdown()
+    get_token_ledger().stop()
     print("👋 Shutting down CloseALead API Server...")
 
 app = FastAPI(
@@ -39,10 +53,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, so offer ids don't explode cardinality
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        http_request_seconds.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route_path
+        )
+        http_requests_total.inc(method=request.method, route=route_path, status=status_code)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
 app.include_router(offers.router, prefix="/api/v1/offers", tags=["Offers"])
 app.include_router(users.router, prefix="/api/v1/users", tags=["Users"])
+app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["Jobs"])
+app.include_router(preview.router, prefix="/api/v1/preview", tags=["Preview"])
 
 @app.get("/")
 async def root():
@@ -54,7 +89,14 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "pools": [get_render_pool().stats(), get_extraction_pool().stats()]
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(content=registry.render(), media_type=CONTENT_TYPE_LATEST)
 
 # Global exception handler
 @app.exception_handler(Exception)
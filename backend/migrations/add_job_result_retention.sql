@@ -0,0 +1,17 @@
+-- Migration: Job result retention (compressed storage and TTL eviction)
+-- Date: 2026-10-19
+-- Only needed for databases whose jobs table predates these columns;
+-- fresh databases get them from create_all.
+
+ALTER TABLE jobs ADD COLUMN result_blob BYTEA;
+ALTER TABLE jobs ADD COLUMN result_storage VARCHAR(20);
+ALTER TABLE jobs ADD COLUMN result_bytes INTEGER;
+ALTER TABLE jobs ADD COLUMN stored_bytes INTEGER;
+
+-- Existing completed results are stored inline
+UPDATE jobs
+SET result_storage = 'inline'
+WHERE status = 'completed' AND result IS NOT NULL;
+
+-- Verify changes
+SELECT 'Migration completed successfully' AS status;
@@ -0,0 +1,7 @@
+-- Migration: Track the pre-rendered PDF behind offers.pdf_url
+-- Date: 2026-10-19
+
+ALTER TABLE offers ADD COLUMN pdf_render_key VARCHAR(64);
+
+-- Verify changes
+SELECT 'Migration completed successfully' AS status;
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, ForeignKey, String, Integer, Text, DateTime, JSON
+from datetime import datetime
+from core.database import Base
+
+class DocumentArtifact(Base):
+    """A user's uploaded document keyed by the SHA-256 of its bytes, with derived outputs"""
+    __tablename__ = "document_artifacts"
+
+    # Per user: results carry the uploader's trace id and source file name
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    sha256 = Column(String(64), primary_key=True)
+    filename = Column(String(255))
+    kind = Column(String(10))
+    size_bytes = Column(Integer)
+    pages = Column(Integer)
+
+    # Derived outputs, reused on repeat uploads
+    extracted_text = Column(Text)
+    gathered_data = Column(JSON)
+    copy_data = Column(JSON)
+    result = Column(JSON)
+
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
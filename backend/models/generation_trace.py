@@ -0,0 +1,40 @@
+from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, JSON
+from datetime import datetime
+from core.database import Base
+
+class GenerationTrace(Base):
+    __tablename__ = "generation_traces"
+
+    id = Column(String, primary_key=True)
+    offer_id = Column(String, ForeignKey("offers.id", ondelete="CASCADE"), nullable=True, index=True)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)
+
+    crew_type = Column(String(50), nullable=False)
+    status = Column(String(20), default="completed")
+
+    # Totals across all phases
+    duration_seconds = Column(Float, default=0.0)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+
+    # Per-phase spans, including the stage inputs needed for replay
+    spans = Column(JSON, default=list)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def to_dict(self, include_inputs: bool = False):
+        spans = self.spans or []
+        if not include_inputs:
+            spans = [{k: v for k, v in span.items() if k != "stage_input"} for span in spans]
+
+        return {
+            "id": self.id,
+            "offerId": self.offer_id,
+            "crewType": self.crew_type,
+            "status": self.status,
+            "durationSeconds": self.duration_seconds,
+            "promptTokens": self.prompt_tokens,
+            "completionTokens": self.completion_tokens,
+            "spans": spans,
+            "createdAt": self.created_at.isoformat() if self.created_at else None
+        }
@@ -0,0 +1,84 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, JSON, Index, LargeBinary
+from sqlalchemy.orm import deferred
+from datetime import datetime
+import json
+import uuid
+import enum
+import zlib
+from core.database import Base
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    DEAD = "dead"  # Out of attempts; kept for inspection and manual retry
+
+class ResultStorage(str, enum.Enum):
+    INLINE = "inline"  # JSON in the result column
+    COMPRESSED = "compressed"  # zlib-compressed JSON in result_blob
+    EVICTED = "evicted"  # Dropped after the retention TTL
+
+class Job(Base):
+    """Durable background job, leased by worker processes"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_ready", "status", "run_after"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    kind = Column(String(50), nullable=False)
+    status = Column(String(20), default=JobStatus.QUEUED.value, nullable=False)
+
+    payload = Column(JSON)
+    # Results are only loaded when read (see load_result)
+    result = deferred(Column(JSON))
+    result_blob = deferred(Column(LargeBinary))
+    result_storage = Column(String(20))
+    result_bytes = Column(Integer)  # Uncompressed JSON size
+    stored_bytes = Column(Integer)  # Size as currently stored
+    error = Column(String(1000))
+    webhook_url = Column(String(500))
+
+    # Retry bookkeeping
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Lease held by the worker currently running the job
+    lease_owner = Column(String(100))
+    lease_expires_at = Column(DateTime)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    def load_result(self):
+        if self.result_storage == ResultStorage.COMPRESSED.value:
+            return json.loads(zlib.decompress(self.result_blob))
+        if self.result_storage == ResultStorage.EVICTED.value:
+            return None
+        return self.result
+
+    def to_dict(self, include_result: bool = True):
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "attempts": self.attempts,
+            "maxAttempts": self.max_attempts,
+            "error": self.error,
+            "runAfter": self.run_after.isoformat() if self.run_after else None,
+            "createdAt": self.created_at.isoformat() if self.created_at else None,
+            "startedAt": self.started_at.isoformat() if self.started_at else None,
+            "finishedAt": self.finished_at.isoformat() if self.finished_at else None,
+            "resultStorage": self.result_storage,
+            "footprint": {
+                "resultBytes": self.result_bytes,
+                "storedBytes": self.stored_bytes
+            }
+        }
+        if include_result:
+            data["result"] = self.load_result()
+        return data
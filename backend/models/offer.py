@@ -36,6 +36,7 @@ class Offer(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     pdf_url = Column(String(500))
+    pdf_render_key = Column(String(64))  # Render key of the pre-rendered PDF behind pdf_url
 
     # Relationships
     user = relationship("User", back_populates="offers")
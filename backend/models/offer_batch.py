@@ -0,0 +1,52 @@
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey
+from datetime import datetime
+import uuid
+from core.database import Base
+
+class OfferBatch(Base):
+    """A batch generation run; counters advance as checkpoints are written"""
+    __tablename__ = "offer_batches"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(String(20), default="running")  # running, completed, cancelled, failed
+
+    total = Column(Integer, default=0)
+    completed = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "createdAt": self.created_at.isoformat() if self.created_at else None,
+            "updatedAt": self.updated_at.isoformat() if self.updated_at else None,
+            "finishedAt": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class OfferBatchItem(Base):
+    """Outcome of one input of a batch, written with its offer in the same transaction"""
+    __tablename__ = "offer_batch_items"
+
+    batch_id = Column(String, ForeignKey("offer_batches.id", ondelete="CASCADE"), primary_key=True)
+    index = Column(Integer, primary_key=True)
+    success = Column(Boolean, nullable=False)
+    offer_id = Column(String, ForeignKey("offers.id", ondelete="SET NULL"))
+    error = Column(String(500))
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "index": self.index,
+            "success": self.success,
+            "offerId": self.offer_id,
+            "error": self.error
+        }
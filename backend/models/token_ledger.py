@@ -0,0 +1,29 @@
+from sqlalchemy import Column, String, Integer, Float, Date
+from core.database import Base
+
+class TokenLedgerEntry(Base):
+    """Token usage aggregated per user, plan, stage and UTC day"""
+    __tablename__ = "token_ledger"
+
+    user_id = Column(String, primary_key=True)
+    plan = Column(String(20), primary_key=True)
+    stage = Column(String(50), primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+
+    prompt_tokens = Column(Integer, default=0, nullable=False)
+    completion_tokens = Column(Integer, default=0, nullable=False)
+    llm_calls = Column(Integer, default=0, nullable=False)
+    runs = Column(Integer, default=0, nullable=False)  # Completed crew runs (generations)
+    cost_usd = Column(Float, default=0.0, nullable=False)
+
+    def to_dict(self):
+        return {
+            "plan": self.plan,
+            "stage": self.stage,
+            "day": self.day.isoformat() if self.day else None,
+            "promptTokens": self.prompt_tokens,
+            "completionTokens": self.completion_tokens,
+            "llmCalls": self.llm_calls,
+            "runs": self.runs,
+            "costUsd": round(self.cost_usd or 0.0, 6)
+        }
@@ -0,0 +1,54 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, JSON, Index
+from datetime import datetime
+import uuid
+import enum
+from core.database import Base
+
+class DeliveryStatus(str, enum.Enum):
+    PENDING = "pending"
+    DELIVERING = "delivering"
+    DELIVERED = "delivered"
+    DEAD = "dead"
+
+class WebhookDelivery(Base):
+    """Outbox row for one webhook event, written with the state change it reports"""
+    __tablename__ = "webhook_deliveries"
+    __table_args__ = (
+        Index("ix_webhook_deliveries_due", "status", "next_attempt_at"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), index=True)
+    job_id = Column(String, index=True)
+    url = Column(String(500), nullable=False)
+    event = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String(20), default=DeliveryStatus.PENDING.value, nullable=False)
+
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=8, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(String(500))
+    last_status_code = Column(Integer)
+
+    # Dispatcher currently sending this event
+    lease_owner = Column(String(100))
+    lease_expires_at = Column(DateTime)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    delivered_at = Column(DateTime)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "jobId": self.job_id,
+            "url": self.url,
+            "event": self.event,
+            "status": self.status,
+            "attempts": self.attempts,
+            "lastError": self.last_error,
+            "lastStatusCode": self.last_status_code,
+            "nextAttemptAt": self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            "createdAt": self.created_at.isoformat() if self.created_at else None,
+            "deliveredAt": self.delivered_at.isoformat() if self.delivered_at else None
+        }
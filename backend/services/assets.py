@@ -0,0 +1,303 @@
+"""
+Remote asset cache for PDF renders (offer logos and images).
+
+Assets are fetched once with strict timeouts and a size cap, stored
+content-addressed on local disk (least-recently-used eviction past
+ASSET_CACHE_MAX_MB), and kept with a downscaled variant so WeasyPrint never
+decodes a 6000px photo to draw a 48px logo. asset_url_fetcher is passed to
+WeasyPrint: it answers from the cache, so repeat renders never touch the
+network, and a failed fetch is remembered for ASSET_FAILURE_TTL so one slow
+host costs at most one timeout. Only http(s) and data: URLs are loaded.
+
+The URLs are user supplied, so every fetch and every redirect hop resolves
+the host first and refuses loopback, private, link-local and other
+non-public addresses (cloud metadata endpoints included). The connection
+then goes to the checked address, so a second DNS answer can't swap it.
+
+Render paths call prefetch() from the API process before handing HTML to a
+render worker. The HTTP client is injectable, and hosts listed in
+ASSET_ALLOWED_PRIVATE_HOSTS skip the address check, so a local stand-in
+server can serve assets in tests.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from html import unescape
+from io import BytesIO
+from typing import Dict, Iterable, List, Optional, Tuple
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import re
+import socket
+import tempfile
+import time
+
+import httpx
+
+from core.config import settings
+from core.metrics import registry
+from services.storage import LocalArtifactStore, content_key
+
+logger = logging.getLogger(__name__)
+
+asset_requests_total = registry.counter(
+    "closealead_asset_requests_total",
+    "Asset lookups by outcome (hit, fetched, failed, known_failure, skipped)",
+    ["outcome"]
+)
+
+MAX_REDIRECTS = 3
+
+_IMG_SRC = re.compile(r'<img\b[^>]*\bsrc="(https?://[^"]+)"', re.IGNORECASE)
+
+
+def asset_urls(html_content: str) -> List[str]:
+    """Remote image URLs referenced by rendered offer HTML"""
+    return list(dict.fromkeys(unescape(url) for url in _IMG_SRC.findall(html_content)))
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _downscale(data: bytes, mime: str, max_dimension: int) -> Optional[Tuple[bytes, str]]:
+    """Smaller re-encoded copy of a raster image, or None if it's already small enough"""
+    if mime == "image/svg+xml":
+        return None
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(BytesIO(data)) as image:
+            if max(image.size) <= max_dimension:
+                return None
+            image.thumbnail((max_dimension, max_dimension))
+            if image.mode in ("RGBA", "LA", "P"):
+                fmt, mime = "PNG", "image/png"
+            else:
+                fmt, mime = "JPEG", "image/jpeg"
+                image = image.convert("RGB")
+            out = BytesIO()
+            image.save(out, fmt, optimize=True, quality=85)
+            return out.getvalue(), mime
+    except Exception as e:
+        logger.warning(f"Could not downscale asset: {str(e)}")
+        return None
+
+
+def _allowed_private_hosts() -> set:
+    return {host.strip().lower() for host in settings.ASSET_ALLOWED_PRIVATE_HOSTS.split(",") if host.strip()}
+
+
+def public_address(host: str, port: int) -> str:
+    """An address host resolves to; raises ValueError if any of them is not public"""
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError) as e:
+        raise ValueError(f"cannot resolve {host}: {str(e)}")
+    addresses = [info[4][0] for info in infos]
+    for address in addresses:
+        # Drop an IPv6 zone id (fe80::1%eth0)
+        if not ipaddress.ip_address(address.split("%")[0]).is_global:
+            raise ValueError(f"{host} resolves to a non-public address ({address})")
+    return addresses[0]
+
+
+class AssetCache:
+    """URL index plus content-addressed blobs on local disk, shared by all processes"""
+
+    def __init__(self, root: str, max_bytes: int, client: Optional[httpx.Client] = None):
+        self.root = root
+        self.blobs = LocalArtifactStore(os.path.join(root, "blobs"), max_bytes)
+        self._client = client
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            # Redirects are followed in _download, so every hop gets the address check
+            self._client = httpx.Client(
+                timeout=httpx.Timeout(settings.ASSET_FETCH_TIMEOUT),
+                follow_redirects=False,
+                headers={"User-Agent": "CloseALead-Assets/1.0"}
+            )
+        return self._client
+
+    # ------------------------------------------------------------------
+    # Index entries: one small JSON file per URL
+    # ------------------------------------------------------------------
+
+    def _index_path(self, url: str) -> str:
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, "index", name[:2], f"{name}.json")
+
+    def _read_entry(self, url: str) -> Optional[dict]:
+        try:
+            with open(self._index_path(url), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_entry(self, url: str, entry: dict):
+        path = self._index_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def _blob_key(self, digest: str, mime: str) -> str:
+        return content_key("assets", digest, mime.split("/")[-1].split("+")[0] or "bin")
+
+    # ------------------------------------------------------------------
+    # Fetching
+    # ------------------------------------------------------------------
+
+    def _pinned(self, url: httpx.URL) -> Tuple[httpx.URL, dict, dict]:
+        """(URL to connect to, headers, extensions) for url, pinned to a checked public address"""
+        if url.scheme not in ("http", "https"):
+            raise ValueError(f"refusing {url.scheme}: URL")
+        if url.host.lower() in _allowed_private_hosts():
+            return url, {}, {}
+        address = public_address(url.host, url.port or (443 if url.scheme == "https" else 80))
+        # Host header, TLS SNI and certificate checks still use the name
+        return (
+            url.copy_with(host=address),
+            {"Host": url.netloc.decode("ascii")},
+            {"sni_hostname": url.host} if url.scheme == "https" else {}
+        )
+
+    def _download(self, url: str) -> Tuple[bytes, str]:
+        """GET url within ASSET_FETCH_TIMEOUT overall and ASSET_MAX_BYTES; raises on anything else"""
+        deadline = time.monotonic() + settings.ASSET_FETCH_TIMEOUT
+        target = httpx.URL(url)
+        for _ in range(MAX_REDIRECTS + 1):
+            request_url, headers, extensions = self._pinned(target)
+            with self.client.stream("GET", request_url, headers=headers, extensions=extensions) as response:
+                if response.is_redirect:
+                    target = target.join(response.headers["location"])
+                    continue
+                response.raise_for_status()
+                mime = response.headers.get("content-type", "").split(";")[0].strip().lower()
+                if not mime.startswith("image/"):
+                    raise ValueError(f"not an image ({mime or 'no content type'})")
+                body = bytearray()
+                for chunk in response.iter_bytes():
+                    body.extend(chunk)
+                    if len(body) > settings.ASSET_MAX_BYTES:
+                        raise ValueError(f"larger than {settings.ASSET_MAX_BYTES} bytes")
+                    # Per-read timeouts alone would let a trickling server hold the render
+                    if time.monotonic() > deadline:
+                        raise httpx.ReadTimeout("asset download exceeded its deadline")
+                return bytes(body), mime
+        raise ValueError(f"more than {MAX_REDIRECTS} redirects")
+
+    def _fetch(self, url: str, previous: Optional[dict] = None) -> Optional[dict]:
+        try:
+            data, mime = self._download(url)
+        except Exception as e:
+            logger.warning(f"Asset fetch failed for {url}: {str(e)}")
+            if previous and "error" not in previous and self.blobs.exists(
+                self._blob_key(previous["digest"], previous["mime"])
+            ):
+                # A failed refresh keeps serving the copy we already have
+                asset_requests_total.inc(outcome="failed")
+                return previous
+            self._write_entry(url, {"url": url, "error": str(e)[:200], "failedAt": datetime.utcnow().isoformat()})
+            asset_requests_total.inc(outcome="failed")
+            return None
+
+        digest = _digest(data)
+        self.blobs.put(self._blob_key(digest, mime), data, mime)
+        entry = {
+            "url": url,
+            "digest": digest,
+            "mime": mime,
+            "fetchedAt": datetime.utcnow().isoformat(),
+            "variants": {}
+        }
+        variant = _downscale(data, mime, settings.ASSET_MAX_DIMENSION)
+        if variant is not None:
+            variant_data, variant_mime = variant
+            variant_digest = _digest(variant_data)
+            self.blobs.put(self._blob_key(variant_digest, variant_mime), variant_data, variant_mime)
+            entry["variants"][str(settings.ASSET_MAX_DIMENSION)] = {"digest": variant_digest, "mime": variant_mime}
+        self._write_entry(url, entry)
+        asset_requests_total.inc(outcome="fetched")
+        return entry
+
+    def _usable(self, entry: Optional[dict], refresh: bool) -> bool:
+        """Whether an index entry can be answered without fetching"""
+        if entry is None:
+            return False
+        if "error" in entry:
+            failed_at = datetime.fromisoformat(entry["failedAt"])
+            return datetime.utcnow() - failed_at < timedelta(seconds=settings.ASSET_FAILURE_TTL)
+        if not self.blobs.exists(self._blob_key(entry["digest"], entry["mime"])):
+            return False
+        if refresh:
+            fetched_at = datetime.fromisoformat(entry["fetchedAt"])
+            return datetime.utcnow() - fetched_at < timedelta(seconds=settings.ASSET_TTL)
+        return True
+
+    def lookup(self, url: str, refresh: bool = False) -> Optional[dict]:
+        """Index entry for url, fetching it unless cached (or a recent failure)"""
+        entry = self._read_entry(url)
+        if self._usable(entry, refresh):
+            asset_requests_total.inc(outcome="known_failure" if "error" in entry else "hit")
+        else:
+            entry = self._fetch(url, previous=entry)
+        return entry if entry and "error" not in entry else None
+
+    def get(self, url: str) -> Optional[Tuple[bytes, str]]:
+        """(bytes, mime type) of the render variant for url, or None if unavailable"""
+        entry = self.lookup(url)
+        if entry is None:
+            return None
+        variant = entry["variants"].get(str(settings.ASSET_MAX_DIMENSION), entry)
+        data = self.blobs.get(self._blob_key(variant["digest"], variant["mime"]))
+        if data is None:
+            # Evicted between lookup and read
+            entry = self._fetch(url)
+            if entry is None:
+                return None
+            variant = entry["variants"].get(str(settings.ASSET_MAX_DIMENSION), entry)
+            data = self.blobs.get(self._blob_key(variant["digest"], variant["mime"]))
+        return (data, variant["mime"]) if data is not None else None
+
+    def prefetch(self, urls: Iterable[str]):
+        """Warm the cache for urls in parallel, refreshing entries older than ASSET_TTL"""
+        urls = list(urls)
+        if not urls:
+            return
+        with ThreadPoolExecutor(max_workers=min(len(urls), settings.ASSET_FETCH_CONCURRENCY)) as executor:
+            list(executor.map(lambda url: self.lookup(url, refresh=True), urls))
+
+
+_asset_cache: Optional[AssetCache] = None
+
+def get_asset_cache() -> AssetCache:
+    """Get the process-wide asset cache"""
+    global _asset_cache
+    if _asset_cache is None:
+        root = settings.ASSET_CACHE_DIR or os.path.join(tempfile.gettempdir(), "closealead-assets")
+        _asset_cache = AssetCache(root, settings.ASSET_CACHE_MAX_MB * 1024 * 1024)
+    return _asset_cache
+
+
+def asset_url_fetcher(url: str, timeout: int = 10, ssl_context=None) -> Dict:
+    """WeasyPrint url_fetcher: remote images from the asset cache, data: URLs inline, nothing else"""
+    if url.startswith("data:"):
+        from weasyprint import default_url_fetcher
+        return default_url_fetcher(url)
+    if not url.startswith(("http://", "https://")):
+        asset_requests_total.inc(outcome="skipped")
+        raise ValueError(f"Refusing to load {url.split(':', 1)[0]}: URL")
+
+    asset = get_asset_cache().get(url)
+    if asset is None:
+        raise ValueError(f"Asset unavailable: {url}")
+    data, mime = asset
+    return {"string": data, "mime_type": mime, "redirected_url": url}
@@ -0,0 +1,157 @@
+"""
+Checkpointed persistence for batch offer generation.
+
+Finished batch items are buffered and written in chunked transactions: each
+flush inserts the generated offers, their batch items and the batch counters
+together, so a crash loses at most one unflushed chunk and never leaves an
+item recorded without its offer.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import logging
+import math
+import re
+import uuid
+
+from core.database import SessionLocal
+from models.offer import Offer
+from models.offer_batch import OfferBatch, OfferBatchItem
+from models.generation_trace import GenerationTrace
+
+logger = logging.getLogger(__name__)
+
+_NUMBER = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+
+def price_amount(value: Any) -> float:
+    """LLM price amount as a float: "$1,500" -> 1500.0; missing or non-numeric ("custom") -> 0.0"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value) if math.isfinite(value) else 0.0
+    match = _NUMBER.search(value) if isinstance(value, str) else None
+    return float(match.group().replace(",", "")) if match else 0.0
+
+
+def offer_from_generated(user_id: str, generated: Dict[str, Any], edit_limit: int) -> Offer:
+    """Build an Offer row from crew output (the same shape the editor posts back)"""
+    price = generated.get("price")
+    if not isinstance(price, dict):
+        price = {}
+    return Offer(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        title=(generated.get("title") or "Professional Service")[:200],
+        subtitle=(generated.get("subtitle") or "")[:300],
+        description=generated.get("description") or "",
+        client_name=(generated.get("clientName") or "")[:200],
+        price_amount=price_amount(price.get("amount")),
+        price_currency=(price.get("currency") or "USD")[:3],
+        price_interval=(price.get("interval") or "one-time")[:20],
+        features=generated.get("features") or [],
+        template=generated.get("template") or "modern",
+        brand_colors=generated.get("brandColors") or {},
+        edit_limit=edit_limit
+    )
+
+
+class BatchCheckpointWriter:
+    """Buffers finished batch items and persists them chunk by chunk"""
+
+    def __init__(self, batch_id: str, user_id: str, edit_limit: int, chunk_size: int = 25):
+        self.batch_id = batch_id
+        self.user_id = user_id
+        self.edit_limit = edit_limit
+        self.chunk_size = chunk_size
+        self.persisted = 0
+        self._buffer: List[tuple] = []
+
+    def add(self, outcome: Dict[str, Any]) -> Optional[str]:
+        """
+        Buffer one processor outcome. Returns the id its offer will be stored
+        under (assigned now, so it can be reported before the checkpoint).
+        Generated output that can't be turned into an offer marks the outcome
+        failed instead of raising, so the rest of the batch carries on.
+        """
+        offer = None
+        if outcome["success"]:
+            try:
+                offer = offer_from_generated(self.user_id, outcome["offer"], self.edit_limit)
+            except Exception as e:
+                logger.warning(f"Batch {self.batch_id} item {outcome['index']} produced an unusable offer: {str(e)}")
+                outcome.update(success=False, error=f"Invalid generated offer: {str(e)}")
+        self._buffer.append((outcome, offer))
+        return offer.id if offer is not None else None
+
+    @property
+    def due(self) -> bool:
+        return len(self._buffer) >= self.chunk_size
+
+    def flush(self) -> int:
+        """Write buffered items in one transaction; returns how many were persisted"""
+        if not self._buffer:
+            return 0
+        buffer, self._buffer = self._buffer, []
+
+        db = SessionLocal()
+        try:
+            completed = failed = 0
+            trace_links = {}
+            for outcome, offer in buffer:
+                if offer is not None:
+                    db.add(offer)
+                    completed += 1
+                    if outcome["offer"].get("trace_id"):
+                        trace_links[outcome["offer"]["trace_id"]] = offer.id
+                else:
+                    failed += 1
+            db.flush()
+
+            db.add_all([
+                OfferBatchItem(
+                    batch_id=self.batch_id,
+                    index=outcome["index"],
+                    success=outcome["success"],
+                    offer_id=offer.id if offer is not None else None,
+                    error=(outcome.get("error") or "")[:500] or None
+                )
+                for outcome, offer in buffer
+            ])
+
+            for trace_id, offer_id in trace_links.items():
+                db.query(GenerationTrace).filter(
+                    GenerationTrace.id == trace_id,
+                    GenerationTrace.user_id == self.user_id,
+                    GenerationTrace.offer_id.is_(None)
+                ).update({"offer_id": offer_id}, synchronize_session=False)
+
+            db.query(OfferBatch).filter(OfferBatch.id == self.batch_id).update({
+                "completed": OfferBatch.completed + completed,
+                "failed": OfferBatch.failed + failed,
+                "updated_at": datetime.utcnow()
+            }, synchronize_session=False)
+
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to checkpoint batch {self.batch_id} ({len(buffer)} items): {str(e)}")
+            # Keep the chunk for the next flush rather than dropping finished work
+            self._buffer = buffer + self._buffer
+            return 0
+        finally:
+            db.close()
+
+        self.persisted += len(buffer)
+        return len(buffer)
+
+    def finish(self, status: str = "completed"):
+        """Flush what's left and close the batch"""
+        self.flush()
+        db = SessionLocal()
+        try:
+            db.query(OfferBatch).filter(OfferBatch.id == self.batch_id).update({
+                "status": status if not self._buffer else "failed",
+                "finished_at": datetime.utcnow()
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
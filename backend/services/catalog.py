@@ -0,0 +1,160 @@
+"""
+Multi-offer catalog PDFs.
+
+All selected offers go into one HTML document, preceded by a table of
+contents whose page numbers WeasyPrint fills in with target-counter(). The
+document is laid out in a single pass in the PDF render pool, so fonts,
+stylesheets and images are loaded once for the whole pack. (The direct
+writer in services.pdf_direct draws single offers only; a catalog needs the
+full layout pass for its page references.) Every offer keeps
+its own brand colors through custom properties scoped to its <article>, plus
+gradient rules resolved per #offer-N (WeasyPrint can't resolve var() inside
+gradients), and its title becomes a PDF bookmark.
+
+A page range (e.g. "3-7") renders the full layout, so TOC numbers still
+match, then writes only the selected pages. Catalogs are stored in the
+artifact store like single-offer PDFs and served from there, which gives
+byte-range (Range header) support for streaming viewers.
+"""
+from html import escape
+from io import BytesIO
+from typing import List, Optional, Tuple
+import hashlib
+import re
+import threading
+
+from starlette.concurrency import run_in_threadpool
+from weasyprint import CSS, HTML
+
+from core.config import settings
+from models.offer import Offer
+from services.assets import asset_url_fetcher, asset_urls, get_asset_cache
+from services.pdf_service import RENDERER_VERSION, TEMPLATE_VERSION, get_render_pool, store_artifact
+from services.pdf_templates import SECTIONS, brand_rules, brand_variables, get_template
+
+CATALOG_VERSION = "1"
+
+CATALOG_MARKUP = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>{title}</title>
+    <style>:root {{ {default_brand} }}{brand_rules}</style>
+</head>
+<body>
+    <nav class="toc">
+        <h1>{title}</h1>
+        <ol>{entries}
+        </ol>
+    </nav>{articles}
+</body>
+</html>
+"""
+
+CATALOG_CSS = """
+.toc { padding: 60px 40px; }
+.toc h1 { font-size: 36px; margin: 0 0 30px 0; }
+.toc ol { list-style: none; margin: 0; padding: 0; }
+.toc li { font-size: 16px; padding: 10px 0; border-bottom-width: 1px; border-bottom-style: solid; border-bottom-color: #e5e7eb; }
+.toc a { color: #111827; text-decoration: none; }
+.toc a::after { content: leader('.') target-counter(attr(href), page); }
+.toc .client { color: #6b7280; }
+.catalog-offer { break-before: page; }
+.catalog-offer .header h1 { bookmark-level: 1; }
+"""
+
+_stylesheet: Optional[CSS] = None
+_stylesheet_lock = threading.Lock()
+
+_PAGE_RANGE = re.compile(r"^\s*(\d*)\s*-\s*(\d*)\s*$|^\s*(\d+)\s*$")
+
+
+def catalog_stylesheet() -> CSS:
+    global _stylesheet
+    if _stylesheet is None:
+        with _stylesheet_lock:
+            if _stylesheet is None:
+                _stylesheet = CSS(string=CATALOG_CSS)
+    return _stylesheet
+
+
+def parse_page_range(spec: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """"3-7", "3-", "-7" or "5" as 1-based inclusive (first, last); raises ValueError"""
+    if not spec:
+        return None, None
+    match = _PAGE_RANGE.match(spec)
+    if not match:
+        raise ValueError("pages must look like 3-7, 3-, -7 or 5")
+    if match.group(3):
+        first = last = int(match.group(3))
+    else:
+        first = int(match.group(1)) if match.group(1) else None
+        last = int(match.group(2)) if match.group(2) else None
+    if first == 0 or last == 0 or (first and last and first > last):
+        raise ValueError("Invalid page range")
+    return first, last
+
+
+def build_catalog_html(offers: List[Offer], title: str) -> Tuple[str, List[str]]:
+    """One HTML document for all offers, plus the distinct templates it uses"""
+    entries, articles, rules, templates = [], [], [], []
+    for index, offer in enumerate(offers, start=1):
+        template = get_template(offer.template)
+        if template.name not in templates:
+            templates.append(template.name)
+        client = f' <span class="client">— {escape(offer.client_name)}</span>' if offer.client_name else ""
+        entries.append(
+            f'\n            <li><a href="#offer-{index}">{escape(offer.title or "Untitled offer")}{client}</a></li>'
+        )
+        rules.append(f"\n    {brand_rules(offer.brand_colors, scope=f'#offer-{index} ')}")
+        body = "\n    ".join(template.render_section(name, offer) for name in SECTIONS)
+        articles.append(
+            f'\n    <article class="catalog-offer" id="offer-{index}" '
+            f'style="{escape(brand_variables(offer.brand_colors))}">\n    {body}\n    </article>'
+        )
+    html_content = CATALOG_MARKUP.format(
+        title=escape(title),
+        default_brand=brand_variables(None),
+        brand_rules="".join(rules),
+        entries="".join(entries),
+        articles="".join(articles)
+    )
+    return html_content, templates
+
+
+def catalog_key(html_content: str, templates: List[str], first: Optional[int], last: Optional[int]) -> str:
+    """Artifact key for one catalog render (content, templates, renderer and page range)"""
+    prefix = f"catalog-{CATALOG_VERSION}:{TEMPLATE_VERSION}:{RENDERER_VERSION}:{','.join(templates)}:{first}-{last}:"
+    return hashlib.sha256((prefix + html_content).encode("utf-8")).hexdigest()
+
+
+def render_catalog_pdf(
+    html_content: str,
+    templates: List[str],
+    first: Optional[int] = None,
+    last: Optional[int] = None
+) -> bytes:
+    """Lay out the whole catalog once and write the selected pages (runs inside render pool workers)"""
+    stylesheets = [get_template(name).stylesheet() for name in templates] + [catalog_stylesheet()]
+    document = HTML(string=html_content, url_fetcher=asset_url_fetcher).render(stylesheets=stylesheets)
+    if first or last:
+        selected = document.pages[(first or 1) - 1:last or len(document.pages)]
+        if not selected:
+            # Range past the end of the document
+            return b""
+        document = document.copy(selected)
+    pdf_file = BytesIO()
+    document.write_pdf(pdf_file)
+    return pdf_file.getvalue()
+
+
+async def render_catalog(html_content: str, templates: List[str], key: str, first: Optional[int], last: Optional[int]) -> bytes:
+    """Render in the process pool and store the result under key (empty bytes: range out of bounds)"""
+    await run_in_threadpool(get_asset_cache().prefetch, asset_urls(html_content))
+    pdf_content = await get_render_pool().submit(
+        render_catalog_pdf, html_content, templates, first, last,
+        timeout=settings.CATALOG_RENDER_TIMEOUT
+    )
+    if pdf_content:
+        await run_in_threadpool(store_artifact, key, pdf_content)
+    return pdf_content
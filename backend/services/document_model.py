@@ -0,0 +1,279 @@
+"""
+Format-neutral offer document model and its exporters.
+
+build_document() turns an offer into a flat tree of blocks (headings,
+paragraphs, lists, images, the price) once per offer version: the tree is
+cached under the offer's render key, so repeat exports in any format only
+pay for serialization. Every exporter reads the same normalized values
+(collapsed whitespace, safe image URLs, price and interval text shared
+with the PDF templates), so formats can't drift apart.
+
+    EXPORTERS[format].serialize(document) -> bytes
+
+DOCX (python-docx), standalone HTML and Markdown are serialized here. PDF
+keeps its own render cache and layout paths (services.pdf_service).
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from html import escape
+from io import BytesIO
+from typing import Callable, Dict, Optional, Tuple
+import logging
+import re
+import threading
+
+from core.config import settings
+from services.pdf_templates import DEFAULT_BRAND_COLORS, brand_variables, image_url, interval_text, price_text
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Block:
+    kind: str  # heading, paragraph, list, image, price
+    text: str = ""
+    level: int = 1
+    role: str = ""  # paragraph flavour: subtitle, note
+    strong: str = ""  # bold text following text (note: the client name)
+    detail: str = ""  # price interval
+    items: Tuple[str, ...] = ()
+    url: str = ""
+
+
+@dataclass(frozen=True)
+class OfferDocument:
+    key: str
+    title: str
+    brand: Tuple[Tuple[str, str], ...]
+    blocks: Tuple[Block, ...]
+
+    def color(self, name: str) -> str:
+        return dict(self.brand).get(name, DEFAULT_BRAND_COLORS[name])
+
+
+def _collapse(text) -> str:
+    return " ".join(str(text or "").split())
+
+
+def _paragraphs(text) -> Tuple[str, ...]:
+    """Blank-line separated paragraphs, whitespace collapsed inside each"""
+    return tuple(p for p in (_collapse(part) for part in re.split(r"\n\s*\n", str(text or ""))) if p)
+
+
+def _safe_url(url) -> Optional[str]:
+    # image_url escapes for attributes; the model keeps the raw URL
+    return url.strip() if image_url(url) else None
+
+
+def build_document(offer, key: str) -> OfferDocument:
+    blocks = []
+    logo = _safe_url(offer.logo_url)
+    if logo:
+        blocks.append(Block("image", url=logo, role="logo"))
+    title = _collapse(offer.title)
+    blocks.append(Block("heading", text=title, level=1))
+    subtitle = _collapse(offer.subtitle)
+    if subtitle:
+        blocks.append(Block("paragraph", text=subtitle, role="subtitle"))
+    client = _collapse(offer.client_name)
+    if client:
+        blocks.append(Block("paragraph", text="Prepared for: ", strong=client, role="note"))
+    blocks.extend(Block("paragraph", text=paragraph) for paragraph in _paragraphs(offer.description))
+    blocks.extend(Block("image", url=url) for url in filter(None, map(_safe_url, offer.images or [])))
+    blocks.append(Block("heading", text="What You Get", level=2))
+    features = tuple(filter(None, (_collapse(feature) for feature in offer.features or [])))
+    if features:
+        blocks.append(Block("list", items=features))
+    blocks.append(Block("price", text=price_text(offer), detail=interval_text(offer)))
+
+    brand = tuple(re.findall(r"--brand-(\w+): (#[0-9a-fA-F]+);", brand_variables(offer.brand_colors)))
+    return OfferDocument(key=key, title=title or "Offer", brand=brand, blocks=tuple(blocks))
+
+
+_documents: "OrderedDict[str, OfferDocument]" = OrderedDict()
+_documents_lock = threading.Lock()
+
+
+def get_document(offer) -> OfferDocument:
+    """The offer's document tree, built once per offer version (render key)"""
+    from services.pdf_service import render_key
+
+    key = render_key(offer)
+    with _documents_lock:
+        document = _documents.get(key)
+        if document is not None:
+            _documents.move_to_end(key)
+            return document
+    document = build_document(offer, key)
+    with _documents_lock:
+        _documents[key] = document
+        while len(_documents) > settings.DOCUMENT_MODEL_CACHE_SIZE:
+            _documents.popitem(last=False)
+    return document
+
+
+# ============================================================================
+# MARKDOWN
+# ============================================================================
+
+_MD_SPECIAL = re.compile(r"([\\`*_\[\]<>#|])")
+
+
+def _md(text: str) -> str:
+    return _MD_SPECIAL.sub(r"\\\1", text)
+
+
+def to_markdown(document: OfferDocument) -> bytes:
+    parts = []
+    for block in document.blocks:
+        if block.kind == "heading":
+            parts.append(f"{'#' * block.level} {_md(block.text)}")
+        elif block.kind == "paragraph" and block.role == "subtitle":
+            parts.append(f"_{_md(block.text)}_")
+        elif block.kind == "paragraph":
+            parts.append(_md(block.text) + (f"**{_md(block.strong)}**" if block.strong else ""))
+        elif block.kind == "list":
+            parts.append("\n".join(f"- {_md(item)}" for item in block.items))
+        elif block.kind == "image":
+            parts.append(f"![{'Logo' if block.role == 'logo' else ''}](<{block.url}>)")
+        elif block.kind == "price":
+            parts.append(f"**{_md(block.text)}**" + (f"  \n{_md(block.detail)}" if block.detail else ""))
+    return ("\n\n".join(parts) + "\n").encode("utf-8")
+
+
+# ============================================================================
+# STANDALONE HTML
+# ============================================================================
+
+HTML_CSS = """
+body { margin: 0; font-family: Arial, sans-serif; color: #111827; background: #fff; }
+main { max-width: 760px; margin: 0 auto; padding: 40px 24px; }
+h1 { font-size: 40px; margin: 0 0 12px 0; color: var(--brand-primary); }
+h2 { font-size: 28px; margin: 40px 0 16px 0; }
+.subtitle { font-size: 20px; color: #4b5563; margin-top: 0; }
+.note { background: #f0f9ff; border-left: 4px solid var(--brand-primary); padding: 12px 16px; color: #1e40af; }
+p { font-size: 16px; line-height: 1.8; color: #374151; }
+img { display: block; max-width: 100%; margin: 20px 0; border-radius: 8px; }
+img.logo { height: 48px; border-radius: 0; }
+ul { padding-left: 0; list-style: none; }
+li { margin-bottom: 12px; font-size: 16px; }
+li::before { content: "✓"; color: var(--brand-accent); margin-right: 12px; }
+.price-box { display: inline-block; margin-top: 40px; padding: 32px 48px; border-radius: 20px; color: #fff;
+  background: linear-gradient(135deg, var(--brand-primary), var(--brand-secondary)); text-align: center; }
+.price { font-size: 48px; font-weight: bold; }
+.interval { font-size: 14px; opacity: 0.9; margin-top: 8px; }
+"""
+
+
+def to_html(document: OfferDocument) -> bytes:
+    body = []
+    for block in document.blocks:
+        if block.kind == "heading":
+            body.append(f"<h{block.level}>{escape(block.text)}</h{block.level}>")
+        elif block.kind == "paragraph":
+            strong = f"<strong>{escape(block.strong)}</strong>" if block.strong else ""
+            css_class = f' class="{block.role}"' if block.role else ""
+            body.append(f"<p{css_class}>{escape(block.text)}{strong}</p>")
+        elif block.kind == "list":
+            body.append("<ul>" + "".join(f"<li>{escape(item)}</li>" for item in block.items) + "</ul>")
+        elif block.kind == "image":
+            css_class = ' class="logo"' if block.role == "logo" else ""
+            body.append(f'<img{css_class} src="{escape(block.url, quote=True)}" alt="">')
+        elif block.kind == "price":
+            detail = f'<div class="interval">{escape(block.detail)}</div>' if block.detail else ""
+            body.append(f'<div class="price-box"><div class="price">{escape(block.text)}</div>{detail}</div>')
+
+    variables = " ".join(f"--brand-{name}: {value};" for name, value in document.brand)
+    html_content = (
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"UTF-8\">\n"
+        "<meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">\n"
+        f"<title>{escape(document.title)}</title>\n"
+        f"<style>:root {{ {variables} }}{HTML_CSS}</style>\n</head>\n<body>\n<main>\n"
+        + "\n".join(body)
+        + "\n</main>\n</body>\n</html>\n"
+    )
+    return html_content.encode("utf-8")
+
+
+# ============================================================================
+# DOCX
+# ============================================================================
+
+def _docx_image(url: str) -> Optional[BytesIO]:
+    """Image from the shared asset cache (fetched once, strict timeouts), if Word can embed it"""
+    from docx.image.image import Image
+    from services.assets import get_asset_cache
+
+    asset = get_asset_cache().get(url)
+    if asset is None:
+        return None
+    try:
+        Image.from_blob(asset[0])
+    except Exception as e:
+        # e.g. SVG; checked up front because add_picture leaves an empty paragraph behind
+        logger.warning(f"Skipped image {url} in DOCX export: {str(e) or type(e).__name__}")
+        return None
+    return BytesIO(asset[0])
+
+
+def to_docx(document: OfferDocument) -> bytes:
+    import docx
+    from docx.shared import Inches, Pt, RGBColor
+
+    hex_color = document.color("primary").lstrip("#")
+    if len(hex_color) == 3:
+        hex_color = "".join(digit * 2 for digit in hex_color)
+    primary = RGBColor.from_string(hex_color.upper())
+    doc = docx.Document()
+    doc.core_properties.title = document.title
+
+    for block in document.blocks:
+        if block.kind == "heading":
+            heading = doc.add_heading(block.text, level=0 if block.level == 1 else block.level - 1)
+            if block.level == 1:
+                for run in heading.runs:
+                    run.font.color.rgb = primary
+        elif block.kind == "paragraph" and block.role == "subtitle":
+            doc.add_paragraph(block.text, style="Subtitle")
+        elif block.kind == "paragraph":
+            paragraph = doc.add_paragraph(block.text)
+            if block.strong:
+                paragraph.add_run(block.strong).bold = True
+        elif block.kind == "list":
+            for item in block.items:
+                doc.add_paragraph(item, style="List Bullet")
+        elif block.kind == "image":
+            image = _docx_image(block.url)
+            if image is None:
+                continue
+            if block.role == "logo":
+                doc.add_picture(image, height=Inches(0.5))
+            else:
+                doc.add_picture(image, width=Inches(6))
+        elif block.kind == "price":
+            price = doc.add_paragraph().add_run(block.text)
+            price.bold = True
+            price.font.size = Pt(32)
+            price.font.color.rgb = primary
+            if block.detail:
+                doc.add_paragraph(block.detail)
+
+    out = BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+
+@dataclass(frozen=True)
+class Exporter:
+    media_type: str
+    extension: str
+    serialize: Callable[[OfferDocument], bytes]
+
+
+EXPORTERS: Dict[str, Exporter] = {
+    "docx": Exporter(
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document", "docx", to_docx
+    ),
+    "html": Exporter("text/html; charset=utf-8", "html", to_html),
+    "md": Exporter("text/markdown; charset=utf-8", "md", to_markdown)
+}
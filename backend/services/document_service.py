@@ -0,0 +1,191 @@
+"""
+Upload handling and text extraction for the redesign flow.
+
+Uploads are copied to a temp file in chunks (hashing as we go), and PDF/DOCX
+parsing runs in a memory-capped process pool with a per-file timeout, so a
+hostile document can't block the event loop or wedge a worker.
+"""
+from dataclasses import dataclass
+from typing import Optional
+import hashlib
+import os
+import tempfile
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from core.config import settings
+from services.worker_pool import ProcessWorkerPool, WorkerPoolError
+
+CHUNK_SIZE = 1024 * 1024
+PAGE_SEPARATOR = "\f"
+
+SUPPORTED_TYPES = {
+    ".pdf": "pdf",
+    ".docx": "docx"
+}
+
+
+class DocumentError(Exception):
+    """Raised for uploads we refuse or can't read; carries an HTTP status"""
+
+    def __init__(self, message: str, status_code: int = 422):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    filename: str
+    kind: str
+    size_bytes: int
+    sha256: str
+
+
+@dataclass
+class ExtractedDocument:
+    text: str
+    pages: int
+    kind: str
+
+
+# ============================================================================
+# WORKER-SIDE EXTRACTION (runs inside pool processes)
+# ============================================================================
+
+def _extract_pdf(path: str, max_pages: int, max_chars: int) -> dict:
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(path)
+    if reader.is_encrypted:
+        reader.decrypt("")
+
+    pages = []
+    total = 0
+    for index, page in enumerate(reader.pages):
+        if index >= max_pages or total >= max_chars:
+            break
+        text = page.extract_text() or ""
+        pages.append(text)
+        total += len(text)
+
+    # Keep page boundaries so downstream chunking can split on them
+    return {"text": PAGE_SEPARATOR.join(pages)[:max_chars], "pages": len(pages)}
+
+
+def _extract_docx(path: str, max_chars: int) -> dict:
+    import docx
+
+    document = docx.Document(path)
+    parts = [paragraph.text for paragraph in document.paragraphs]
+    for table in document.tables:
+        for row in table.rows:
+            parts.append(" | ".join(cell.text.strip() for cell in row.cells))
+
+    return {"text": "\n".join(parts)[:max_chars], "pages": 1}
+
+
+def extract_text_file(path: str, kind: str, max_pages: int, max_chars: int) -> dict:
+    if kind == "pdf":
+        return _extract_pdf(path, max_pages, max_chars)
+    if kind == "docx":
+        return _extract_docx(path, max_chars)
+    raise ValueError(f"Unsupported document type: {kind}")
+
+
+# ============================================================================
+# API-SIDE HELPERS
+# ============================================================================
+
+def _detect_kind(filename: str, head: bytes) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    kind = SUPPORTED_TYPES.get(extension)
+    if kind is None:
+        raise DocumentError("Only PDF and DOCX files are supported", status_code=415)
+
+    # Don't trust the extension alone
+    if kind == "pdf" and not head.startswith(b"%PDF"):
+        raise DocumentError("File is not a valid PDF", status_code=415)
+    if kind == "docx" and not head.startswith(b"PK\x03\x04"):
+        raise DocumentError("File is not a valid DOCX", status_code=415)
+    return kind
+
+
+def _copy_upload(source, max_bytes: int, suffix: str):
+    """Copy an upload stream to a temp file chunk by chunk, returning (path, size, sha256, head)"""
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    fd, path = tempfile.mkstemp(prefix="closealead-upload-", suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if not head:
+                    head = chunk[:8]
+                size += len(chunk)
+                if size > max_bytes:
+                    raise DocumentError(
+                        f"File exceeds the {max_bytes // (1024 * 1024)}MB upload limit",
+                        status_code=413
+                    )
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, size, digest.hexdigest(), head
+
+
+async def save_upload(upload: UploadFile, max_bytes: Optional[int] = None) -> StoredUpload:
+    """Stream an UploadFile to a temp file off the event loop"""
+    suffix = os.path.splitext(upload.filename or "")[1].lower()
+    path, size, sha256, head = await run_in_threadpool(
+        _copy_upload, upload.file, max_bytes or settings.UPLOAD_MAX_BYTES, suffix
+    )
+    try:
+        if not size:
+            raise DocumentError("Uploaded file is empty", status_code=400)
+        kind = _detect_kind(upload.filename, head)
+    except DocumentError:
+        os.unlink(path)
+        raise
+    return StoredUpload(path=path, filename=upload.filename, kind=kind, size_bytes=size, sha256=sha256)
+
+
+_extraction_pool: Optional[ProcessWorkerPool] = None
+
+def get_extraction_pool() -> ProcessWorkerPool:
+    """Get the global extraction pool (workers start on first use)"""
+    global _extraction_pool
+    if _extraction_pool is None:
+        _extraction_pool = ProcessWorkerPool(
+            name="extraction",
+            size=settings.EXTRACTION_WORKERS,
+            memory_limit_mb=settings.EXTRACTION_MEMORY_LIMIT_MB,
+            default_timeout=settings.EXTRACTION_TIMEOUT,
+            max_tasks_per_child=50
+        )
+    return _extraction_pool
+
+
+async def extract_document(upload: StoredUpload) -> ExtractedDocument:
+    """Extract text from a stored upload in the process pool"""
+    try:
+        result = await get_extraction_pool().submit(
+            extract_text_file,
+            upload.path,
+            upload.kind,
+            settings.EXTRACTION_MAX_PAGES,
+            settings.EXTRACTION_MAX_CHARS
+        )
+    except WorkerPoolError as e:
+        raise DocumentError(f"Could not read document: {str(e)}", status_code=422)
+
+    if not result["text"].strip():
+        raise DocumentError("No readable text found in document", status_code=422)
+
+    return ExtractedDocument(text=result["text"], pages=result["pages"], kind=upload.kind)
@@ -0,0 +1,110 @@
+"""
+Bulk PDF export as a streamed ZIP.
+
+Offers render in the PDF process pool, a bounded number at a time, and each
+PDF is written into the archive as soon as it finishes and then dropped, so
+memory stays flat however many offers are exported. Entries are keyed by
+render_key, like single exports and background pre-renders, so PDFs any of
+them already stored are reused instead of re-rendered.
+"""
+from datetime import datetime
+from types import SimpleNamespace
+from typing import AsyncIterator, Dict, List, Tuple
+import asyncio
+import logging
+import re
+import zipfile
+
+from starlette.concurrency import run_in_threadpool
+
+from core.config import settings
+from models.offer import Offer
+from services.pdf_service import load_artifact, offer_fields, render_key, render_offer_and_store
+
+logger = logging.getLogger(__name__)
+
+
+class _ChunkSink:
+    """Write-only, non-seekable file object; zipfile falls back to data descriptors"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _archive_name(offer: Offer, used: Dict[str, int]) -> str:
+    base = re.sub(r"[^\w\- ]+", "", offer.title or "offer").strip()[:80] or "offer"
+    if offer.client_name:
+        client = re.sub(r"[^\w\- ]+", "", offer.client_name).strip()[:40]
+        base = f"{base} - {client}" if client else base
+    count = used.get(base, 0)
+    used[base] = count + 1
+    return f"{base}.pdf" if not count else f"{base} ({count + 1}).pdf"
+
+
+def prepare_export(offers: List[Offer]) -> List[Tuple[str, str, dict]]:
+    """(archive name, render key, rendered fields) per offer, taken while the DB session is still open"""
+    used: Dict[str, int] = {}
+    return [(_archive_name(offer, used), render_key(offer), offer_fields(offer)) for offer in offers]
+
+
+async def _entry_pdf(key: str, fields: dict) -> bytes:
+    """The stored PDF for key, else rendered exactly as a single export would be"""
+    pdf_content = await run_in_threadpool(load_artifact, key)
+    if pdf_content is not None:
+        return pdf_content
+    return await render_offer_and_store(SimpleNamespace(**fields), key)
+
+
+async def stream_zip(documents: List[Tuple[str, str, dict]]) -> AsyncIterator[bytes]:
+    """Render documents and yield the ZIP archive incrementally, in completion order"""
+    sink = _ChunkSink()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)
+    window = max(settings.PDF_RENDER_WORKERS * 2, 1)
+    pending = iter(documents)
+    in_flight: Dict[asyncio.Task, str] = {}
+    failures: List[str] = []
+
+    def refill():
+        while len(in_flight) < window:
+            try:
+                name, key, fields = next(pending)
+            except StopIteration:
+                return
+            in_flight[asyncio.ensure_future(_entry_pdf(key, fields))] = name
+
+    try:
+        refill()
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = in_flight.pop(task)
+                try:
+                    pdf_content = task.result()
+                except Exception as e:
+                    logger.error(f"Export render failed for {name}: {str(e)}")
+                    failures.append(f"{name}: {str(e)}")
+                    continue
+                info = zipfile.ZipInfo(name, date_time=datetime.utcnow().timetuple()[:6])
+                archive.writestr(info, pdf_content, compress_type=zipfile.ZIP_STORED)
+                yield sink.drain()
+            refill()
+
+        if failures:
+            archive.writestr("export-errors.txt", "\n".join(failures) + "\n")
+        archive.close()
+        yield sink.drain()
+    finally:
+        for task in in_flight:
+            task.cancel()
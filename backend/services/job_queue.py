@@ -0,0 +1,407 @@
+"""
+Durable, database-backed job queue.
+
+Jobs are leased rather than popped: a worker claims a job for a visibility
+timeout and must finish (or heartbeat) before the lease expires, otherwise
+the job becomes visible to other workers again. Failures are retried with
+exponential backoff until max_attempts, then dead-lettered. Completed
+results are zlib-compressed after JOB_RESULT_COMPRESS_AFTER and dropped
+after JOB_RESULT_TTL (see apply_retention); the job row itself is kept.
+
+On PostgreSQL claims use SELECT ... FOR UPDATE SKIP LOCKED so concurrent
+workers never block on or double-claim a row. SQLite has no row locks, so
+there each claim is a compare-and-set UPDATE guarded by the same predicate;
+SQLite serializes writers, which makes the CAS safe.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+import json
+import logging
+import os
+import socket
+import uuid
+import zlib
+
+from sqlalchemy import and_, func
+
+from core.config import settings
+from core.database import SessionLocal, engine
+from core.metrics import queue_depth
+from models.job import Job, JobStatus, ResultStorage
+from services.webhooks import add_delivery
+
+logger = logging.getLogger(__name__)
+
+# kind -> handler(job) returning a JSON-serializable result
+JOB_HANDLERS: Dict[str, Callable[[Job], Any]] = {}
+
+
+def job_handler(kind: str):
+    """Register the function that runs jobs of this kind"""
+    def register(func: Callable[[Job], Any]):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class JobQueue:
+    """Enqueue, lease, heartbeat, complete and fail jobs"""
+
+    def __init__(
+        self,
+        visibility_timeout: Optional[int] = None,
+        retry_backoff: Optional[int] = None,
+        max_attempts: Optional[int] = None
+    ):
+        self.visibility_timeout = visibility_timeout or settings.JOB_VISIBILITY_TIMEOUT
+        self.retry_backoff = retry_backoff or settings.JOB_RETRY_BACKOFF
+        self.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        self.skip_locked = engine.dialect.name == "postgresql"
+        queue_depth.labels(queue="jobs").set_function(self._ready_count)
+
+    def _ready_count(self) -> int:
+        db = SessionLocal()
+        try:
+            return db.query(func.count(Job.id)).filter(Job.status == JobStatus.QUEUED.value).scalar()
+        finally:
+            db.close()
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+
+    def enqueue(
+        self,
+        db,
+        user_id: str,
+        kind: str,
+        payload: dict,
+        webhook_url: Optional[str] = None,
+        max_attempts: Optional[int] = None
+    ) -> Job:
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        job = Job(
+            user_id=user_id,
+            kind=kind,
+            payload=payload,
+            webhook_url=webhook_url,
+            max_attempts=max_attempts or self.max_attempts,
+            run_after=datetime.utcnow()
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        logger.info(f"Enqueued {kind} job {job.id}")
+        return job
+
+    def retry(self, db, job: Job) -> Job:
+        """Put a dead job back on the queue with a fresh set of attempts"""
+        job.status = JobStatus.QUEUED.value
+        job.attempts = 0
+        job.error = None
+        job.run_after = datetime.utcnow()
+        job.lease_owner = None
+        job.lease_expires_at = None
+        job.finished_at = None
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def counts(self, db, user_id: Optional[str] = None) -> Dict[str, int]:
+        query = db.query(Job.status, func.count(Job.id))
+        if user_id:
+            query = query.filter(Job.user_id == user_id)
+        counts = {status.value: 0 for status in JobStatus}
+        counts.update(dict(query.group_by(Job.status).all()))
+        return counts
+
+    def footprint(self, db, user_id: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """Result jobs and bytes (raw and as stored) per storage state"""
+        query = db.query(
+            Job.result_storage,
+            func.count(Job.id),
+            func.coalesce(func.sum(Job.result_bytes), 0),
+            func.coalesce(func.sum(Job.stored_bytes), 0)
+        ).filter(Job.result_storage.isnot(None))
+        if user_id:
+            query = query.filter(Job.user_id == user_id)
+        return {
+            storage: {"jobs": jobs, "resultBytes": int(raw), "storedBytes": int(stored)}
+            for storage, jobs, raw, stored in query.group_by(Job.result_storage).all()
+        }
+
+    # ------------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------------
+
+    def reap_expired(self) -> int:
+        """Requeue running jobs whose lease ran out; dead-letter those out of attempts"""
+        now = datetime.utcnow()
+        expired = and_(Job.status == JobStatus.RUNNING.value, Job.lease_expires_at < now)
+        db = SessionLocal()
+        try:
+            dead = db.query(Job).filter(expired, Job.attempts >= Job.max_attempts).update({
+                "status": JobStatus.DEAD.value,
+                "error": "Lease expired on final attempt",
+                "lease_owner": None,
+                "finished_at": now
+            }, synchronize_session=False)
+            requeued = db.query(Job).filter(expired, Job.attempts < Job.max_attempts).update({
+                "status": JobStatus.QUEUED.value,
+                "error": "Lease expired",
+                "lease_owner": None,
+                "run_after": now
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+        if dead or requeued:
+            logger.warning(f"Reaped expired leases: {requeued} requeued, {dead} dead-lettered")
+        return dead + requeued
+
+    def lease(self, worker_id: str, limit: int = 1, job_id: Optional[str] = None) -> List[Job]:
+        """Claim up to limit ready jobs (or the given one) for this worker"""
+        if limit <= 0:
+            return []
+
+        now = datetime.utcnow()
+        ready = and_(Job.status == JobStatus.QUEUED.value, Job.run_after <= now)
+        if job_id:
+            ready = and_(ready, Job.id == job_id)
+        claim = {
+            "status": JobStatus.RUNNING.value,
+            "lease_owner": worker_id,
+            "lease_expires_at": now + timedelta(seconds=self.visibility_timeout),
+            "attempts": Job.attempts + 1,
+            "started_at": now
+        }
+
+        db = SessionLocal()
+        try:
+            candidates = db.query(Job.id).filter(ready).order_by(Job.run_after, Job.created_at)
+            if self.skip_locked:
+                ids = [row.id for row in candidates.limit(limit).with_for_update(skip_locked=True)]
+                if ids:
+                    db.query(Job).filter(Job.id.in_(ids)).update(claim, synchronize_session=False)
+                db.commit()
+            else:
+                ids = []
+                # Over-fetch: other workers may win some of the CAS races
+                for row in candidates.limit(limit * 3).all():
+                    won = db.query(Job).filter(Job.id == row.id, ready).update(claim, synchronize_session=False)
+                    db.commit()
+                    if won:
+                        ids.append(row.id)
+                        if len(ids) >= limit:
+                            break
+
+            if not ids:
+                return []
+            jobs = db.query(Job).filter(Job.id.in_(ids)).all()
+            for job in jobs:
+                db.expunge(job)
+            return jobs
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def heartbeat(self, job_ids: List[str], worker_id: str) -> int:
+        """Extend leases this worker still holds; returns how many were extended"""
+        if not job_ids:
+            return 0
+        db = SessionLocal()
+        try:
+            extended = db.query(Job).filter(
+                Job.id.in_(job_ids),
+                Job.lease_owner == worker_id,
+                Job.status == JobStatus.RUNNING.value
+            ).update({
+                "lease_expires_at": datetime.utcnow() + timedelta(seconds=self.visibility_timeout)
+            }, synchronize_session=False)
+            db.commit()
+            return extended
+        finally:
+            db.close()
+
+    def complete(self, job: Job, worker_id: str, result: Any) -> bool:
+        """Record success; False if the lease was lost (another worker owns the job now)"""
+        size = len(json.dumps(result, default=str).encode())
+        db = SessionLocal()
+        try:
+            updated = db.query(Job).filter(
+                Job.id == job.id,
+                Job.lease_owner == worker_id,
+                Job.status == JobStatus.RUNNING.value
+            ).update({
+                "status": JobStatus.COMPLETED.value,
+                "result": result,
+                "result_storage": ResultStorage.INLINE.value,
+                "result_bytes": size,
+                "stored_bytes": size,
+                "error": None,
+                "lease_owner": None,
+                "lease_expires_at": None,
+                "finished_at": datetime.utcnow()
+            }, synchronize_session=False)
+            if updated and job.webhook_url:
+                _stage_webhook(db, job, JobStatus.COMPLETED.value, {"result": result})
+            db.commit()
+        finally:
+            db.close()
+
+        if not updated:
+            logger.warning(f"Job {job.id} finished after its lease was lost; result discarded")
+        return bool(updated)
+
+    def fail(self, job: Job, worker_id: str, error: str) -> Optional[str]:
+        """Schedule a retry with exponential backoff, or dead-letter; returns the new status"""
+        now = datetime.utcnow()
+        if job.attempts >= job.max_attempts:
+            values = {"status": JobStatus.DEAD.value, "finished_at": now}
+        else:
+            delay = min(self.retry_backoff * 2 ** (job.attempts - 1), settings.JOB_RETRY_BACKOFF_MAX)
+            values = {"status": JobStatus.QUEUED.value, "run_after": now + timedelta(seconds=delay)}
+
+        values.update({
+            "error": error[:1000],
+            "lease_owner": None,
+            "lease_expires_at": None
+        })
+
+        db = SessionLocal()
+        try:
+            updated = db.query(Job).filter(
+                Job.id == job.id,
+                Job.lease_owner == worker_id,
+                Job.status == JobStatus.RUNNING.value
+            ).update(values, synchronize_session=False)
+            if updated and job.webhook_url and values["status"] == JobStatus.DEAD.value:
+                _stage_webhook(db, job, JobStatus.DEAD.value, {"error": values["error"]})
+            db.commit()
+        finally:
+            db.close()
+
+        if not updated:
+            return None
+        if values["status"] == JobStatus.DEAD.value:
+            logger.error(f"Job {job.id} dead-lettered after {job.attempts} attempts: {error}")
+        return values["status"]
+
+    def apply_retention(self, batch_size: int = 100) -> Dict[str, int]:
+        """Compress results past the inline window and evict those past the TTL"""
+        now = datetime.utcnow()
+        evict_before = now - timedelta(seconds=settings.JOB_RESULT_TTL)
+        compress_before = now - timedelta(seconds=settings.JOB_RESULT_COMPRESS_AFTER)
+        db = SessionLocal()
+        try:
+            evicted = db.query(Job).filter(
+                Job.result_storage.in_([ResultStorage.INLINE.value, ResultStorage.COMPRESSED.value]),
+                Job.finished_at < evict_before
+            ).update({
+                "result": None,
+                "result_blob": None,
+                "result_storage": ResultStorage.EVICTED.value,
+                "stored_bytes": 0
+            }, synchronize_session=False)
+            db.commit()
+
+            compressed = 0
+            while True:
+                jobs = db.query(Job).filter(
+                    Job.result_storage == ResultStorage.INLINE.value,
+                    Job.finished_at < compress_before
+                ).limit(batch_size).all()
+                for job in jobs:
+                    blob = zlib.compress(json.dumps(job.result, default=str).encode(), 6)
+                    job.result_blob = blob
+                    job.result = None
+                    job.result_storage = ResultStorage.COMPRESSED.value
+                    job.stored_bytes = len(blob)
+                db.commit()
+                db.expunge_all()
+                compressed += len(jobs)
+                if len(jobs) < batch_size:
+                    break
+        finally:
+            db.close()
+
+        if evicted or compressed:
+            logger.info(f"Job result retention: {compressed} compressed, {evicted} evicted")
+        return {"compressed": compressed, "evicted": evicted}
+
+    def run(self, job: Job, worker_id: str) -> Optional[str]:
+        """Run a leased job's handler and record the outcome; returns the new status"""
+        handler = JOB_HANDLERS.get(job.kind)
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for job kind: {job.kind}")
+            result = handler(job)
+        except Exception as e:
+            logger.error(f"Job {job.id} attempt {job.attempts}/{job.max_attempts} failed: {str(e)}")
+            return self.fail(job, worker_id, str(e))
+
+        if not self.complete(job, worker_id, result):
+            return None
+        logger.info(f"Job {job.id} completed successfully")
+        return JobStatus.COMPLETED.value
+
+
+def _stage_webhook(db, job: Job, status: str, data: dict):
+    """Write the job's webhook to the outbox in the same transaction as its final state"""
+    add_delivery(
+        db,
+        job.webhook_url,
+        f"job.{status}",
+        {"job_id": job.id, "status": status, **data},
+        user_id=job.user_id,
+        job_id=job.id
+    )
+
+
+_job_queue: Optional[JobQueue] = None
+
+def get_job_queue() -> JobQueue:
+    """Get the global job queue"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue()
+    return _job_queue
+
+
+# ============================================================================
+# JOB HANDLERS
+# ============================================================================
+
+@job_handler("offer_creation")
+def run_offer_creation(job: Job) -> dict:
+    """Generate an offer from scratch for the job's user"""
+    from crew.crews import OfferCreationCrew
+    from crew.tracing import save_trace
+    from models.user import User
+    from services.usage import usage_scope
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == job.user_id).first()
+        plan = user.plan if user else "unknown"
+    finally:
+        db.close()
+
+    with usage_scope(job.user_id, plan):
+        crew = OfferCreationCrew()
+        result = crew.create(job.payload or {})
+
+    try:
+        save_trace(crew.trace, user_id=job.user_id)
+    except Exception:
+        logger.warning(f"Job trace {crew.trace.trace_id} was not persisted")
+    return result
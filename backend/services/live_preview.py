@@ -0,0 +1,172 @@
+"""
+Incremental HTML rendering for the live offer preview.
+
+A PreviewSession holds one editor's unsaved offer state and the last HTML
+fragment sent for each template section. Field patches (as emitted by the
+CustomizationPanel) only mark the sections that read those fields dirty;
+flush() re-renders just those and returns the fragments whose markup
+actually changed. Brand colors travel as the :root custom-property string,
+and a template switch falls back to a full snapshot. Nothing here touches
+the database or the PDF renderer.
+"""
+from types import SimpleNamespace
+from typing import Any, Dict, Optional, Set
+import time
+
+from core.metrics import registry
+from services.pdf_templates import SECTION_FIELDS, SECTIONS, brand_variables, get_template
+
+preview_render_seconds = registry.histogram(
+    "closealead_preview_render_seconds",
+    "Time to render one live-preview update"
+)
+preview_sessions = registry.gauge(
+    "closealead_preview_sessions",
+    "Open live-preview connections"
+)
+
+# Offer attributes the preview tracks, with their defaults for a blank offer
+PREVIEW_DEFAULTS = {
+    "title": "",
+    "subtitle": "",
+    "description": "",
+    "client_name": None,
+    "price_amount": "",
+    "price_currency": "USD",
+    "price_interval": "one-time",
+    "features": [],
+    "template": "modern",
+    "brand_colors": {},
+    "logo_url": None,
+    "images": []
+}
+
+# CustomizationPanel field names (Offer.to_dict keys) -> offer attributes
+FIELD_NAMES = {
+    "title": "title",
+    "subtitle": "subtitle",
+    "description": "description",
+    "clientName": "client_name",
+    "features": "features",
+    "template": "template",
+    "brandColors": "brand_colors",
+    "logoUrl": "logo_url",
+    "images": "images"
+}
+PRICE_FIELDS = {"amount": "price_amount", "currency": "price_currency", "interval": "price_interval"}
+
+_DEPENDENTS: Dict[str, Set[str]] = {}
+for _section, _fields in SECTION_FIELDS.items():
+    for _field in _fields:
+        _DEPENDENTS.setdefault(_field, set()).add(_section)
+
+
+def _normalize(field: str, value: Any) -> Any:
+    if field in ("features", "images"):
+        if not isinstance(value, list):
+            raise ValueError(f"{field} must be a list")
+        return [str(item) for item in value]
+    if field == "brand_colors":
+        if not isinstance(value, dict):
+            raise ValueError("brandColors must be an object")
+        return value
+    if value is not None and not isinstance(value, (str, int, float)):
+        raise ValueError(f"{field} must be a string")
+    return value
+
+
+class PreviewSession:
+    """Unsaved offer state plus the section fragments last sent to the client"""
+
+    def __init__(self, fields: Optional[Dict[str, Any]] = None):
+        values = dict(PREVIEW_DEFAULTS)
+        values.update({k: v for k, v in (fields or {}).items() if k in PREVIEW_DEFAULTS and v is not None})
+        self.offer = SimpleNamespace(**values)
+        self.version = 0
+        self.fragments: Dict[str, str] = {}
+        self.brand = ""
+        self._dirty: Set[str] = set()
+        self._full = True
+        self._seq: Optional[int] = None
+
+    @classmethod
+    def from_offer(cls, offer) -> "PreviewSession":
+        return cls({field: getattr(offer, field) for field in PREVIEW_DEFAULTS})
+
+    @property
+    def pending(self) -> bool:
+        return self._full or bool(self._dirty) or self._seq is not None
+
+    def _set(self, field: str, value: Any):
+        value = _normalize(field, value)
+        if getattr(self.offer, field) == value:
+            return
+        setattr(self.offer, field, value)
+        if field == "template":
+            self._full = True
+        self._dirty.update(_DEPENDENTS.get(field, ()))
+        if field == "brand_colors":
+            self._dirty.add("brand")
+
+    def patch(self, changes: Dict[str, Any], seq: Optional[int] = None):
+        """Apply CustomizationPanel field changes; rendering waits for flush()"""
+        for name, value in changes.items():
+            if name == "price":
+                if not isinstance(value, dict):
+                    raise ValueError("price must be an object")
+                for key, field in PRICE_FIELDS.items():
+                    if key in value:
+                        self._set(field, value[key])
+            elif name in FIELD_NAMES:
+                self._set(FIELD_NAMES[name], value)
+            else:
+                raise ValueError(f"Unknown preview field: {name}")
+        if seq is not None:
+            self._seq = seq
+
+    def request_snapshot(self):
+        self._full = True
+
+    def flush(self) -> Optional[dict]:
+        """Render pending changes: a full snapshot, a diff of changed sections, or None"""
+        if not self.pending:
+            return None
+        started = time.perf_counter()
+        template = get_template(self.offer.template)
+        message: Dict[str, Any]
+
+        if self._full:
+            self.fragments = {name: template.render_section(name, self.offer) for name in SECTIONS}
+            self.brand = brand_variables(self.offer.brand_colors)
+            message = {
+                "type": "snapshot",
+                "template": template.name,
+                "html": template.render(self.offer, inline_css=True, sections=self.fragments)
+            }
+        else:
+            changed = {}
+            for name in SECTIONS:
+                if name not in self._dirty:
+                    continue
+                fragment = template.render_section(name, self.offer)
+                if fragment != self.fragments.get(name):
+                    self.fragments[name] = fragment
+                    changed[name] = fragment
+            message = {"type": "diff", "sections": changed}
+            if "brand" in self._dirty:
+                brand = brand_variables(self.offer.brand_colors)
+                if brand != self.brand:
+                    self.brand = brand
+                    message["brand"] = brand
+
+        if message["type"] == "snapshot" or message["sections"] or "brand" in message:
+            self.version += 1
+        message["version"] = self.version
+        if self._seq is not None:
+            message["ack"] = self._seq
+
+        self._dirty.clear()
+        self._full = False
+        self._seq = None
+        preview_render_seconds.observe(time.perf_counter() - started)
+        return message
@@ -0,0 +1,650 @@
+"""
+Direct PDF writer for the standard offer layout.
+
+The built-in template is a fixed stack of blocks (gradient header, optional
+"Prepared for" bar, description, feature list, centred price box), so it can
+be drawn straight as PDF operators without HTML parsing, CSS cascade or
+general layout. Boxes, spacing and colours mirror BASE_CSS and brand_rules()
+in services.pdf_templates, with line heights taken from the font's own metrics,
+and text is set in TrueType fonts subset to the glyphs used and embedded as
+Type0/CIDFontType2 fonts with a ToUnicode map (text stays selectable and
+searchable). Long offers flow onto further pages.
+
+Every single-offer path (export, background pre-render, bulk ZIP entries)
+goes through pdf_service.render_offer_pdf, so an offer gets the same PDF and
+render key however it is exported. Multi-offer catalogs are always laid out
+by WeasyPrint, which fills in their table of contents.
+
+The writer is off by default (PDF_DIRECT_RENDERER). Turn it on only after
+benchmarks/pdf_parity.py, which rasterizes both renderers' output and diffs
+it, passes with the deployment's fonts: line breaking here is a greedy fill,
+not Pango's.
+
+Offers this writer can't reproduce faithfully go through WeasyPrint instead
+(see supports()): custom templates, offers with a logo or images, characters
+missing from the fonts, or no usable fonts on the machine. Fonts are found
+with fc-match, the same lookup WeasyPrint uses, falling back to well-known
+paths; PDF_DIRECT_FONT* settings override them.
+
+pydyf and fontTools are WeasyPrint dependencies, so nothing new is installed.
+"""
+from collections import OrderedDict
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+
+from core.config import settings
+from services.pdf_templates import (
+    BASE_CSS, OFFER_MARKUP, brand_variables, get_template, image_url, interval_text, price_text
+)
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the drawing code changes so stored PDFs are re-rendered
+DIRECT_VERSION = "1"
+
+# A4 in CSS px (96 dpi); drawing happens in px with y pointing down
+PAGE_WIDTH = 793.7
+PAGE_HEIGHT = 1122.52
+PX_TO_PT = 0.75
+
+CHECK_MARK = "✓"
+
+_FONT_LOOKUPS = {
+    "regular": ("Arial", (
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+        "/usr/share/fonts/truetype/liberation2/LiberationSans-Regular.ttf",
+        "/usr/share/fonts/liberation-sans/LiberationSans-Regular.ttf",
+        "/System/Library/Fonts/Supplemental/Arial.ttf",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts/TTF/DejaVuSans.ttf"
+    )),
+    "bold": ("Arial:bold", (
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+        "/usr/share/fonts/truetype/liberation2/LiberationSans-Bold.ttf",
+        "/usr/share/fonts/liberation-sans/LiberationSans-Bold.ttf",
+        "/System/Library/Fonts/Supplemental/Arial Bold.ttf",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+        "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf"
+    )),
+    # What fontconfig falls back to for the feature check mark
+    "symbol": ("Arial:charset=2713", (
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts/TTF/DejaVuSans.ttf"
+    ))
+}
+
+
+def _hex_rgb(color: str) -> Tuple[float, float, float]:
+    color = color.lstrip("#")
+    if len(color) == 3:
+        color = "".join(c * 2 for c in color)
+    return tuple(int(color[i:i + 2], 16) / 255 for i in (0, 2, 4))
+
+
+def _brand(offer) -> Dict[str, Tuple[float, float, float]]:
+    """Brand colors as validated by the HTML template"""
+    variables = dict(re.findall(r"--brand-(\w+): (#[0-9a-fA-F]+);", brand_variables(offer.brand_colors)))
+    return {key: _hex_rgb(value) for key, value in variables.items()}
+
+
+def _collapse(text) -> str:
+    """HTML white-space: normal"""
+    return " ".join(str(text or "").split())
+
+
+class _Font:
+    """A TrueType font's metrics, plus per-document subsets (kept in a small LRU)"""
+
+    def __init__(self, path: str):
+        from fontTools.ttLib import TTFont
+
+        with open(path, "rb") as f:
+            self.data = f.read()
+        font = TTFont(BytesIO(self.data))
+        if "glyf" not in font:
+            raise ValueError(f"{path} has no TrueType outlines")
+        self.path = path
+        self.upm = font["head"].unitsPerEm
+        self.cmap = font.getBestCmap()
+        metrics = font["hmtx"].metrics
+        self.advances = {cp: metrics[name][0] for cp, name in self.cmap.items()}
+        hhea = font["hhea"]
+        self.ascent = hhea.ascent / self.upm
+        self.descent = -hhea.descent / self.upm
+        self.line_gap = hhea.lineGap / self.upm
+        head = font["head"]
+        self.bbox = [v * 1000 // self.upm for v in (head.xMin, head.yMin, head.xMax, head.yMax)]
+        os2 = font["OS/2"] if "OS/2" in font else None
+        self.cap_height = getattr(os2, "sCapHeight", 0) or hhea.ascent
+        name = font["name"].getDebugName(6) or os.path.splitext(os.path.basename(path))[0]
+        self.name = re.sub(r"[^A-Za-z0-9\-]", "", name) or "Font"
+        self._subsets: "OrderedDict[frozenset, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def covers(self, text: str) -> bool:
+        return all(ord(char) in self.cmap for char in text)
+
+    def width(self, text: str, size: float) -> float:
+        return sum(self.advances.get(ord(char), 0) for char in text) / self.upm * size
+
+    def line_height(self, size: float) -> float:
+        """line-height: normal"""
+        return (self.ascent + self.descent + self.line_gap) * size
+
+    def baseline(self, size: float, line_height: Optional[float] = None) -> float:
+        """Baseline offset from the top of a line box (half-leading above the ascent)"""
+        height = line_height or self.line_height(size)
+        return (height - (self.ascent + self.descent) * size) / 2 + self.ascent * size
+
+    def subset(self, codepoints: frozenset) -> Tuple[bytes, Dict[int, int], Dict[int, int]]:
+        """(font file, codepoint -> glyph id, glyph id -> advance in 1/1000 em)"""
+        with self._lock:
+            cached = self._subsets.get(codepoints)
+            if cached is not None:
+                self._subsets.move_to_end(codepoints)
+                return cached
+
+        from fontTools import subset
+        from fontTools.ttLib import TTFont
+
+        options = subset.Options()
+        options.layout_features = []
+        options.hinting = False
+        options.name_IDs = [1, 2, 6]
+        options.notdef_outline = True
+        options.drop_tables += ["FFTM"]
+        font = TTFont(BytesIO(self.data))
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=codepoints)
+        subsetter.subset(font)
+        out = BytesIO()
+        font.save(out)
+
+        cmap = font.getBestCmap()
+        metrics = font["hmtx"].metrics
+        gids = {cp: font.getGlyphID(cmap[cp]) for cp in codepoints if cp in cmap}
+        widths = {font.getGlyphID(name): metrics[name][0] * 1000 // self.upm for name in font.getGlyphOrder()}
+        result = (out.getvalue(), gids, widths)
+        with self._lock:
+            self._subsets[codepoints] = result
+            if len(self._subsets) > 64:
+                self._subsets.popitem(last=False)
+        return result
+
+
+_fonts: Optional[Dict[str, _Font]] = None
+_fonts_lock = threading.Lock()
+
+
+def _find_font(pattern: str, candidates: Tuple[str, ...], configured: str) -> Optional[str]:
+    if configured:
+        return configured
+    fc_match = shutil.which("fc-match")
+    if fc_match:
+        try:
+            path = subprocess.run(
+                [fc_match, "-f", "%{file}", pattern], capture_output=True, text=True, timeout=5
+            ).stdout.strip()
+            if path.lower().endswith(".ttf") and os.path.exists(path):
+                return path
+        except (OSError, subprocess.SubprocessError):
+            pass
+    return next((path for path in candidates if os.path.exists(path)), None)
+
+
+def load_fonts() -> Dict[str, _Font]:
+    """The regular, bold and symbol fonts (empty if any is missing; then WeasyPrint renders)"""
+    global _fonts
+    if _fonts is None:
+        with _fonts_lock:
+            if _fonts is None:
+                configured = {
+                    "regular": settings.PDF_DIRECT_FONT,
+                    "bold": settings.PDF_DIRECT_FONT_BOLD,
+                    "symbol": settings.PDF_DIRECT_FONT_SYMBOL
+                }
+                fonts = {}
+                try:
+                    for key, (pattern, candidates) in _FONT_LOOKUPS.items():
+                        path = _find_font(pattern, candidates, configured[key])
+                        if path is None:
+                            raise FileNotFoundError(f"no {key} font found")
+                        fonts[key] = _Font(path)
+                except Exception as e:
+                    logger.warning(f"Direct PDF writer disabled: {str(e)}")
+                    fonts = {}
+                _fonts = fonts
+    return _fonts
+
+
+def renderer_version() -> str:
+    fonts = load_fonts()
+    return f"direct-{DIRECT_VERSION}-" + "-".join(fonts[key].name for key in sorted(fonts))
+
+
+def supports(offer) -> bool:
+    """Whether this writer reproduces the offer's WeasyPrint output"""
+    template = get_template(offer.template)
+    if template.css != BASE_CSS or template.markup is not OFFER_MARKUP:
+        return False
+    if image_url(offer.logo_url) or any(image_url(url) for url in (offer.images or [])):
+        return False
+    fonts = load_fonts()
+    if not fonts:
+        return False
+
+    regular = " ".join([
+        _collapse(offer.subtitle), _collapse(offer.description), "Prepared for: ", interval_text(offer)
+    ] + [_collapse(feature) for feature in (offer.features or [])])
+    bold = " ".join([_collapse(offer.title), _collapse(offer.client_name), price_text(offer), "What You Get"])
+    check = fonts["regular"] if fonts["regular"].covers(CHECK_MARK) else fonts["symbol"]
+    return fonts["regular"].covers(regular) and fonts["bold"].covers(bold) and check.covers(CHECK_MARK)
+
+
+# ============================================================================
+# LAYOUT (CSS px, y down)
+# ============================================================================
+
+class _Page:
+    def __init__(self):
+        self.backgrounds: List[tuple] = []
+        self.content: List[tuple] = []
+
+
+class _Flow:
+    """Vertical block flow with page breaks; open section backgrounds continue across pages"""
+
+    def __init__(self):
+        self.pages = [_Page()]
+        self.y = 0.0
+        self._section = None  # (paint, y where its current segment started)
+
+    @property
+    def page(self) -> _Page:
+        return self.pages[-1]
+
+    def space(self, height: float):
+        # Margins and padding at a page break are simply truncated
+        self.y += height
+
+    def fit(self, height: float) -> float:
+        """Top of a block of height, on a new page if it doesn't fit on this one"""
+        if self.y + height > PAGE_HEIGHT and self.y > 0:
+            self._new_page()
+        top = self.y
+        self.y += height
+        return top
+
+    def begin(self, paint):
+        if self.y >= PAGE_HEIGHT:
+            self._new_page()
+        self._section = (paint, self.y)
+
+    def end(self):
+        self._close_segment(min(self.y, PAGE_HEIGHT))
+        self._section = None
+
+    def _new_page(self):
+        self._close_segment(PAGE_HEIGHT)
+        self.pages.append(_Page())
+        self.y = 0.0
+        if self._section:
+            self._section = (self._section[0], 0.0)
+
+    def _close_segment(self, bottom: float):
+        if self._section:
+            paint, top = self._section
+            if bottom > top:
+                paint(self.page, top, bottom)
+
+
+class _Layout:
+    def __init__(self, offer, fonts: Dict[str, _Font]):
+        self.offer = offer
+        self.fonts = fonts
+        self.brand = _brand(offer)
+        self.flow = _Flow()
+
+    # -- text helpers ----------------------------------------------------
+
+    def _wrap(self, runs: List[Tuple[str, str]], size: float, width: float) -> List[List[Tuple[str, str, float]]]:
+        """Greedy line breaking at spaces; pieces are (text, font key, width). Long words overflow as in CSS."""
+        tokens = []
+        for text, key in runs:
+            tokens.extend((token, key) for token in re.findall(r"\S+\s*|\s+", text))
+        lines, line, used = [], [], 0.0
+        for token, key in tokens:
+            font = self.fonts[key]
+            word = token.rstrip()
+            if line and used + font.width(word, size) > width:
+                lines.append(line)
+                line, used = [], 0.0
+            if not line and not word:
+                continue
+            line.append((token, key))
+            used += font.width(token, size)
+        if line:
+            lines.append(line)
+
+        result = []
+        for line in lines:
+            last_text, last_key = line[-1]
+            line[-1] = (last_text.rstrip(), last_key)
+            pieces = []
+            for text, key in line:
+                if pieces and pieces[-1][1] == key:
+                    pieces[-1] = (pieces[-1][0] + text, key)
+                else:
+                    pieces.append((text, key))
+            result.append([(text, key, self.fonts[key].width(text, size)) for text, key in pieces])
+        return result
+
+    def _text_lines(
+        self, runs, size: float, x: float, width: float, color, line_height: Optional[float] = None,
+        alpha: float = 1.0, align: str = "left"
+    ):
+        """Flow wrapped lines; line_height None means normal"""
+        base = self.fonts[runs[0][1]]
+        height = line_height or base.line_height(size)
+        baseline = base.baseline(size, height)
+        for line in self._wrap(runs, size, width):
+            top = self.flow.fit(height)
+            total = sum(piece[2] for piece in line)
+            cursor = x + (width - total) / 2 if align == "center" else x
+            for text, key, piece_width in line:
+                self.flow.page.content.append(("text", cursor, top + baseline, text, key, size, color, alpha))
+                cursor += piece_width
+
+    # -- sections --------------------------------------------------------
+
+    def _fill(self, color):
+        def paint(page: _Page, top: float, bottom: float):
+            page.backgrounds.append(("rect", 0, top, PAGE_WIDTH, bottom - top, color))
+        return paint
+
+    def header(self):
+        primary, secondary = self.brand["primary"], self.brand["secondary"]
+        self.flow.begin(lambda page, top, bottom: page.backgrounds.append(
+            ("gradient", 0, top, PAGE_WIDTH, bottom - top, 0, primary, secondary)
+        ))
+        self.flow.space(60)
+        title = _collapse(self.offer.title)
+        if title:
+            self._text_lines([(title, "bold")], 48, 40, PAGE_WIDTH - 80, (1, 1, 1))
+        self.flow.space(20)
+        subtitle = _collapse(self.offer.subtitle)
+        if subtitle:
+            self._text_lines([(subtitle, "regular")], 20, 40, PAGE_WIDTH - 80, (1, 1, 1), alpha=0.9)
+            self.flow.space(20)
+        self.flow.space(60)
+        self.flow.end()
+
+    def personalization(self):
+        client = _collapse(self.offer.client_name)
+        if not client:
+            return
+        primary = self.brand["primary"]
+
+        def paint(page: _Page, top: float, bottom: float):
+            page.backgrounds.append(("rect", 0, top, PAGE_WIDTH, bottom - top, (0.941, 0.976, 1.0)))
+            page.backgrounds.append(("rect", 0, top, 4, bottom - top, primary))
+
+        self.flow.begin(paint)
+        self.flow.space(15)
+        color = _hex_rgb("#1e40af")
+        self._text_lines([("Prepared for: ", "regular"), (client, "bold")], 14, 44, PAGE_WIDTH - 84, color)
+        self.flow.space(15)
+        self.flow.end()
+
+    def content(self):
+        self.flow.space(40)
+        description = _collapse(self.offer.description)
+        if description:
+            self._text_lines([(description, "regular")], 16, 40, PAGE_WIDTH - 80, _hex_rgb("#374151"), line_height=28.8)
+        self.flow.space(80)
+
+    def features(self):
+        self.flow.begin(self._fill(_hex_rgb("#f9fafb")))
+        self.flow.space(40 + 32 * 0.83)
+        self._text_lines([("What You Get", "bold")], 32, 40, PAGE_WIDTH - 80, (0, 0, 0))
+        self.flow.space(30)
+
+        check_key = "regular" if self.fonts["regular"].covers(CHECK_MARK) else "symbol"
+        check_font, text_font = self.fonts[check_key], self.fonts["regular"]
+        check_width = check_font.width(CHECK_MARK, 20)
+        check_height = check_font.line_height(20)
+        text_x = 40 + check_width + 15
+        text_width = PAGE_WIDTH - 40 - text_x
+        accent = self.brand["accent"]
+
+        for feature in self.offer.features or []:
+            lines = self._wrap([(_collapse(feature), "regular")], 16, text_width)
+            text_height = max(len(lines), 1) * text_font.line_height(16)
+            row = max(check_height, text_height)
+            top = self.flow.fit(row)
+            # align-items: center
+            check_top = top + (row - check_height) / 2
+            self.flow.page.content.append((
+                "text", 40, check_top + check_font.baseline(20), CHECK_MARK, check_key, 20, accent, 1.0
+            ))
+            line_top = top + (row - text_height) / 2
+            for line in lines:
+                cursor = text_x
+                for text, key, piece_width in line:
+                    self.flow.page.content.append((
+                        "text", cursor, line_top + text_font.baseline(16), text, key, 16, (0, 0, 0), 1.0
+                    ))
+                    cursor += piece_width
+                line_top += text_font.line_height(16)
+            self.flow.space(15)
+        self.flow.space(40)
+        self.flow.end()
+
+    def pricing(self):
+        bold, regular = self.fonts["bold"], self.fonts["regular"]
+        price, interval = price_text(self.offer), interval_text(self.offer)
+        inner = max(bold.width(price, 64), regular.width(interval, 14))
+        box_width = min(inner + 120, PAGE_WIDTH - 80)
+        box_height = 40 + bold.line_height(64) + 10 + (regular.line_height(14) if interval else 0) + 40
+
+        self.flow.space(60)
+        top = self.flow.fit(box_height)
+        left = (PAGE_WIDTH - box_width) / 2
+        page = self.flow.page
+        page.backgrounds.append((
+            "gradient", left, top, box_width, box_height, 20, self.brand["primary"], self.brand["secondary"]
+        ))
+        baseline = top + 40 + bold.baseline(64)
+        page.content.append(("text", left + (box_width - bold.width(price, 64)) / 2, baseline, price, "bold", 64, (1, 1, 1), 1.0))
+        if interval:
+            baseline = top + 40 + bold.line_height(64) + 10 + regular.baseline(14)
+            x = left + (box_width - regular.width(interval, 14)) / 2
+            page.content.append(("text", x, baseline, interval, "regular", 14, (1, 1, 1), 0.9))
+        self.flow.space(60)
+
+    def run(self) -> List[_Page]:
+        self.header()
+        self.personalization()
+        self.content()
+        self.features()
+        self.pricing()
+        return self.flow.pages
+
+
+# ============================================================================
+# PDF OUTPUT
+# ============================================================================
+
+def _number(value: float) -> str:
+    return f"{value:.3f}".rstrip("0").rstrip(".")
+
+
+def _rounded_rect(x: float, y: float, w: float, h: float, r: float) -> str:
+    if not r:
+        return f"{_number(x)} {_number(y)} {_number(w)} {_number(h)} re"
+    k = r * 0.5523  # Bezier circle approximation
+    return " ".join([
+        f"{_number(x + r)} {_number(y)} m",
+        f"{_number(x + w - r)} {_number(y)} l",
+        f"{_number(x + w - r + k)} {_number(y)} {_number(x + w)} {_number(y + r - k)} {_number(x + w)} {_number(y + r)} c",
+        f"{_number(x + w)} {_number(y + h - r)} l",
+        f"{_number(x + w)} {_number(y + h - r + k)} {_number(x + w - r + k)} {_number(y + h)} {_number(x + w - r)} {_number(y + h)} c",
+        f"{_number(x + r)} {_number(y + h)} l",
+        f"{_number(x + r - k)} {_number(y + h)} {_number(x)} {_number(y + h - r + k)} {_number(x)} {_number(y + h - r)} c",
+        f"{_number(x)} {_number(y + r)} l",
+        f"{_number(x)} {_number(y + r - k)} {_number(x + r - k)} {_number(y)} {_number(x + r)} {_number(y)} c h"
+    ])
+
+
+def _gradient_coords(x: float, y: float, w: float, h: float) -> List[float]:
+    """Start and end of a CSS 135deg linear-gradient line over the box (y down)"""
+    # 135deg points to the bottom right; the line is (w + h) * sin(45deg) long,
+    # so each end sits (w + h) / 4 from the centre along both axes
+    offset = (w + h) / 4
+    cx, cy = x + w / 2, y + h / 2
+    return [cx - offset, cy - offset, cx + offset, cy + offset]
+
+
+def _to_unicode(gids: Dict[int, int]) -> bytes:
+    entries = sorted((gid, cp) for cp, gid in gids.items())
+    lines = [
+        "/CIDInit /ProcSet findresource begin", "12 dict begin", "begincmap",
+        "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+        "/CMapName /Adobe-Identity-UCS def", "/CMapType 2 def",
+        "1 begincodespacerange", "<0000> <FFFF>", "endcodespacerange"
+    ]
+    for start in range(0, len(entries), 100):
+        chunk = entries[start:start + 100]
+        lines.append(f"{len(chunk)} beginbfchar")
+        lines.extend(f"<{gid:04X}> <{chr(cp).encode('utf-16-be').hex().upper()}>" for gid, cp in chunk)
+        lines.append("endbfchar")
+    lines.extend(["endcmap", "CMapName currentdict /CMap defineresource pop", "end", "end"])
+    return "\n".join(lines).encode("ascii")
+
+
+def _embed_font(document, font: _Font, codepoints: frozenset, tag: str):
+    """Type0 font object for the subset; returns (font object, codepoint -> glyph id)"""
+    import pydyf
+
+    data, gids, widths = font.subset(codepoints)
+    base_name = f"{tag}+{font.name}"
+    font_file = pydyf.Stream([data], {"Length1": len(data)}, compress=True)
+    document.add_object(font_file)
+    descriptor = pydyf.Dictionary({
+        "Type": "/FontDescriptor",
+        "FontName": f"/{base_name}",
+        "Flags": 32,
+        "FontBBox": pydyf.Array(font.bbox),
+        "ItalicAngle": 0,
+        "Ascent": int(font.ascent * 1000),
+        "Descent": int(-font.descent * 1000),
+        "CapHeight": font.cap_height * 1000 // font.upm,
+        "StemV": 80,
+        "FontFile2": font_file.reference
+    })
+    document.add_object(descriptor)
+    max_gid = max(widths) if widths else 0
+    cid_font = pydyf.Dictionary({
+        "Type": "/Font",
+        "Subtype": "/CIDFontType2",
+        "BaseFont": f"/{base_name}",
+        "CIDSystemInfo": pydyf.Dictionary({
+            "Registry": pydyf.String("Adobe"), "Ordering": pydyf.String("Identity"), "Supplement": 0
+        }),
+        "FontDescriptor": descriptor.reference,
+        "W": pydyf.Array([0, pydyf.Array([widths.get(gid, 0) for gid in range(max_gid + 1)])]),
+        "CIDToGIDMap": "/Identity"
+    })
+    document.add_object(cid_font)
+    to_unicode = pydyf.Stream([_to_unicode(gids)], compress=True)
+    document.add_object(to_unicode)
+    type0 = pydyf.Dictionary({
+        "Type": "/Font",
+        "Subtype": "/Type0",
+        "BaseFont": f"/{base_name}",
+        "Encoding": "/Identity-H",
+        "DescendantFonts": pydyf.Array([cid_font.reference]),
+        "ToUnicode": to_unicode.reference
+    })
+    document.add_object(type0)
+    return type0, gids
+
+
+def render(offer) -> bytes:
+    """The offer's PDF drawn directly; only call when supports(offer) is true"""
+    import pydyf
+
+    fonts = load_fonts()
+    pages = _Layout(offer, fonts).run()
+
+    used: Dict[str, set] = {}
+    for page in pages:
+        for op in page.content:
+            used.setdefault(op[4], set()).update(ord(char) for char in op[3])
+
+    document = pydyf.PDF()
+    font_refs, glyphs = {}, {}
+    for index, key in enumerate(sorted(used)):
+        font_object, gids = _embed_font(document, fonts[key], frozenset(used[key]), f"CLA{chr(65 + index)}AA")
+        font_refs[f"F{index}"] = font_object.reference
+        glyphs[key] = (f"F{index}", gids)
+
+    opacity = pydyf.Dictionary({"Type": "/ExtGState", "ca": 0.9})
+    document.add_object(opacity)
+
+    for page in pages:
+        ops = [f"{PX_TO_PT} 0 0 -{PX_TO_PT} 0 {_number(PAGE_HEIGHT * PX_TO_PT)} cm"]
+        shadings = {}
+        for op in page.backgrounds:
+            if op[0] == "rect":
+                _, x, y, w, h, color = op
+                ops.append(f"{' '.join(_number(c) for c in color)} rg {_number(x)} {_number(y)} {_number(w)} {_number(h)} re f")
+            else:
+                _, x, y, w, h, radius, start, end = op
+                name = f"Sh{len(shadings)}"
+                shadings[name] = pydyf.Dictionary({
+                    "ShadingType": 2,
+                    "ColorSpace": "/DeviceRGB",
+                    "Coords": pydyf.Array([_number(c) for c in _gradient_coords(x, y, w, h)]),
+                    "Function": pydyf.Dictionary({
+                        "FunctionType": 2, "Domain": pydyf.Array([0, 1]),
+                        "C0": pydyf.Array(list(start)), "C1": pydyf.Array(list(end)), "N": 1
+                    }),
+                    "Extend": pydyf.Array(["true", "true"])
+                })
+                ops.append(f"q {_rounded_rect(x, y, w, h, radius)} W n /{name} sh Q")
+
+        for _, x, y, text, key, size, color, alpha in page.content:
+            font_name, gids = glyphs[key]
+            encoded = "".join(f"{gids.get(ord(char), 0):04X}" for char in text)
+            state = "/GS9 gs " if alpha < 1 else ""
+            ops.append(
+                f"q {state}{' '.join(_number(c) for c in color)} rg BT /{font_name} {_number(size)} Tf "
+                f"1 0 0 -1 {_number(x)} {_number(y)} Tm <{encoded}> Tj ET Q"
+            )
+
+        for shading in shadings.values():
+            document.add_object(shading)
+        content = pydyf.Stream(["\n".join(ops).encode("ascii")], compress=True)
+        document.add_object(content)
+        document.add_page(pydyf.Dictionary({
+            "Type": "/Page",
+            "Parent": document.pages.reference,
+            "MediaBox": pydyf.Array([0, 0, _number(PAGE_WIDTH * PX_TO_PT), _number(PAGE_HEIGHT * PX_TO_PT)]),
+            "Contents": content.reference,
+            "Resources": pydyf.Dictionary({
+                "Font": pydyf.Dictionary(font_refs),
+                "ExtGState": pydyf.Dictionary({"GS9": opacity.reference}),
+                "Shading": pydyf.Dictionary({name: shading.reference for name, shading in shadings.items()})
+            })
+        }))
+
+    output = BytesIO()
+    document.write(output)
+    return output.getvalue()
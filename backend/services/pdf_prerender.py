@@ -0,0 +1,138 @@
+"""
+Background PDF pre-rendering after offers are created or edited.
+
+Each schedule() call restarts a per-offer debounce timer, so a burst of
+edits collapses into one render of the final content. The render goes
+through the shared PDF pool and artifact cache; once stored, the offer's
+pdf_render_key and pdf_url are set, but only if the offer still has the
+content that was rendered. Export then serves the stored file straight
+from the cache (see api.v1.offers.export_offer_pdf).
+"""
+from types import SimpleNamespace
+from typing import Dict, Optional, Tuple
+import asyncio
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+from core.config import settings
+from core.database import SessionLocal
+from core.metrics import registry
+from models.offer import Offer
+from services.pdf_service import has_artifact, offer_fields, render_key, render_offer_and_store
+
+logger = logging.getLogger(__name__)
+
+prerender_total = registry.counter(
+    "closealead_pdf_prerender_total",
+    "Background PDF pre-renders by outcome (rendered, cached, stale, failed)",
+    ["outcome"]
+)
+
+
+def _snapshot(offer_id: str) -> Optional[Tuple[str, SimpleNamespace]]:
+    """(render key, detached copy of the rendered fields) for the offer's current content"""
+    db = SessionLocal()
+    try:
+        offer = db.query(Offer).filter(Offer.id == offer_id).first()
+        if not offer:
+            return None
+        return render_key(offer), SimpleNamespace(**offer_fields(offer))
+    finally:
+        db.close()
+
+
+def _mark_rendered(offer_id: str, key: str) -> bool:
+    """Point the offer at its stored PDF unless it was edited again meanwhile"""
+    db = SessionLocal()
+    try:
+        offer = db.query(Offer).filter(Offer.id == offer_id).first()
+        if not offer or render_key(offer) != key:
+            return False
+        # Explicit updated_at: a background render isn't a user edit
+        db.query(Offer).filter(Offer.id == offer_id).update({
+            "pdf_url": f"/api/v1/offers/{offer_id}/export",
+            "pdf_render_key": key,
+            "updated_at": offer.updated_at
+        }, synchronize_session=False)
+        db.commit()
+        return True
+    finally:
+        db.close()
+
+
+class PdfPrerenderer:
+    """Debounced per-offer render scheduler living on the API event loop"""
+
+    def __init__(self, debounce: float, concurrency: int):
+        self.debounce = debounce
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._tasks: set = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._concurrency = concurrency
+
+    def schedule(self, offer_id: str):
+        """(Re)start the offer's debounce timer; call after the change is committed"""
+        previous = self._pending.pop(offer_id, None)
+        if previous is not None:
+            previous.cancel()
+        task = asyncio.ensure_future(self._run(offer_id))
+        self._pending[offer_id] = task
+        self._tasks.add(task)
+        task.add_done_callback(lambda done: self._forget(offer_id, done))
+
+    def cancel(self, offer_id: str):
+        task = self._pending.pop(offer_id, None)
+        if task is not None:
+            task.cancel()
+
+    def _forget(self, offer_id: str, task: asyncio.Task):
+        self._tasks.discard(task)
+        if self._pending.get(offer_id) is task:
+            del self._pending[offer_id]
+
+    async def _run(self, offer_id: str):
+        await asyncio.sleep(self.debounce)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._concurrency)
+
+        # Past the debounce the render itself is not cancelled by newer edits;
+        # a stale result is simply not recorded on the offer
+        self._pending.pop(offer_id, None)
+        async with self._slots:
+            try:
+                snapshot = await run_in_threadpool(_snapshot, offer_id)
+                if snapshot is None:
+                    return
+                key, content = snapshot
+                if await run_in_threadpool(has_artifact, key):
+                    outcome = "cached"
+                else:
+                    await render_offer_and_store(content, key)
+                    outcome = "rendered"
+                if not await run_in_threadpool(_mark_rendered, offer_id, key):
+                    outcome = "stale"
+            except Exception as e:
+                logger.warning(f"Background PDF render failed for offer {offer_id}: {str(e)}")
+                outcome = "failed"
+        prerender_total.inc(outcome=outcome)
+
+    async def shutdown(self):
+        tasks = list(self._tasks)
+        self._pending.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_prerenderer: Optional[PdfPrerenderer] = None
+
+def get_prerenderer() -> PdfPrerenderer:
+    """Get the global PDF pre-renderer"""
+    global _prerenderer
+    if _prerenderer is None:
+        _prerenderer = PdfPrerenderer(
+            debounce=settings.PDF_PRERENDER_DEBOUNCE,
+            concurrency=settings.PDF_PRERENDER_CONCURRENCY
+        )
+    return _prerenderer
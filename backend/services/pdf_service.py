@@ -1,135 +1,152 @@
 from io import BytesIO
-from weasyprint import HTML, CSS
+from types import SimpleNamespace
+from typing import Optional
+import hashlib
+import json
+import logging
+import weasyprint
+from weasyprint import HTML
+from starlette.concurrency import run_in_threadpool
+from core.config import settings
 from models.offer import Offer
+from services import pdf_direct
+from services.assets import asset_url_fetcher, asset_urls, get_asset_cache
+from services.storage import content_key, get_artifact_store
+from services.pdf_templates import CURRENCY_SYMBOLS, get_template, preload_stylesheets
+from services.worker_pool import ProcessWorkerPool
+
+logger = logging.getLogger(__name__)
+
+# Bump when template markup or styles change so cached PDFs are re-rendered
+TEMPLATE_VERSION = "5"
+RENDERER_VERSION = f"weasyprint-{weasyprint.__version__}"
 
 def get_currency_symbol(currency: str) -> str:
-    symbols = {"USD": "$", "EUR": "€", "GBP": "£", "CAD": "$"}
-    return symbols.get(currency, "$")
+    return CURRENCY_SYMBOLS.get(currency, "$")
+
+def generate_html(offer: Offer, inline_css: bool = False) -> str:
+    """Offer HTML from its compiled template (stylesheet inlined only for browsers)"""
+    return get_template(offer.template).render(offer, inline_css=inline_css)
 
 def generate_pdf(offer: Offer) -> bytes:
-    """Generate PDF from offer data"""
-    
-    # Create HTML content based on template
-    html_content = generate_html(offer)
-    
-    # Generate PDF
+    """Generate PDF from offer data in the calling thread (prefer get_offer_pdf)"""
+    return render_offer_pdf(offer_fields(offer))
+
+def uses_direct_writer(offer) -> bool:
+    """Whether the offer renders with the direct PDF writer rather than WeasyPrint"""
+    return settings.PDF_DIRECT_RENDERER and pdf_direct.supports(offer)
+
+def render_offer_pdf(fields: dict) -> bytes:
+    """Offer PDF from its rendered fields, drawn directly when the standard layout allows (runs inside render pool workers)"""
+    offer = SimpleNamespace(**fields)
+    if uses_direct_writer(offer):
+        return pdf_direct.render(offer)
+    return render_html_to_pdf(generate_html(offer), offer.template)
+
+def render_html_to_pdf(html_content: str, template_name: Optional[str] = None) -> bytes:
+    """Render HTML to PDF bytes with the template's pre-parsed stylesheet (runs inside render pool workers)"""
     pdf_file = BytesIO()
-    HTML(string=html_content).write_pdf(pdf_file)
-    pdf_file.seek(0)
-    
-    return pdf_file.read()
-
-def generate_html(offer: Offer) -> str:
-    """Generate HTML based on offer template"""
-    
-    currency_symbol = get_currency_symbol(offer.price_currency)
-    features_html = "\n".join([
-        f'<div class="feature"><span class="check">✓</span> {feature}</div>'
-        for feature in (offer.features or [])
-    ])
-    
-    # Add personalization if client name is provided
-    personalization_html = ""
-    if offer.client_name:
-        personalization_html = f'<div class="personalization">Prepared for: <strong>{offer.client_name}</strong></div>'
-    
-    # Customize styles based on template
-    if offer.template in {"modern", "bold", "elegant", "vibrant"}:
-        return f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <style>
-                @page {{ size: A4; margin: 0; }}
-                body {{ margin: 0; font-family: 'Arial', sans-serif; }}
-                .header {{ background: linear-gradient(135deg, #3b82f6, #8b5cf6); color: white; padding: 60px 40px; }}
-                .header h1 {{ font-size: 48px; margin: 0 0 20px 0; }}
-                .header p {{ font-size: 20px; opacity: 0.9; }}
-                .personalization {{ background: #f0f9ff; padding: 15px 40px; font-size: 14px; color: #1e40af; border-left: 4px solid #3b82f6; }}
-                .content {{ padding: 40px; }}
-                .description {{ font-size: 16px; line-height: 1.8; color: #374151; margin-bottom: 40px; }}
-                .features {{ background: #f9fafb; padding: 40px; }}
-                .features h2 {{ font-size: 32px; margin-bottom: 30px; }}
-                .feature {{ display: flex; align-items: center; margin-bottom: 15px; font-size: 16px; }}
-                .check {{ color: #10b981; font-size: 20px; margin-right: 15px; }}
-                .pricing {{ text-align: center; padding: 60px 40px; }}
-                .price-box {{ display: inline-block; background: linear-gradient(135deg, #3b82f6, #8b5cf6); color: white; padding: 40px 60px; border-radius: 20px; }}
-                .price {{ font-size: 64px; font-weight: bold; }}
-                .interval {{ font-size: 14px; opacity: 0.9; margin-top: 10px; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>{offer.title}</h1>
-                <p>{offer.subtitle}</p>
-            </div>
-            {personalization_html}
-            <div class="content">
-                <div class="description">{offer.description}</div>
-            </div>
-            <div class="features">
-                <h2>What You Get</h2>
-                {features_html}
-            </div>
-            <div class="pricing">
-                <div class="price-box">
-                    <div class="price">{currency_symbol}{offer.price_amount}</div>
-                    <div class="interval">
-                        {offer.price_interval if offer.price_interval != 'one-time' else 'One-time payment'}
-                    </div>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-    
-    # Default safely to the modern layout if template is unrecognized
-    return f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <style>
-            @page {{ size: A4; margin: 0; }}
-            body {{ margin: 0; font-family: 'Arial', sans-serif; }}
-            .header {{ background: linear-gradient(135deg, #3b82f6, #8b5cf6); color: white; padding: 60px 40px; }}
-            .header h1 {{ font-size: 48px; margin: 0 0 20px 0; }}
-            .header p {{ font-size: 20px; opacity: 0.9; }}
-            .personalization {{ background: #f0f9ff; padding: 15px 40px; font-size: 14px; color: #1e40af; border-left: 4px solid #3b82f6; }}
-            .content {{ padding: 40px; }}
-            .description {{ font-size: 16px; line-height: 1.8; color: #374151; margin-bottom: 40px; }}
-            .features {{ background: #f9fafb; padding: 40px; }}
-            .features h2 {{ font-size: 32px; margin-bottom: 30px; }}
-            .feature {{ display: flex; align-items: center; margin-bottom: 15px; font-size: 16px; }}
-            .check {{ color: #10b981; font-size: 20px; margin-right: 15px; }}
-            .pricing {{ text-align: center; padding: 60px 40px; }}
-            .price-box {{ display: inline-block; background: linear-gradient(135deg, #3b82f6, #8b5cf6); color: white; padding: 40px 60px; border-radius: 20px; }}
-            .price {{ font-size: 64px; font-weight: bold; }}
-            .interval {{ font-size: 14px; opacity: 0.9; margin-top: 10px; }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h1>{offer.title}</h1>
-            <p>{offer.subtitle}</p>
-        </div>
-        {personalization_html}
-        <div class="content">
-            <div class="description">{offer.description}</div>
-        </div>
-        <div class="features">
-            <h2>What You Get</h2>
-            {features_html}
-        </div>
-        <div class="pricing">
-            <div class="price-box">
-                <div class="price">{currency_symbol}{offer.price_amount}</div>
-                <div class="interval">
-                    {offer.price_interval if offer.price_interval != 'one-time' else 'One-time payment'}
-                </div>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
+    HTML(string=html_content, url_fetcher=asset_url_fetcher).write_pdf(pdf_file, stylesheets=[get_template(template_name).stylesheet()])
+    return pdf_file.getvalue()
+
+# Same fonts, weights and glyphs as the templates, so the first real render
+# doesn't pay for fontconfig scans and font loading
+_WARMUP_HTML = """
+<!DOCTYPE html>
+<html><head><meta charset="UTF-8"><style>
+@page { size: A4; margin: 0; }
+body { font-family: 'Arial', sans-serif; }
+</style></head>
+<body><h1>Warm-up</h1><p>Text <strong>bold</strong> $€£ ✓</p></body></html>
+"""
+
+def warm_renderer():
+    """Render pool initializer: load WeasyPrint, the template fonts and stylesheets once per worker"""
+    try:
+        preload_stylesheets()
+        render_html_to_pdf(_WARMUP_HTML)
+        if settings.PDF_DIRECT_RENDERER:
+            pdf_direct.load_fonts()
+    except Exception as e:
+        logger.warning(f"PDF renderer warm-up failed: {str(e)}")
+
+# ============================================================================
+# RENDERED ARTIFACTS (content-addressed, kept in the artifact store)
+# ============================================================================
+
+# Fields generate_html reads; any change to them yields a new render key
+RENDERED_FIELDS = (
+    "title", "subtitle", "description", "client_name", "price_amount", "price_currency",
+    "price_interval", "features", "template", "brand_colors", "logo_url", "images"
+)
+
+def offer_fields(offer) -> dict:
+    return {field: getattr(offer, field) for field in RENDERED_FIELDS}
+
+def render_key(offer: Offer) -> str:
+    """Key (and strong ETag) for an offer's PDF, computed without building the HTML"""
+    renderer = pdf_direct.renderer_version() if uses_direct_writer(offer) else RENDERER_VERSION
+    encoded = json.dumps(offer_fields(offer), sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(f"{TEMPLATE_VERSION}:{renderer}:{encoded}".encode("utf-8")).hexdigest()
+
+def _stored_key(key: str) -> str:
+    return content_key("pdf", key, "pdf")
+
+def has_artifact(key: str) -> bool:
+    return get_artifact_store().exists(_stored_key(key))
+
+def load_artifact(key: str) -> Optional[bytes]:
+    return get_artifact_store().get(_stored_key(key))
+
+def store_artifact(key: str, pdf_content: bytes):
+    get_artifact_store().put(_stored_key(key), pdf_content, "application/pdf")
+
+def artifact_response(key: str, headers: Optional[dict] = None):
+    """Serve a stored PDF straight from the artifact store (sendfile/Range or redirect); None if it's gone"""
+    return get_artifact_store().response(_stored_key(key), "application/pdf", headers)
+
+_render_pool: Optional[ProcessWorkerPool] = None
+
+def get_render_pool() -> ProcessWorkerPool:
+    """Get the global PDF render pool (started warm by the API lifespan, else on first use)"""
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessWorkerPool(
+            name="pdf_render",
+            size=settings.PDF_RENDER_WORKERS,
+            initializer=warm_renderer,
+            default_timeout=settings.PDF_RENDER_TIMEOUT,
+            queue_timeout=settings.PDF_RENDER_QUEUE_TIMEOUT,
+            max_tasks_per_child=settings.PDF_RENDER_MAX_TASKS_PER_CHILD
+        )
+    return _render_pool
+
+async def render_offer_and_store(offer, key: str) -> bytes:
+    """Render an offer in the process pool (direct writer or WeasyPrint) and store it under key"""
+    if not uses_direct_writer(offer):
+        # Fetch remote images here so render workers read them from the local asset cache
+        await run_in_threadpool(get_asset_cache().prefetch, asset_urls(generate_html(offer)))
+    pdf_content = await get_render_pool().submit(render_offer_pdf, offer_fields(offer))
+    await _store_rendered(key, pdf_content)
+    return pdf_content
+
+async def _store_rendered(key: str, pdf_content: bytes):
+    try:
+        await run_in_threadpool(store_artifact, key, pdf_content)
+    except Exception as e:
+        logger.warning(f"Could not store rendered PDF {key}: {str(e)}")
+
+async def get_offer_pdf(offer: Offer) -> bytes:
+    """The offer's PDF from the render cache, rendered in the process pool on a miss"""
+    key = render_key(offer)
+    pdf_content = await run_in_threadpool(load_artifact, key)
+    if pdf_content is not None:
+        return pdf_content
+    return await render_offer_and_store(offer, key)
+
+async def ensure_offer_pdf(offer: Offer) -> Optional[bytes]:
+    """Make sure the offer's PDF is stored; returns the bytes only if it had to be rendered"""
+    key = render_key(offer)
+    if await run_in_threadpool(has_artifact, key):
+        return None
+    return await render_offer_and_store(offer, key)
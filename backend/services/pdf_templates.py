@@ -0,0 +1,264 @@
+"""
+Offer document templates.
+
+Each template's markup is compiled once at import and its stylesheet is
+parsed into a WeasyPrint CSS object once per process, then reused for every
+render. Per-offer brand colors are passed as CSS custom properties in a tiny
+inline :root block, next to the gradient rules with the colors resolved
+(brand_rules), so the shared stylesheet never needs re-parsing. All offer
+fields are HTML-escaped.
+
+The body is assembled from independent sections, each a top-level element
+tagged with data-section, so the live preview (services.live_preview) can
+re-render and swap just the sections an edit touches.
+"""
+from html import escape
+from string import Template
+from typing import Dict, Optional
+import re
+import threading
+
+from weasyprint import CSS
+
+DEFAULT_TEMPLATE = "modern"
+
+DEFAULT_BRAND_COLORS = {
+    "primary": "#3b82f6",
+    "secondary": "#8b5cf6",
+    "accent": "#10b981"
+}
+
+_COLOR = re.compile(r"^#(?:[0-9a-fA-F]{3}|[0-9a-fA-F]{6})$")
+
+CURRENCY_SYMBOLS = {"USD": "$", "EUR": "€", "GBP": "£", "CAD": "$"}
+
+OFFER_MARKUP = Template("""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <style>:root { $brand_variables } $brand_rules</style>$inline_css
+</head>
+<body>
+    $header
+    $personalization
+    $content
+    $gallery
+    $features
+    $pricing
+</body>
+</html>
+""")
+
+# Longhand properties only: WeasyPrint < 61 doesn't resolve var() inside shorthands,
+# nor inside functions such as linear-gradient(), so gradients come from brand_rules()
+BASE_CSS = """
+@page { size: A4; margin: 0; }
+body { margin: 0; font-family: 'Arial', sans-serif; }
+.header { color: white; padding: 60px 40px; }
+.header .logo { display: block; height: 48px; margin-bottom: 32px; }
+.header h1 { font-size: 48px; margin: 0 0 20px 0; }
+.header p { font-size: 20px; opacity: 0.9; }
+.personalization { background-color: #f0f9ff; padding: 15px 40px; font-size: 14px; color: #1e40af; border-left-width: 4px; border-left-style: solid; border-left-color: var(--brand-primary); }
+.content { padding: 40px; }
+.description { font-size: 16px; line-height: 1.8; color: #374151; margin-bottom: 40px; }
+.gallery { padding: 0 40px 40px 40px; }
+.gallery img { display: block; max-width: 100%; margin-bottom: 20px; border-radius: 8px; }
+.features { background-color: #f9fafb; padding: 40px; }
+.features h2 { font-size: 32px; margin-bottom: 30px; }
+.feature { display: flex; align-items: center; margin-bottom: 15px; font-size: 16px; }
+.check { color: var(--brand-accent); font-size: 20px; margin-right: 15px; }
+.pricing { text-align: center; padding: 60px 40px; }
+.price-box { display: inline-block; color: white; padding: 40px 60px; border-radius: 20px; }
+.price { font-size: 64px; font-weight: bold; }
+.interval { font-size: 14px; opacity: 0.9; margin-top: 10px; }
+"""
+
+
+# Offer attributes each section reads; sections not listed for a change can be reused
+SECTION_FIELDS = {
+    "header": ("logo_url", "title", "subtitle"),
+    "personalization": ("client_name",),
+    "content": ("description",),
+    "gallery": ("images",),
+    "features": ("features",),
+    "pricing": ("price_amount", "price_currency", "price_interval")
+}
+SECTIONS = tuple(SECTION_FIELDS)
+
+
+def image_url(url) -> Optional[str]:
+    """Attribute-safe URL, or None for anything but http(s)"""
+    if isinstance(url, str) and url.strip().lower().startswith(("http://", "https://")):
+        return escape(url.strip(), quote=True)
+    return None
+
+
+def _header(offer) -> str:
+    logo_url = image_url(offer.logo_url)
+    logo = f'\n        <img class="logo" src="{logo_url}" alt="">' if logo_url else ""
+    return (
+        f'<div class="header" data-section="header">{logo}\n'
+        f'        <h1>{escape(offer.title or "")}</h1>\n'
+        f'        <p>{escape(offer.subtitle or "")}</p>\n'
+        '    </div>'
+    )
+
+
+def _personalization(offer) -> str:
+    if not offer.client_name:
+        # Empty placeholder keeps the section addressable once a client name is typed
+        return '<div data-section="personalization"></div>'
+    return (
+        '<div class="personalization" data-section="personalization">'
+        f'Prepared for: <strong>{escape(offer.client_name)}</strong></div>'
+    )
+
+
+def _content(offer) -> str:
+    return (
+        '<div class="content" data-section="content">\n'
+        f'        <div class="description">{escape(offer.description or "")}</div>\n'
+        '    </div>'
+    )
+
+
+def _gallery(offer) -> str:
+    urls = [url for url in map(image_url, offer.images or []) if url]
+    if not urls:
+        return '<div data-section="gallery"></div>'
+    images = "".join(f'\n        <img src="{url}" alt="">' for url in urls)
+    return f'<div class="gallery" data-section="gallery">{images}\n    </div>'
+
+
+def _features(offer) -> str:
+    items = "".join(
+        f'\n        <div class="feature"><span class="check">✓</span> {escape(str(feature))}</div>'
+        for feature in (offer.features or [])
+    )
+    return (
+        '<div class="features" data-section="features">\n'
+        f'        <h2>What You Get</h2>{items}\n'
+        '    </div>'
+    )
+
+
+def price_text(offer) -> str:
+    return f"{CURRENCY_SYMBOLS.get(offer.price_currency, '$')}{offer.price_amount}"
+
+
+def interval_text(offer) -> str:
+    return (offer.price_interval if offer.price_interval != "one-time" else "One-time payment") or ""
+
+
+def _pricing(offer) -> str:
+    return (
+        '<div class="pricing" data-section="pricing">\n'
+        '        <div class="price-box">\n'
+        f'            <div class="price">{escape(price_text(offer))}</div>\n'
+        f'            <div class="interval">{escape(interval_text(offer))}</div>\n'
+        '        </div>\n'
+        '    </div>'
+    )
+
+
+SECTION_RENDERERS = {
+    "header": _header,
+    "personalization": _personalization,
+    "content": _content,
+    "gallery": _gallery,
+    "features": _features,
+    "pricing": _pricing
+}
+
+
+def brand_palette(brand_colors: Optional[dict]) -> Dict[str, str]:
+    """The offer's colors; anything but a hex color falls back to the default"""
+    colors = dict(DEFAULT_BRAND_COLORS)
+    for key, value in (brand_colors or {}).items():
+        if key in colors and isinstance(value, str) and _COLOR.match(value.strip()):
+            colors[key] = value.strip()
+    return colors
+
+
+def brand_variables(brand_colors: Optional[dict]) -> str:
+    """CSS custom properties for the offer's colors"""
+    return " ".join(f"--brand-{key}: {value};" for key, value in brand_palette(brand_colors).items())
+
+
+def gradient_rule(primary: str, secondary: str, scope: str = "") -> str:
+    return (
+        f"{scope}.header, {scope}.price-box "
+        f"{{ background-image: linear-gradient(135deg, {primary}, {secondary}); }}"
+    )
+
+
+def brand_rules(brand_colors: Optional[dict], scope: str = "") -> str:
+    """Header and price-box gradients with the colors resolved (scope: e.g. "#offer-3 ")"""
+    colors = brand_palette(brand_colors)
+    return gradient_rule(colors["primary"], colors["secondary"], scope)
+
+
+# Browsers resolve var() in gradients, so live previews follow brand variable updates
+BROWSER_CSS = gradient_rule("var(--brand-primary)", "var(--brand-secondary)")
+
+
+class OfferTemplate:
+    """Compiled markup plus a stylesheet parsed at most once per process"""
+
+    def __init__(self, name: str, css: str, markup: Template = OFFER_MARKUP):
+        self.name = name
+        self.css = css
+        self.markup = markup
+        self._stylesheet: Optional[CSS] = None
+        self._lock = threading.Lock()
+
+    def stylesheet(self) -> CSS:
+        if self._stylesheet is None:
+            with self._lock:
+                if self._stylesheet is None:
+                    self._stylesheet = CSS(string=self.css)
+        return self._stylesheet
+
+    def render_section(self, name: str, offer) -> str:
+        return SECTION_RENDERERS[name](offer)
+
+    def render(self, offer, inline_css: bool = False, sections: Optional[Dict[str, str]] = None) -> str:
+        """
+        Offer HTML. Without inline_css the stylesheet must be passed to
+        write_pdf (see services.pdf_service); inline_css is for browsers.
+        Pre-rendered section fragments can be passed to skip re-rendering them.
+        """
+        fragments = {
+            name: (sections or {}).get(name) or self.render_section(name, offer)
+            for name in SECTIONS
+        }
+        return self.markup.substitute(
+            brand_variables=brand_variables(offer.brand_colors),
+            brand_rules=brand_rules(offer.brand_colors),
+            inline_css=f"\n    <style>{self.css}\n{BROWSER_CSS}</style>" if inline_css else "",
+            **fragments
+        )
+
+TEMPLATES: Dict[str, OfferTemplate] = {}
+
+
+def register_template(name: str, css: str, markup: Template = OFFER_MARKUP) -> OfferTemplate:
+    TEMPLATES[name] = OfferTemplate(name, css, markup)
+    return TEMPLATES[name]
+
+
+def get_template(name: Optional[str]) -> OfferTemplate:
+    """Template by name, defaulting to the modern layout if unrecognized"""
+    return TEMPLATES.get(name or DEFAULT_TEMPLATE) or TEMPLATES[DEFAULT_TEMPLATE]
+
+
+def preload_stylesheets():
+    """Parse every template stylesheet now (render worker warm-up)"""
+    for template in TEMPLATES.values():
+        template.stylesheet()
+
+
+# The four design styles currently share one layout, so they share one parsed stylesheet
+register_template(DEFAULT_TEMPLATE, BASE_CSS)
+for _name in ("bold", "elegant", "vibrant"):
+    TEMPLATES[_name] = TEMPLATES[DEFAULT_TEMPLATE]
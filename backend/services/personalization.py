@@ -0,0 +1,117 @@
+"""
+Per-client personalization of an existing offer.
+
+Variants reuse the base offer's generated copy and design. Placeholders such
+as {{client_name}} or {{company}} in the title, subtitle, description and
+features are filled from each client's details; fields the caller opts in to
+can additionally be rewritten by the LLM (see crew.crews.OfferPersonalizationCrew).
+"""
+from typing import Any, Dict, List, Optional
+import re
+import uuid
+
+from models.offer import Offer
+
+PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+TEMPLATED_FIELDS = ("title", "subtitle", "description")
+LLM_FIELDS = ("title", "subtitle", "description", "features")
+
+FIELD_LIMITS = {
+    "title": 200,
+    "subtitle": 300
+}
+
+
+def client_variables(client: Dict[str, Any]) -> Dict[str, str]:
+    """Template variables for one client; custom fields can't shadow the built-ins"""
+    name = (client.get("name") or "").strip()
+    variables = {
+        str(key).lower(): str(value)
+        for key, value in (client.get("fields") or {}).items()
+        if value is not None
+    }
+    variables.update({
+        "client_name": name,
+        "name": name,
+        "first_name": name.split()[0] if name else "",
+        "company": (client.get("company") or name).strip(),
+        "industry": (client.get("industry") or "").strip()
+    })
+    return variables
+
+
+def render(text: Optional[str], variables: Dict[str, str]) -> Optional[str]:
+    """Fill {{placeholders}}; unknown ones render empty rather than leak into a client PDF"""
+    if not text or "{{" not in text:
+        return text
+    rendered = PLACEHOLDER.sub(lambda match: variables.get(match.group(1).lower(), ""), text)
+    return re.sub(r"[ \t]{2,}", " ", rendered).strip()
+
+
+def has_placeholders(offer: Offer) -> bool:
+    texts = [getattr(offer, field) or "" for field in TEMPLATED_FIELDS] + list(offer.features or [])
+    return any("{{" in text for text in texts if isinstance(text, str))
+
+
+def base_fields(offer: Offer) -> Dict[str, Any]:
+    """The generated content a variant starts from"""
+    return {
+        "title": offer.title,
+        "subtitle": offer.subtitle or "",
+        "description": offer.description or "",
+        "features": list(offer.features or [])
+    }
+
+
+def clean_llm_fields(generated: Optional[Dict[str, Any]], allowed: List[str]) -> Dict[str, Any]:
+    """Keep only opted-in fields with the right shape from an LLM response"""
+    if not isinstance(generated, dict):
+        return {}
+
+    cleaned = {}
+    for field in allowed:
+        value = generated.get(field)
+        if field == "features":
+            if isinstance(value, list) and value and all(isinstance(item, str) for item in value):
+                cleaned[field] = [item.strip() for item in value if item.strip()]
+        elif isinstance(value, str) and value.strip():
+            cleaned[field] = value.strip()[:FIELD_LIMITS.get(field, 10000)]
+    return cleaned
+
+
+def variant_row(
+    base: Offer,
+    client: Dict[str, Any],
+    user_id: str,
+    edit_limit: int,
+    overrides: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Column mapping for one personalized copy of base, ready for a bulk insert"""
+    variables = client_variables(client)
+    fields = {
+        "title": render(base.title, variables),
+        "subtitle": render(base.subtitle, variables),
+        "description": render(base.description, variables),
+        "features": [render(feature, variables) for feature in (base.features or [])]
+    }
+    fields.update(overrides or {})
+
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "title": (fields["title"] or base.title)[:FIELD_LIMITS["title"]],
+        "subtitle": (fields["subtitle"] or "")[:FIELD_LIMITS["subtitle"]],
+        "description": fields["description"],
+        "client_name": variables["client_name"][:200],
+        "price_amount": base.price_amount,
+        "price_currency": base.price_currency,
+        "price_interval": base.price_interval,
+        "features": fields["features"],
+        "template": base.template,
+        "brand_colors": base.brand_colors,
+        "logo_url": base.logo_url,
+        "images": base.images or [],
+        "edit_count": 0,
+        "edit_limit": edit_limit
+    }
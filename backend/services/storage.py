@@ -0,0 +1,297 @@
+"""
+Artifact storage for rendered PDFs and other generated files.
+
+Keys are content-addressed (namespace/ab/<sha256>.<ext>), so identical
+renders share one stored object no matter which offer or user produced
+them. Two backends:
+
+- LocalArtifactStore: files under a directory, written atomically, with
+  least-recently-used eviction past a size budget. Served with FileResponse,
+  which uses sendfile and honours Range requests.
+- S3ArtifactStore: any S3-compatible service (AWS, MinIO, a local stand-in
+  via S3_ENDPOINT_URL). Large objects upload with multipart streaming; reads
+  are served by redirecting to a short-lived presigned URL.
+
+ARTIFACT_STORE selects the backend.
+"""
+from typing import Dict, Iterable, Iterator, Optional
+import logging
+import os
+import tempfile
+import threading
+
+from fastapi.responses import FileResponse, RedirectResponse, Response
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(namespace: str, digest: str, extension: str) -> str:
+    return f"{namespace}/{digest[:2]}/{digest}.{extension}"
+
+
+def _chunks(data: bytes, size: int) -> Iterator[bytes]:
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+class ArtifactStore:
+    """Interface shared by the storage backends"""
+
+    name = "base"
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def put(self, key: str, data: bytes, content_type: str = "application/octet-stream"):
+        self.put_stream(key, _chunks(data, 1024 * 1024), content_type)
+
+    def put_stream(self, key: str, chunks: Iterable[bytes], content_type: str = "application/octet-stream"):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def response(self, key: str, media_type: str, headers: Optional[Dict[str, str]] = None) -> Optional[Response]:
+        """HTTP response serving the stored object, or None if it is known to be gone"""
+        raise NotImplementedError
+
+
+class LocalArtifactStore(ArtifactStore):
+    name = "local"
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total: Optional[int] = None  # Approximate; rescanned when over budget
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def _touch(self, path: str):
+        # Access time lives in mtime so eviction is least-recently-used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        self._touch(path)
+        return data
+
+    def put_stream(self, key: str, chunks: Iterable[bytes], content_type: str = "application/octet-stream"):
+        """Write atomically so a concurrent reader never sees a partial file"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._evict_if_needed(size)
+
+    def delete(self, key: str):
+        path = self.path(key)
+        try:
+            size = os.path.getsize(path)
+            os.unlink(path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if self._total is not None:
+                self._total -= size
+
+    def response(self, key: str, media_type: str, headers: Optional[Dict[str, str]] = None) -> Optional[Response]:
+        path = self.path(key)
+        try:
+            stat_result = os.stat(path)
+        except FileNotFoundError:
+            # Evicted since the caller checked; FileResponse would fail mid-request
+            return None
+        # Most recently used now, so eviction won't pick it while it is being sent
+        self._touch(path)
+        return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result)
+
+    def _scan(self) -> list:
+        entries = []
+        for root, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict_if_needed(self, added: int):
+        """Drop least recently used files once the store exceeds max_bytes"""
+        with self._lock:
+            if self._total is None:
+                self._total = sum(size for _, size, _ in self._scan())
+            else:
+                self._total += added
+            if self._total <= self.max_bytes:
+                return
+
+            entries = sorted(self._scan())
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * 0.9
+            evicted = 0
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                    total -= size
+                    evicted += 1
+                except FileNotFoundError:
+                    pass
+            self._total = total
+        if evicted:
+            logger.info(f"Evicted {evicted} stored artifacts")
+
+
+class S3ArtifactStore(ArtifactStore):
+    name = "s3"
+
+    # S3 requires parts of at least 5 MiB (except the last)
+    PART_SIZE = 8 * 1024 * 1024
+
+    def __init__(self, bucket: str, client=None, prefix: str = ""):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            self._client = boto3.client(
+                "s3",
+                region_name=settings.AWS_REGION,
+                endpoint_url=settings.S3_ENDPOINT_URL or None,
+                aws_access_key_id=settings.AWS_ACCESS_KEY_ID or None,
+                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY or None
+            )
+        return self._client
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _is_missing(self, error) -> bool:
+        code = str(getattr(error, "response", {}).get("Error", {}).get("Code", ""))
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except Exception as e:
+            if self._is_missing(e):
+                return False
+            raise
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception as e:
+            if self._is_missing(e):
+                return None
+            raise
+        return response["Body"].read()
+
+    def put(self, key: str, data: bytes, content_type: str = "application/octet-stream"):
+        if len(data) < self.PART_SIZE:
+            self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data, ContentType=content_type)
+        else:
+            self.put_stream(key, _chunks(data, self.PART_SIZE), content_type)
+
+    def put_stream(self, key: str, chunks: Iterable[bytes], content_type: str = "application/octet-stream"):
+        """Multipart upload, buffering only one part in memory at a time"""
+        object_key = self._key(key)
+        upload = self.client.create_multipart_upload(
+            Bucket=self.bucket, Key=object_key, ContentType=content_type
+        )
+        upload_id = upload["UploadId"]
+        parts = []
+        buffer = bytearray()
+
+        def flush():
+            number = len(parts) + 1
+            result = self.client.upload_part(
+                Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+                PartNumber=number, Body=bytes(buffer)
+            )
+            parts.append({"PartNumber": number, "ETag": result["ETag"]})
+            buffer.clear()
+
+        try:
+            for chunk in chunks:
+                buffer.extend(chunk)
+                if len(buffer) >= self.PART_SIZE:
+                    flush()
+            if buffer or not parts:
+                flush()
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+        except BaseException:
+            try:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=object_key, UploadId=upload_id)
+            except Exception as e:
+                logger.warning(f"Could not abort multipart upload for {object_key}: {str(e)}")
+            raise
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def response(self, key: str, media_type: str, headers: Optional[Dict[str, str]] = None) -> Optional[Response]:
+        params = {"Bucket": self.bucket, "Key": self._key(key), "ResponseContentType": media_type}
+        disposition = (headers or {}).get("Content-Disposition")
+        if disposition:
+            params["ResponseContentDisposition"] = disposition
+        url = self.client.generate_presigned_url(
+            "get_object", Params=params, ExpiresIn=settings.S3_PRESIGN_EXPIRES
+        )
+        # S3 serves the bytes (and Range requests); keep our cache validators on the redirect
+        passthrough = {k: v for k, v in (headers or {}).items() if k.lower() in ("etag", "cache-control")}
+        return RedirectResponse(url, status_code=307, headers=passthrough)
+
+
+_artifact_store: Optional[ArtifactStore] = None
+
+def get_artifact_store() -> ArtifactStore:
+    """Get the global artifact store"""
+    global _artifact_store
+    if _artifact_store is None:
+        if settings.ARTIFACT_STORE == "s3":
+            _artifact_store = S3ArtifactStore(settings.S3_BUCKET, prefix=settings.S3_PREFIX)
+        else:
+            root = settings.PDF_ARTIFACT_DIR or os.path.join(tempfile.gettempdir(), "closealead-pdf")
+            _artifact_store = LocalArtifactStore(root, settings.PDF_CACHE_MAX_MB * 1024 * 1024)
+        logger.info(f"Using {_artifact_store.name} artifact store")
+    return _artifact_store
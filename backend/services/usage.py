@@ -0,0 +1,256 @@
+"""
+Per-user token ledger and plan-based generation quotas.
+
+LLM callbacks record usage into an in-memory buffer that is flushed to the
+token_ledger table in batched upserts. Quotas are checked against an
+in-memory running counter per user and day, seeded once from the ledger.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, date
+from typing import Dict, Optional, Tuple
+import logging
+import threading
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from core.database import SessionLocal, engine
+from models.token_ledger import TokenLedgerEntry
+
+logger = logging.getLogger(__name__)
+
+ANONYMOUS_USER = "anonymous"
+
+# USD per 1K tokens: (prompt, completion)
+MODEL_PRICING = {
+    "gpt-4-turbo-preview": (0.01, 0.03),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.005, 0.015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "o1-preview": (0.015, 0.06),
+    "o1-mini": (0.003, 0.012)
+}
+
+# (user_id, plan) that LLM usage in the current thread/task is billed to
+_usage_owner: ContextVar[Tuple[str, str]] = ContextVar("usage_owner", default=(ANONYMOUS_USER, "none"))
+
+
+@contextmanager
+def usage_scope(user_id: str, plan):
+    """Attribute all LLM usage inside this block to the given user and plan"""
+    plan_value = getattr(plan, "value", plan) or "none"
+    token = _usage_owner.set((user_id or ANONYMOUS_USER, plan_value))
+    try:
+        yield
+    finally:
+        _usage_owner.reset(token)
+
+
+def current_usage_owner() -> Tuple[str, str]:
+    return _usage_owner.get()
+
+
+def _utc_today() -> date:
+    return datetime.utcnow().date()
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_rate, completion_rate = MODEL_PRICING.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_rate + completion_tokens * completion_rate) / 1000
+
+
+class TokenLedger:
+    """Buffers usage in memory and writes it to the ledger in batched upserts"""
+
+    def __init__(self, flush_size: int = 200, flush_interval: float = 5.0):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._buffer: Dict[Tuple[str, str, str, date], list] = {}
+        self._pending_events = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(
+        self,
+        stage: str,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        model: str = "",
+        llm_calls: int = 1,
+        runs: int = 0
+    ):
+        user_id, plan = current_usage_owner()
+        key = (user_id, plan, stage or "unscoped", _utc_today())
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+
+        with self._lock:
+            totals = self._buffer.setdefault(key, [0, 0, 0, 0, 0.0])
+            totals[0] += prompt_tokens
+            totals[1] += completion_tokens
+            totals[2] += llm_calls
+            totals[3] += runs
+            totals[4] += cost
+            self._pending_events += 1
+            should_flush = self._pending_events >= self.flush_size
+
+        if should_flush:
+            self.flush()
+
+    def record_run(self, crew_type: str):
+        """Count one completed generation for the current usage owner"""
+        self.record(stage=crew_type, llm_calls=0, runs=1)
+
+    def pending(self, user_id: str, day: Optional[date] = None) -> Dict[str, int]:
+        """Unflushed totals for a user, so reads can include the live buffer"""
+        day = day or _utc_today()
+        totals = {"prompt_tokens": 0, "completion_tokens": 0, "runs": 0}
+        with self._lock:
+            for (buf_user, _, _, buf_day), values in self._buffer.items():
+                if buf_user == user_id and buf_day == day:
+                    totals["prompt_tokens"] += values[0]
+                    totals["completion_tokens"] += values[1]
+                    totals["runs"] += values[3]
+        return totals
+
+    def flush(self):
+        """Write all buffered totals in one transaction"""
+        with self._flush_lock:
+            with self._lock:
+                buffer, self._buffer = self._buffer, {}
+                self._pending_events = 0
+
+            if not buffer:
+                return
+
+            rows = [
+                {
+                    "user_id": user_id,
+                    "plan": plan,
+                    "stage": stage,
+                    "day": day,
+                    "prompt_tokens": values[0],
+                    "completion_tokens": values[1],
+                    "llm_calls": values[2],
+                    "runs": values[3],
+                    "cost_usd": values[4]
+                }
+                for (user_id, plan, stage, day), values in buffer.items()
+            ]
+
+            insert = postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert
+            stmt = insert(TokenLedgerEntry).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_id", "plan", "stage", "day"],
+                set_={
+                    column: getattr(TokenLedgerEntry, column) + getattr(stmt.excluded, column)
+                    for column in ("prompt_tokens", "completion_tokens", "llm_calls", "runs", "cost_usd")
+                }
+            )
+
+            db = SessionLocal()
+            try:
+                db.execute(stmt)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Failed to flush token ledger ({len(rows)} rows): {str(e)}")
+                self._restore(buffer)
+            finally:
+                db.close()
+
+    def _restore(self, buffer: dict):
+        with self._lock:
+            for key, values in buffer.items():
+                totals = self._buffer.setdefault(key, [0, 0, 0, 0, 0.0])
+                for idx, value in enumerate(values):
+                    totals[idx] += value
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="token-ledger-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.flush_interval)
+        self.flush()
+
+
+class QuotaExceededError(Exception):
+    pass
+
+
+class GenerationQuota:
+    """
+    Daily generation limits per plan, enforced with an in-memory counter.
+    Each user's counter is seeded from the ledger once per day per process.
+    """
+
+    def __init__(self, limits: dict, ledger: TokenLedger):
+        self.limits = limits
+        self.ledger = ledger
+        self._counts: Dict[Tuple[str, date], int] = {}
+        self._lock = threading.Lock()
+
+    def _seed(self, user_id: str, day: date) -> int:
+        db = SessionLocal()
+        try:
+            stored = db.query(func.coalesce(func.sum(TokenLedgerEntry.runs), 0)).filter(
+                TokenLedgerEntry.user_id == user_id,
+                TokenLedgerEntry.day == day
+            ).scalar()
+        finally:
+            db.close()
+        return int(stored or 0) + self.ledger.pending(user_id, day)["runs"]
+
+    def limit_for(self, plan) -> float:
+        return self.limits.get(plan, {}).get("generations", 0)
+
+    def _ensure(self, key: Tuple[str, date]):
+        if key in self._counts:
+            return
+        seeded = self._seed(*key)
+        with self._lock:
+            # Drop counters from previous days while we hold the lock
+            for stale in [k for k in self._counts if k[1] != key[1]]:
+                del self._counts[stale]
+            self._counts.setdefault(key, seeded)
+
+    def used(self, user_id: str) -> int:
+        key = (user_id, _utc_today())
+        self._ensure(key)
+        return self._counts.get(key, 0)
+
+    def acquire(self, user_id: str, plan):
+        """Reserve one generation or raise QuotaExceededError"""
+        key = (user_id, _utc_today())
+        self._ensure(key)
+        with self._lock:
+            used = self._counts.get(key, 0)
+            if used >= self.limit_for(plan):
+                raise QuotaExceededError(f"Daily generation limit reached for plan {getattr(plan, 'value', plan)}")
+            self._counts[key] = used + 1
+
+    def release(self, user_id: str):
+        """Give back a reservation when a generation never ran"""
+        key = (user_id, _utc_today())
+        with self._lock:
+            if self._counts.get(key, 0) > 0:
+                self._counts[key] -= 1
+
+
+_token_ledger = TokenLedger()
+
+def get_token_ledger() -> TokenLedger:
+    """Get the global token ledger"""
+    return _token_ledger
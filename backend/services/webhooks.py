@@ -0,0 +1,312 @@
+"""
+Webhook outbox and asynchronous delivery.
+
+Events are written to the webhook_deliveries table in the same transaction
+as the state change they report (see services.job_queue), so a notification
+is never lost to a crash or a slow endpoint. WebhookDispatcher sends them
+from its own event loop with a pooled keep-alive HTTP client. Failures back
+off exponentially with jitter, each endpoint gets a bounded number of
+concurrent requests, and with WEBHOOK_BATCH_MAX > 1 events due for the same
+URL are sent together as {"events": [...]}. A dispatcher only leases events
+for endpoints with free capacity, so nothing sits leased behind a busy
+endpoint while other dispatchers could be sending it.
+
+Delivery is at least once: every request carries an X-CloseALead-Delivery
+header (comma-separated ids for batches) receivers can deduplicate on.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+import asyncio
+import logging
+import random
+import threading
+import time
+
+import httpx
+from sqlalchemy import and_, func, or_
+
+from core.config import settings
+from core.database import SessionLocal, engine
+from core.metrics import registry
+from models.webhook_delivery import DeliveryStatus, WebhookDelivery
+
+logger = logging.getLogger(__name__)
+
+webhook_deliveries_total = registry.counter(
+    "closealead_webhook_deliveries_total",
+    "Webhook delivery attempts by outcome (delivered, retry, dead)",
+    ["outcome"]
+)
+webhook_request_seconds = registry.histogram(
+    "closealead_webhook_request_seconds",
+    "Webhook HTTP request latency"
+)
+
+# Client errors worth retrying; any other 4xx dead-letters immediately
+RETRYABLE_STATUS = {408, 409, 425, 429}
+
+
+def add_delivery(
+    db,
+    url: str,
+    event: str,
+    payload: dict,
+    user_id: Optional[str] = None,
+    job_id: Optional[str] = None
+) -> WebhookDelivery:
+    """Stage a webhook event on db; it is sent once the caller commits"""
+    delivery = WebhookDelivery(
+        user_id=user_id,
+        job_id=job_id,
+        url=url,
+        event=event,
+        payload=payload,
+        max_attempts=settings.WEBHOOK_MAX_ATTEMPTS,
+        next_attempt_at=datetime.utcnow()
+    )
+    db.add(delivery)
+    return delivery
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with equal jitter, in seconds"""
+    delay = min(settings.WEBHOOK_RETRY_BACKOFF * 2 ** max(attempts - 1, 0), settings.WEBHOOK_RETRY_BACKOFF_MAX)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _endpoint(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def endpoint_capacity() -> int:
+    """Deliveries one dispatcher may hold leased per endpoint"""
+    return settings.WEBHOOK_PER_ENDPOINT_CONCURRENCY * max(settings.WEBHOOK_BATCH_MAX, 1)
+
+
+def _not_for_endpoint(endpoint: str):
+    url = func.lower(WebhookDelivery.url)
+    return and_(
+        url != endpoint,
+        ~url.startswith(endpoint + "/", autoescape=True),
+        ~url.startswith(endpoint + "?", autoescape=True)
+    )
+
+
+class WebhookDispatcher:
+    """Claims due deliveries and sends them without blocking on any one endpoint"""
+
+    def __init__(self, worker_id: str):
+        self.worker_id = worker_id
+        self.skip_locked = engine.dialect.name == "postgresql"
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: set = set()
+        # Leased, unfinished deliveries per endpoint
+        self._leased: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------
+    # Outbox access (blocking; run off the event loop)
+    # ------------------------------------------------------------------
+
+    def claim(self, limit: int, leased: Optional[Dict[str, int]] = None) -> List[WebhookDelivery]:
+        """
+        Lease up to limit due deliveries, including ones whose lease expired.
+
+        leased maps endpoints to deliveries this dispatcher already holds;
+        endpoints at endpoint_capacity() are skipped in the query and the
+        rest get at most their free capacity.
+        """
+        now = datetime.utcnow()
+        capacity = endpoint_capacity()
+        leased = dict(leased or {})
+        due = or_(
+            and_(
+                WebhookDelivery.status == DeliveryStatus.PENDING.value,
+                WebhookDelivery.next_attempt_at <= now
+            ),
+            and_(
+                WebhookDelivery.status == DeliveryStatus.DELIVERING.value,
+                WebhookDelivery.lease_expires_at < now
+            )
+        )
+        claim = {
+            "status": DeliveryStatus.DELIVERING.value,
+            "lease_owner": self.worker_id,
+            "lease_expires_at": now + timedelta(seconds=settings.WEBHOOK_LEASE_SECONDS),
+            "attempts": WebhookDelivery.attempts + 1
+        }
+
+        def within_capacity(rows):
+            for row in rows:
+                endpoint = _endpoint(row.url)
+                if leased.get(endpoint, 0) < capacity:
+                    leased[endpoint] = leased.get(endpoint, 0) + 1
+                    yield row
+
+        saturated = [endpoint for endpoint, count in leased.items() if count >= capacity]
+        db = SessionLocal()
+        try:
+            candidates = db.query(WebhookDelivery.id, WebhookDelivery.url).filter(
+                due, *map(_not_for_endpoint, saturated)
+            ).order_by(WebhookDelivery.next_attempt_at)
+            if self.skip_locked:
+                rows = candidates.limit(limit).with_for_update(skip_locked=True).all()
+                ids = [row.id for row in within_capacity(rows)]
+                if ids:
+                    db.query(WebhookDelivery).filter(WebhookDelivery.id.in_(ids)).update(
+                        claim, synchronize_session=False
+                    )
+                db.commit()
+            else:
+                ids = []
+                for row in within_capacity(candidates.limit(limit).all()):
+                    won = db.query(WebhookDelivery).filter(WebhookDelivery.id == row.id, due).update(
+                        claim, synchronize_session=False
+                    )
+                    db.commit()
+                    if won:
+                        ids.append(row.id)
+
+            if not ids:
+                return []
+            deliveries = db.query(WebhookDelivery).filter(WebhookDelivery.id.in_(ids)).all()
+            for delivery in deliveries:
+                db.expunge(delivery)
+            return deliveries
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def record(self, deliveries: List[WebhookDelivery], status_code: Optional[int], error: Optional[str]):
+        """Mark a sent group delivered, or schedule its retry / dead-letter it"""
+        now = datetime.utcnow()
+        retryable = status_code is None or status_code >= 500 or status_code in RETRYABLE_STATUS
+        db = SessionLocal()
+        try:
+            for delivery in deliveries:
+                values = {
+                    "lease_owner": None,
+                    "lease_expires_at": None,
+                    "last_status_code": status_code,
+                    "last_error": error[:500] if error else None
+                }
+                if error is None:
+                    values.update({"status": DeliveryStatus.DELIVERED.value, "delivered_at": now})
+                    outcome = "delivered"
+                elif retryable and delivery.attempts < delivery.max_attempts:
+                    values.update({
+                        "status": DeliveryStatus.PENDING.value,
+                        "next_attempt_at": now + timedelta(seconds=retry_delay(delivery.attempts))
+                    })
+                    outcome = "retry"
+                else:
+                    values["status"] = DeliveryStatus.DEAD.value
+                    outcome = "dead"
+                    logger.error(f"Webhook {delivery.id} to {delivery.url} dead after {delivery.attempts} attempts: {error}")
+
+                db.query(WebhookDelivery).filter(
+                    WebhookDelivery.id == delivery.id,
+                    WebhookDelivery.lease_owner == self.worker_id
+                ).update(values, synchronize_session=False)
+                webhook_deliveries_total.inc(outcome=outcome)
+            db.commit()
+        finally:
+            db.close()
+
+    # ------------------------------------------------------------------
+    # Sending
+    # ------------------------------------------------------------------
+
+    def _limit(self, url: str) -> asyncio.Semaphore:
+        key = _endpoint(url)
+        if key not in self._limits:
+            self._limits[key] = asyncio.Semaphore(settings.WEBHOOK_PER_ENDPOINT_CONCURRENCY)
+        return self._limits[key]
+
+    async def _send(self, client: httpx.AsyncClient, url: str, deliveries: List[WebhookDelivery]):
+        if len(deliveries) == 1:
+            body = deliveries[0].payload
+        else:
+            body = {"events": [
+                {"id": delivery.id, "event": delivery.event, "data": delivery.payload}
+                for delivery in deliveries
+            ]}
+        headers = {
+            "X-CloseALead-Delivery": ",".join(delivery.id for delivery in deliveries),
+            "X-CloseALead-Event": deliveries[0].event if len(deliveries) == 1 else "batch"
+        }
+
+        status_code, error = None, None
+        async with self._limit(url):
+            started = time.perf_counter()
+            try:
+                response = await client.post(url, json=body, headers=headers)
+                status_code = response.status_code
+                if not response.is_success:
+                    error = f"HTTP {status_code}"
+            except httpx.HTTPError as e:
+                error = f"{type(e).__name__}: {str(e)}"
+            webhook_request_seconds.observe(time.perf_counter() - started)
+
+        if error is None:
+            logger.info(f"Webhook sent successfully to {url} ({len(deliveries)} event(s))")
+        else:
+            logger.warning(f"Webhook to {url} failed: {error}")
+        await asyncio.to_thread(self.record, deliveries, status_code, error)
+
+    def _dispatch(self, client: httpx.AsyncClient, deliveries: List[WebhookDelivery]):
+        by_url: Dict[str, List[WebhookDelivery]] = {}
+        for delivery in deliveries:
+            by_url.setdefault(delivery.url, []).append(delivery)
+
+        size = max(settings.WEBHOOK_BATCH_MAX, 1)
+        for url, group in by_url.items():
+            endpoint = _endpoint(url)
+            self._leased[endpoint] = self._leased.get(endpoint, 0) + len(group)
+            for start in range(0, len(group), size):
+                batch = group[start:start + size]
+                task = asyncio.ensure_future(self._send(client, url, batch))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+                task.add_done_callback(lambda _, endpoint=endpoint, count=len(batch): self._release(endpoint, count))
+
+    def _release(self, endpoint: str, count: int):
+        self._leased[endpoint] -= count
+        if self._leased[endpoint] <= 0:
+            del self._leased[endpoint]
+
+    async def run(self, stop: threading.Event):
+        """Deliver until stop is set, then give in-flight requests a moment to finish"""
+        limits = httpx.Limits(
+            max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+            keepalive_expiry=30
+        )
+        async with httpx.AsyncClient(
+            timeout=settings.WEBHOOK_TIMEOUT,
+            limits=limits,
+            headers={"User-Agent": "CloseALead-Webhooks/1.0"}
+        ) as client:
+            while True:
+                # One last pass after stop picks up events staged by the final jobs
+                stopping = stop.is_set()
+                free = settings.WEBHOOK_MAX_IN_FLIGHT - len(self._in_flight)
+                claimed = []
+                if free > 0:
+                    try:
+                        claimed = await asyncio.to_thread(self.claim, free, dict(self._leased))
+                    except Exception as e:
+                        logger.error(f"Webhook outbox poll failed: {str(e)}")
+                if claimed:
+                    self._dispatch(client, claimed)
+                if stopping:
+                    break
+                if not claimed:
+                    await asyncio.sleep(settings.WEBHOOK_POLL_INTERVAL)
+
+            if self._in_flight:
+                # Unfinished ones stay leased and are picked up again when the lease expires
+                await asyncio.wait(set(self._in_flight), timeout=settings.WEBHOOK_TIMEOUT)
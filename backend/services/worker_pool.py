@@ -0,0 +1,253 @@
+"""
+Async-friendly pool of long-lived worker processes.
+
+Each worker owns a pipe and runs one task at a time. A task that exceeds its
+timeout gets its worker killed and replaced, so one hostile input can never
+stall the pool. Workers can be memory-capped (RLIMIT_AS), warmed up by an
+initializer before their first task, and are recycled after a fixed number
+of tasks. Callers can bound how long they queue for a free worker.
+"""
+from typing import Any, Callable, Optional
+import asyncio
+import logging
+import multiprocessing
+import time
+
+from core.metrics import registry, queue_depth
+
+logger = logging.getLogger(__name__)
+
+pool_workers = registry.gauge(
+    "closealead_pool_workers",
+    "Worker processes by pool and state",
+    ["pool", "state"]
+)
+pool_utilization = registry.gauge(
+    "closealead_pool_utilization",
+    "Fraction of a pool's workers busy with a task",
+    ["pool"]
+)
+pool_queue_wait_seconds = registry.histogram(
+    "closealead_pool_queue_wait_seconds",
+    "Time tasks wait for a free worker",
+    ["pool"]
+)
+pool_task_seconds = registry.histogram(
+    "closealead_pool_task_duration_seconds",
+    "Time a worker spends on a task",
+    ["pool"]
+)
+pool_events_total = registry.counter(
+    "closealead_pool_events_total",
+    "Worker lifecycle events (timeout, crash, recycle)",
+    ["pool", "event"]
+)
+
+
+class WorkerPoolError(Exception):
+    pass
+
+
+class TaskTimeout(WorkerPoolError):
+    pass
+
+
+class PoolBusy(WorkerPoolError):
+    pass
+
+
+class WorkerCrashed(WorkerPoolError):
+    pass
+
+
+class TaskFailed(WorkerPoolError):
+    pass
+
+
+def _apply_memory_limit(memory_limit_mb: Optional[int]):
+    if not memory_limit_mb:
+        return
+    try:
+        import resource
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        logger.warning(f"Could not apply worker memory limit: {str(e)}")
+
+
+def _worker_main(conn, initializer, initargs, memory_limit_mb):
+    """Entry point of a worker process: run tasks from the pipe until told to stop"""
+    _apply_memory_limit(memory_limit_mb)
+    if initializer is not None:
+        initializer(*initargs)
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if message is None:
+            break
+
+        func, args, kwargs = message
+        try:
+            conn.send((True, func(*args, **kwargs)))
+        except MemoryError:
+            conn.send((False, "MemoryError: worker memory limit exceeded"))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {str(e)}"))
+
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.tasks_done = 0
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+
+
+class ProcessWorkerPool:
+    """Bounded pool of warm worker processes with per-task timeouts"""
+
+    def __init__(
+        self,
+        name: str,
+        size: int = 2,
+        initializer: Optional[Callable] = None,
+        initargs: tuple = (),
+        max_tasks_per_child: int = 100,
+        memory_limit_mb: Optional[int] = None,
+        default_timeout: float = 30.0,
+        queue_timeout: Optional[float] = None
+    ):
+        self.name = name
+        self.size = size
+        self.initializer = initializer
+        self.initargs = initargs
+        self.max_tasks_per_child = max_tasks_per_child
+        self.memory_limit_mb = memory_limit_mb
+        self.default_timeout = default_timeout
+        self.queue_timeout = queue_timeout
+        # spawn, not fork: the server process has threads and an event loop
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: Optional[asyncio.Queue] = None
+        self._busy = 0
+        self._waiting = 0
+        self._started = False
+        self._start_lock: Optional[asyncio.Lock] = None
+
+        pool_workers.labels(pool=name, state="busy").set_function(lambda: self._busy)
+        pool_workers.labels(pool=name, state="total").set_function(lambda: self.size if self._started else 0)
+        queue_depth.labels(queue=f"pool:{name}").set_function(lambda: self._waiting)
+        pool_utilization.labels(pool=name).set_function(lambda: self._busy / self.size if self.size else 0.0)
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.initializer, self.initargs, self.memory_limit_mb),
+            name=f"{self.name}-worker",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    async def start(self):
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._started:
+                return
+            self._idle = asyncio.Queue()
+            for _ in range(self.size):
+                self._idle.put_nowait(await asyncio.to_thread(self._spawn))
+            self._started = True
+            logger.info(f"Started {self.size} {self.name} workers")
+
+    async def _replace(self, worker: _Worker, event: str):
+        pool_events_total.inc(pool=self.name, event=event)
+        await asyncio.to_thread(worker.kill)
+        self._idle.put_nowait(await asyncio.to_thread(self._spawn))
+
+    async def submit(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run func(*args, **kwargs) in a worker without blocking the event loop"""
+        if not self._started:
+            await self.start()
+
+        queued_at = time.perf_counter()
+        self._waiting += 1
+        try:
+            worker = await asyncio.wait_for(self._idle.get(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            pool_events_total.inc(pool=self.name, event="queue_timeout")
+            raise PoolBusy(f"No {self.name} worker free within {self.queue_timeout}s")
+        finally:
+            self._waiting -= 1
+            pool_queue_wait_seconds.observe(time.perf_counter() - queued_at, pool=self.name)
+
+        self._busy += 1
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            worker.conn.send((func, args, kwargs))
+            ok, payload = await asyncio.wait_for(
+                loop.run_in_executor(None, worker.conn.recv),
+                timeout or self.default_timeout
+            )
+        except asyncio.TimeoutError:
+            await self._replace(worker, "timeout")
+            raise TaskTimeout(f"{self.name} task exceeded {timeout or self.default_timeout}s")
+        except (EOFError, OSError) as e:
+            await self._replace(worker, "crash")
+            raise WorkerCrashed(f"{self.name} worker died: {str(e) or 'connection closed'}")
+        except BaseException:
+            # Cancelled mid-task: the worker's state is unknown, so don't reuse it
+            await asyncio.shield(self._replace(worker, "cancelled"))
+            raise
+        finally:
+            self._busy -= 1
+            pool_task_seconds.observe(time.perf_counter() - started, pool=self.name)
+
+        worker.tasks_done += 1
+        if worker.tasks_done >= self.max_tasks_per_child:
+            await self._replace(worker, "recycle")
+        else:
+            self._idle.put_nowait(worker)
+
+        if not ok:
+            raise TaskFailed(payload)
+        return payload
+
+    def stats(self) -> dict:
+        waits = pool_queue_wait_seconds.labels(pool=self.name)
+        return {
+            "pool": self.name,
+            "workers": self.size if self._started else 0,
+            "busy": self._busy,
+            "waiting": self._waiting,
+            "utilization": round(self._busy / self.size, 3) if self.size else 0.0,
+            "max_tasks_per_child": self.max_tasks_per_child,
+            "queue_wait": waits.snapshot()
+        }
+
+    async def shutdown(self):
+        if not self._started:
+            return
+        self._started = False
+        while not self._idle.empty():
+            worker = self._idle.get_nowait()
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            await asyncio.to_thread(worker.kill)
+        logger.info(f"Stopped {self.name} workers")
@@ -0,0 +1,22 @@
+from crew.chunking import estimate_tokens, split_document
+
+
+def test_split_document_never_exceeds_max_chunks():
+    budget = 1000
+    # 40 pages of ~0.55 x budget: greedy packing fits one page per chunk
+    page = "word " * int(budget * 0.55 * 4 / 5)
+    text = "\f".join(f"Page {n}\n{page}" for n in range(40))
+
+    chunks = split_document(text, budget, max_chunks=16)
+
+    assert len(chunks) <= 16
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_split_document_keeps_budget_when_chunks_fit():
+    text = "\f".join("x" * 400 for _ in range(10))
+
+    chunks = split_document(text, 1000, max_chunks=16)
+
+    assert len(chunks) == 2
+    assert all(estimate_tokens(chunk) <= 1000 for chunk in chunks)
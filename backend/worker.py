@@ -0,0 +1,134 @@
+"""
+Standalone job worker.
+
+    python worker.py [--concurrency N] [--once]
+
+Polls the jobs table, leases ready jobs up to its concurrency, runs them in a
+thread pool and heartbeats their leases while they run. Webhooks are sent
+from the outbox by a separate async dispatcher, so a slow endpoint never
+occupies a job slot. Any number of workers can run against the same
+database. SIGTERM/SIGINT stop new leases and let running jobs finish.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict
+import argparse
+import asyncio
+import logging
+import signal
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.config import settings
+from core.database import engine, Base
+from models import user, offer, job, generation_trace, token_ledger  # noqa: F401 - register tables
+from services.job_queue import default_worker_id, get_job_queue
+from services.webhooks import WebhookDispatcher
+from services.usage import get_token_ledger
+
+logger = logging.getLogger("worker")
+
+
+class Worker:
+    def __init__(self, concurrency: int):
+        self.concurrency = max(concurrency, 1)
+        self.worker_id = default_worker_id()
+        self.queue = get_job_queue()
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="job")
+        self.running: Dict[str, Future] = {}
+        self.stopping = threading.Event()
+        self.drained = threading.Event()
+        self.retention_due = 0.0
+
+    def stop(self, *_):
+        if not self.stopping.is_set():
+            logger.info("Stopping: no new jobs will be leased")
+        self.stopping.set()
+
+    def _heartbeat(self):
+        # Renew well before the lease runs out
+        interval = max(self.queue.visibility_timeout / 3, 1)
+        while not self.drained.wait(interval):
+            active = [job_id for job_id, future in list(self.running.items()) if not future.done()]
+            try:
+                self.queue.heartbeat(active, self.worker_id)
+            except Exception as e:
+                logger.error(f"Heartbeat failed: {str(e)}")
+
+    def poll(self) -> int:
+        """Reap expired leases, apply result retention and fill free slots; returns how many jobs were leased"""
+        for job_id, future in list(self.running.items()):
+            if future.done():
+                del self.running[job_id]
+
+        self.queue.reap_expired()
+        if time.monotonic() >= self.retention_due:
+            self.retention_due = time.monotonic() + settings.JOB_RETENTION_INTERVAL
+            self.queue.apply_retention()
+
+        free = self.concurrency - len(self.running)
+        leased = self.queue.lease(self.worker_id, limit=free)
+        for leased_job in leased:
+            logger.info(
+                f"Leased {leased_job.kind} job {leased_job.id} "
+                f"(attempt {leased_job.attempts}/{leased_job.max_attempts})"
+            )
+            self.running[leased_job.id] = self.executor.submit(self.queue.run, leased_job, self.worker_id)
+        return len(leased)
+
+    def run(self, once: bool = False):
+        logger.info(f"Worker {self.worker_id} started with concurrency {self.concurrency}")
+        heartbeat = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        dispatcher = WebhookDispatcher(self.worker_id)
+        webhooks = threading.Thread(
+            target=lambda: asyncio.run(dispatcher.run(self.drained)),
+            name="webhook-dispatcher",
+            daemon=True
+        )
+        webhooks.start()
+        try:
+            while not self.stopping.is_set():
+                try:
+                    leased = self.poll()
+                except Exception as e:
+                    logger.error(f"Poll failed: {str(e)}")
+                    leased = 0
+                if once and not self.running:
+                    break
+                if not leased:
+                    self.stopping.wait(settings.JOB_POLL_INTERVAL)
+        finally:
+            self.stopping.set()
+            self.executor.shutdown(wait=True)
+            self.drained.set()
+            heartbeat.join(timeout=5)
+            webhooks.join(timeout=settings.WEBHOOK_TIMEOUT + 5)
+            logger.info(f"Worker {self.worker_id} stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CloseALead background job worker")
+    parser.add_argument("--concurrency", type=int, default=settings.JOB_WORKER_CONCURRENCY)
+    parser.add_argument("--once", action="store_true", help="Exit once the queue is drained")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    Base.metadata.create_all(bind=engine)
+
+    worker = Worker(args.concurrency)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+
+    get_token_ledger().start()
+    try:
+        worker.run(once=args.once)
+    finally:
+        get_token_ledger().stop()
+
+
+if __name__ == "__main__":
+    main()